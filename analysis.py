@@ -2,18 +2,255 @@ import pandas as pd
 import numpy as np
 import re
 import datetime
-from collections import defaultdict
+import time
+from collections import defaultdict, namedtuple
+from pandas.tseries.api import guess_datetime_format
+
+# Columns the analysis and chart code actually reads, with the dtype each is loaded as.
+# Low-cardinality text columns are stored as categories instead of Python strings.
+CATEGORY_COLUMNS = ['Website', 'WebsiteSupplier', 'WebsiteCarCategory', 'VehicleName']
+DATE_COLUMNS = ['PickUpDate', 'DropOffDate', 'ShopDate']
+CSV_DTYPES = dict({col: 'category' for col in CATEGORY_COLUMNS}, InclusiveRate='float64')
+USED_COLUMNS = set(CSV_DTYPES) | set(DATE_COLUMNS)
+
+def parse_date_column(values):
+    """Parse a date column using one explicit format guessed from its first value."""
+    first = values.dropna()
+    date_format = guess_datetime_format(str(first.iloc[0])) if not first.empty else None
+    if date_format:
+        try:
+            return pd.to_datetime(values, format=date_format)
+        except (ValueError, TypeError):
+            pass
+    # Mixed or unrecognised formats fall back to per-value inference
+    return pd.to_datetime(values)
+
+# Rows read at a time when a file is analyzed in streaming mode
+CHUNK_ROWS = 250000
+
+def parse_date_columns(df):
+    """Parse every date column present in df in place."""
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_date_column(df[col])
+    return df
+
+def load_rate_shop_csv(filename):
+    """Read a rate shopping CSV with explicit dtypes, keeping only the columns we analyze."""
+    df = pd.read_csv(filename, usecols=lambda col: col in USED_COLUMNS, dtype=CSV_DTYPES)
+    return parse_date_columns(df)
+
+def iter_rate_shop_csv(filename, chunk_rows=CHUNK_ROWS):
+    """Read a rate shopping CSV in chunks of chunk_rows, typed the same way as load_rate_shop_csv."""
+    reader = pd.read_csv(filename, usecols=lambda col: col in USED_COLUMNS, dtype=CSV_DTYPES,
+                         chunksize=chunk_rows)
+    with reader:
+        for chunk in reader:
+            yield parse_date_columns(chunk)
+
+# Dimensions of the aggregation cube built at ingest
+CUBE_DIMENSIONS = ['WebsiteCarCategory', 'WebsiteSupplier', 'Website', 'PickUpDate']
+
+def build_cube(df):
+    """Aggregate rates over category x supplier x website x pickup date in one groupby.
+
+    Each cell holds the sum, count and minimum of InclusiveRate, the row label of the
+    minimum (argmin) and the vehicle at that row, so averages and cheapest-car lookups
+    at any coarser level can be derived without rescanning the rows.
+    """
+    dims = [col for col in CUBE_DIMENSIONS if col in df.columns]
+    if not dims or 'InclusiveRate' not in df.columns:
+        return None
+    
+    rates = df.dropna(subset=['InclusiveRate'])
+    # Pickup dates are bucketed by calendar day
+    keys = [rates[col].dt.normalize() if col == 'PickUpDate' else rates[col] for col in dims]
+    # Rows with a blank key still count towards every level they do have a value for
+    cube = rates.groupby(keys, observed=True, dropna=False)['InclusiveRate'].agg(['sum', 'count', 'min', 'idxmin'])
+    cube = cube.rename(columns={'idxmin': 'argmin'})
+    if 'VehicleName' in df.columns:
+        cube['vehicle'] = df['VehicleName'].loc[cube['argmin']].to_numpy()
+    return cube
+
+def fold_cubes(cubes):
+    """Merge cubes built from separate chunks of the same file into one."""
+    combined = pd.concat(cubes)
+    dims = list(combined.index.names)
+    folded = combined.groupby(level=dims, observed=True, dropna=False)[['sum', 'count']].sum()
+    
+    # Keep the cheapest cell from whichever chunk it came from
+    cheapest = combined.sort_values('min', kind='stable')
+    cheapest = cheapest[~cheapest.index.duplicated(keep='first')]
+    folded = folded.join(cheapest.drop(columns=['sum', 'count']))
+    return folded.sort_index()
+
+def cube_mean(cube, by):
+    """Average rate for each group of cube cells, weighting every cell by its row count."""
+    totals = cube.groupby(by, observed=True)[['sum', 'count']].sum()
+    return totals['sum'] / totals['count']
+
+def category_cells(cube, vocab, category):
+    """Cube cells whose car category contains the given text (case-insensitive)."""
+    categories = cube.index.get_level_values('WebsiteCarCategory')
+    return cube[categories.isin(vocab.names('WebsiteCarCategory', category))]
+
+def month_cells(cube, month_num):
+    """Cube cells with a pickup date in the given month."""
+    return cube[cube.index.get_level_values('PickUpDate').month == month_num]
+
+def cells_mean(cells):
+    """Average rate over a set of cube cells."""
+    count = cells['count'].sum()
+    return cells['sum'].sum() / count if count else np.nan
+
+# PickUpOrdinal of rows without a pickup date; sorts before every real date
+NO_DATE = np.iinfo(np.int64).min
+
+def day_number(timestamp):
+    """Days since 1970-01-01 of a timestamp, the unit of PickUpOrdinal."""
+    return int(np.datetime64(pd.Timestamp(timestamp), 'D').astype(np.int64))
+
+def add_date_columns(df):
+    """Add PickUpOrdinal, the pickup day number computed once at load.
+
+    Month, weekday and weekend questions are answered from the cube, so only the day
+    number that row-level slicing and grouping use is kept per row.
+    """
+    df['PickUpOrdinal'] = df['PickUpDate'].to_numpy().astype('datetime64[D]').astype(np.int64)
+
+def dated_rows(df):
+    """Rows of a date-sorted frame that have a pickup date."""
+    return df.iloc[df['PickUpOrdinal'].to_numpy().searchsorted(NO_DATE, side='right'):]
+
+def date_slice(df, start, end):
+    """Rows of a date-sorted frame picked up between the calendar days of start and end, inclusive."""
+    ordinals = df['PickUpOrdinal'].to_numpy()
+    return df.iloc[ordinals.searchsorted(day_number(start), side='left'):
+                   ordinals.searchsorted(day_number(end), side='right')]
+
+def day_labels(ordinals):
+    """'%Y-%m-%d' labels for PickUpOrdinal values."""
+    return pd.to_datetime(np.asarray(ordinals, dtype=np.int64), unit='D').strftime('%Y-%m-%d')
+
+# Columns whose distinct values are indexed for substring lookups
+VOCABULARY_COLUMNS = ['WebsiteCarCategory', 'WebsiteSupplier', 'Website']
+
+class VocabularyIndex:
+    """Substring lookups over the distinct values of a few categorical columns.
+
+    Every lowercase substring of every distinct value maps to the category codes of the values
+    containing it, so "rows whose category contains X" becomes a dict lookup plus an integer
+    isin on the column's codes instead of a string scan over every row. The distinct values
+    are few, so indexing all their substrings stays small.
+    """
+
+    def __init__(self, values_by_column):
+        self.values = {}
+        self.substrings = {}
+        for column, values in values_by_column.items():
+            values = [str(value) for value in values]
+            index = defaultdict(list)
+            for code, value in enumerate(values):
+                lowered = value.lower()
+                for sub in {lowered[i:j] for i in range(len(lowered)) for j in range(i + 1, len(lowered) + 1)}:
+                    index[sub].append(code)
+            self.values[column] = values
+            self.substrings[column] = dict(index)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Index built from df's categories, so its codes line up with df's category codes."""
+        return cls({col: df[col].cat.categories for col in VOCABULARY_COLUMNS if col in df.columns})
+
+    def codes(self, column, text):
+        """Codes of the values in column that contain text, case-insensitive."""
+        if not text:
+            return list(range(len(self.values.get(column, []))))
+        return self.substrings.get(column, {}).get(text.lower(), [])
+
+    def names(self, column, text):
+        """Values in column that contain text, case-insensitive."""
+        return [self.values[column][code] for code in self.codes(column, text)]
+
+    def rows(self, df, column, text):
+        """Boolean mask of df's rows whose column contains text, case-insensitive."""
+        return df[column].cat.codes.isin(self.codes(column, text))
+
+def add_discounts(df):
+    """Add each row's Discount: how far its rate is below its category's average rate, in percent."""
+    category_avg = df.groupby('WebsiteCarCategory', observed=True)['InclusiveRate'].transform('mean')
+    df['Discount'] = (category_avg - df['InclusiveRate']) / category_avg * 100
+
+def find_deals(df, threshold, limit):
+    """Count the rows more than threshold percent below their category average, and return the top limit of them."""
+    deals = df[df['Discount'] > threshold]
+    return len(deals), deals.nlargest(limit, 'Discount')
+
+def aggregations_from_cube(cube):
+    """Derive the precomputed aggregations used by query_data from the cube."""
+    aggs = {}
+    if cube is None:
+        return aggs
+    dims = cube.index.names
+    
+    # Average rates by car category
+    if 'WebsiteCarCategory' in dims:
+        aggs['avg_by_category'] = cube_mean(cube, 'WebsiteCarCategory').to_dict()
+    
+    # Average rates by supplier
+    if 'WebsiteSupplier' in dims:
+        aggs['avg_by_supplier'] = cube_mean(cube, 'WebsiteSupplier').to_dict()
+    
+    if 'PickUpDate' in dims:
+        pickup_dates = cube.index.get_level_values('PickUpDate')
+        
+        # Average rates by pickup date
+        by_date = cube_mean(cube, 'PickUpDate')
+        aggs['avg_by_date'] = dict(zip(by_date.index.strftime('%Y-%m-%d'), by_date.values))
+        
+        # Average rates by day of week
+        aggs['avg_by_day_of_week'] = cube_mean(cube, pickup_dates.day_name()).to_dict()
+        
+        # Weekend vs weekday rates
+        weekend = cube_mean(cube, pickup_dates.dayofweek >= 5)  # 5 = Saturday, 6 = Sunday
+        aggs['weekend_weekday'] = {
+            'weekend': weekend.get(True, np.nan),
+            'weekday': weekend.get(False, np.nan)
+        }
+    
+    # Minimum rate by car category
+    if 'WebsiteCarCategory' in dims and 'WebsiteSupplier' in dims and 'vehicle' in cube.columns:
+        cheapest = cube.loc[cube.groupby('WebsiteCarCategory', observed=True)['min'].idxmin()]
+        aggs['min_by_category'] = {
+            category: {
+                'rate': cell['min'],
+                'supplier': supplier,
+                'vehicle': cell['vehicle']
+            }
+            for (category, supplier, *_), cell in cheapest.iterrows()
+        }
+    
+    # Average rates by supplier for each car category
+    if 'WebsiteCarCategory' in dims and 'WebsiteSupplier' in dims:
+        by_pair = cube_mean(cube, ['WebsiteCarCategory', 'WebsiteSupplier'])
+        aggs['supplier_by_category'] = {
+            category: rates.droplevel(0).to_dict()
+            for category, rates in by_pair.groupby(level=0, observed=True)
+        }
+    
+    return aggs
 
 def analyze_file(filename):
     """Analyze a rate shopping CSV file and extract useful information."""
     # Read the CSV file
-    df = pd.read_csv(filename)
-    
-    # Basic cleanup
-    # Convert date columns to datetime
-    for col in ['PickUpDate', 'DropOffDate', 'ShopDate']:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col])
+    start = time.perf_counter()
+    df = load_rate_shop_csv(filename)
+    ingest = {
+        'parse_seconds': time.perf_counter() - start,
+        'memory_bytes': int(df.memory_usage(deep=True).sum())
+    }
+    print(f"Loaded {len(df)} rows in {ingest['parse_seconds']:.2f}s "
+          f"({ingest['memory_bytes'] / 1024 / 1024:.1f} MB in memory)")
     
     # Summary statistics
     summary = {
@@ -27,669 +264,760 @@ def analyze_file(filename):
         'websites': df['Website'].unique().tolist() if 'Website' in df.columns else []
     }
     
-    # Precompute some useful aggregations
-    aggs = {}
-    
-    # Average rates by car category
-    if 'WebsiteCarCategory' in df.columns and 'InclusiveRate' in df.columns:
-        aggs['avg_by_category'] = df.groupby('WebsiteCarCategory')['InclusiveRate'].mean().to_dict()
-    
-    # Average rates by supplier
-    if 'WebsiteSupplier' in df.columns and 'InclusiveRate' in df.columns:
-        aggs['avg_by_supplier'] = df.groupby('WebsiteSupplier')['InclusiveRate'].mean().to_dict()
-    
-    # Average rates by pickup date
-    if 'PickUpDate' in df.columns and 'InclusiveRate' in df.columns:
-        aggs['avg_by_date'] = df.groupby(df['PickUpDate'].dt.strftime('%Y-%m-%d'))['InclusiveRate'].mean().to_dict()
-    
-    # Average rates by day of week
-    if 'PickUpDate' in df.columns and 'InclusiveRate' in df.columns:
-        aggs['avg_by_day_of_week'] = df.groupby(df['PickUpDate'].dt.day_name())['InclusiveRate'].mean().to_dict()
+    # Sort by pickup date so date filters can binary search instead of scanning
+    if 'PickUpDate' in df.columns:
+        df = df.sort_values('PickUpDate', kind='stable', na_position='first', ignore_index=True)
+        add_date_columns(df)
     
-    # Minimum rate by car category
-    if 'WebsiteCarCategory' in df.columns and 'InclusiveRate' in df.columns:
-        min_rates = {}
-        for category in df['WebsiteCarCategory'].unique():
-            category_df = df[df['WebsiteCarCategory'] == category]
-            if not category_df.empty:
-                min_idx = category_df['InclusiveRate'].idxmin()
-                min_rates[category] = {
-                    'rate': category_df.loc[min_idx, 'InclusiveRate'],
-                    'supplier': category_df.loc[min_idx, 'WebsiteSupplier'],
-                    'vehicle': category_df.loc[min_idx, 'VehicleName']
-                }
-        aggs['min_by_category'] = min_rates
-    
-    # Average rates by supplier for each car category
-    if 'WebsiteCarCategory' in df.columns and 'WebsiteSupplier' in df.columns and 'InclusiveRate' in df.columns:
-        supplier_category_rates = {}
-        for category in df['WebsiteCarCategory'].unique():
-            category_df = df[df['WebsiteCarCategory'] == category]
-            supplier_rates = category_df.groupby('WebsiteSupplier')['InclusiveRate'].mean().to_dict()
-            supplier_category_rates[category] = supplier_rates
-        aggs['supplier_by_category'] = supplier_category_rates
-    
-    # Weekend vs weekday rates
-    if 'PickUpDate' in df.columns and 'InclusiveRate' in df.columns:
-        df['is_weekend'] = df['PickUpDate'].dt.dayofweek >= 5  # 5 = Saturday, 6 = Sunday
-        weekend_avg = df[df['is_weekend']]['InclusiveRate'].mean()
-        weekday_avg = df[~df['is_weekend']]['InclusiveRate'].mean()
-        aggs['weekend_weekday'] = {
-            'weekend': weekend_avg,
-            'weekday': weekday_avg
-        }
+    # Precompute some useful aggregations from a single groupby
+    cube = build_cube(df)
+    aggs = aggregations_from_cube(cube)
+    add_discounts(df)
+    vocab = VocabularyIndex.from_frame(df)
     
     # Return the dataframe and aggregations
     return {
         'df': df,
         'summary': summary,
-        'aggs': aggs
+        'aggs': aggs,
+        'cube': cube,
+        'vocab': vocab,
+        'ingest': ingest
     }
 
-def query_data(question, data):
-    """Attempt to answer analytical questions about the rate shopping data."""
-    df = data['df']
-    aggs = data['aggs']
-    question = question.lower()
-    
-    # Check for visualization requests
-    if any(term in question for term in ['plot', 'graph', 'chart', 'visualize', 'visualization', 'show me']):
-        return handle_visualization_request(question, df)
+def analyze_file_chunked(filename, chunk_rows=CHUNK_ROWS):
+    """Analyze a rate shopping CSV chunk by chunk without loading it into one DataFrame.
 
-    # PRICE ANALYSIS QUESTIONS
+    Each chunk is reduced to a partial cube and folded into the running one, so peak memory
+    depends on the chunk size and the number of distinct cube cells, not on the file size.
+    Returns the same summary and aggs as analyze_file, with no row-level frame ('df' is None).
+    """
+    start = time.perf_counter()
+    cube = None
+    total_records = 0
+    peak_chunk_bytes = 0
+    suppliers, categories = set(), set()
+    websites = {}  # dict keeps the order websites first appear in
+    date_min = date_max = None
     
-    # Cheapest car by category and date
-    cheapest_car_match = re.search(r"cheapest\s+(\w+)\s+car.*?for\s+(.*?)(\?|$)", question)
-    if cheapest_car_match:
-        category = cheapest_car_match.group(1).capitalize()
-        date_str = cheapest_car_match.group(2).strip()
+    for chunk in iter_rate_shop_csv(filename, chunk_rows):
+        total_records += len(chunk)
+        peak_chunk_bytes = max(peak_chunk_bytes, int(chunk.memory_usage(deep=True).sum()))
         
-        # Try to parse the date
-        try:
-            # Convert things like "April 5" to a date
-            current_year = datetime.datetime.now().year
-            date_obj = pd.to_datetime(f"{date_str}, {current_year}")
-            date_str = date_obj.strftime('%Y-%m-%d')
-            
-            # Filter the data
-            filtered = df[(df['WebsiteCarCategory'].str.contains(category, case=False)) & 
-                          (df['PickUpDate'].dt.strftime('%Y-%m-%d') == date_str)]
-            
-            if not filtered.empty:
-                cheapest = filtered.loc[filtered['InclusiveRate'].idxmin()]
-                return f"The cheapest {category} car for {date_obj.strftime('%B %d')} is a {cheapest['VehicleName']} " \
-                       f"from {cheapest['WebsiteSupplier']} at ${cheapest['InclusiveRate']:.2f} per day."
-            else:
-                return f"Sorry, I couldn't find any {category} cars available for {date_str}."
-        except:
-            return f"I couldn't understand the date format. Please specify a date like 'April 5'."
-    
-    # Best rates by category
-    best_rates_match = re.search(r"(which|what) supplier has the best rates for (.*?)(\?|$)", question)
-    if best_rates_match:
-        category = best_rates_match.group(2).strip()
-        
-        # Check for SUVs
-        if "suv" in category.lower():
-            # Filter for SUV categories
-            filtered = df[df['WebsiteCarCategory'].str.contains('SUV', case=False)]
-            
-            if not filtered.empty:
-                supplier_rates = filtered.groupby('WebsiteSupplier')['InclusiveRate'].mean().sort_values()
-                best_supplier = supplier_rates.index[0]
-                best_rate = supplier_rates.iloc[0]
-                
-                return f"For SUVs, {best_supplier} has the best average rate at ${best_rate:.2f} per day."
-            else:
-                return "Sorry, I couldn't find any SUV categories in the data."
-        else:
-            # Try to match the category
-            matching_categories = [cat for cat in df['WebsiteCarCategory'].unique() 
-                                  if category.lower() in cat.lower()]
-            
-            if matching_categories:
-                best_rates = {}
-                for cat in matching_categories:
-                    filtered = df[df['WebsiteCarCategory'] == cat]
-                    if not filtered.empty:
-                        supplier_rates = filtered.groupby('WebsiteSupplier')['InclusiveRate'].mean()
-                        best_supplier = supplier_rates.idxmin()
-                        best_rate = supplier_rates.min()
-                        best_rates[cat] = (best_supplier, best_rate)
-                
-                if best_rates:
-                    response = f"Here are the suppliers with the best rates for {category} car categories:\n\n"
-                    for cat, (supplier, rate) in best_rates.items():
-                        response += f"- {cat}: {supplier} at ${rate:.2f} per day\n"
-                    return response
-            
-            return f"Sorry, I couldn't find data for '{category}' car categories."
-    
-    # Compare websites
-    website_compare_match = re.search(r"is (.*?) or (.*?) offering better deals", question)
-    if website_compare_match:
-        website1 = website_compare_match.group(1).strip().capitalize()
-        website2 = website_compare_match.group(2).strip().capitalize()
-        
-        site1_data = df[df['Website'] == website1]
-        site2_data = df[df['Website'] == website2]
-        
-        if not site1_data.empty and not site2_data.empty:
-            avg1 = site1_data['InclusiveRate'].mean()
-            avg2 = site2_data['InclusiveRate'].mean()
-            
-            better_site = website1 if avg1 < avg2 else website2
-            diff_percent = abs(avg1 - avg2) / max(avg1, avg2) * 100
-            
-            return f"{better_site} is currently offering better deals with average rates " \
-                   f"${min(avg1, avg2):.2f} vs ${max(avg1, avg2):.2f} " \
-                   f"({diff_percent:.1f}% difference)."
-        else:
-            available_websites = df['Website'].unique()
-            return f"Sorry, I couldn't find data for both {website1} and {website2}. Available websites in the data are: {', '.join(available_websites)}."
-    
-    # Best time to rent
-    best_time_match = re.search(r"best time to rent.*?in (.*?) in (.*?)(\?|$)", question)
-    if best_time_match:
-        location = best_time_match.group(1).strip()
-        month = best_time_match.group(2).strip()
-        
-        # Filter by month
-        try:
-            month_num = pd.to_datetime(month, format='%B').month
-            monthly_data = df[df['PickUpDate'].dt.month == month_num]
-            
-            if not monthly_data.empty:
-                daily_avg = monthly_data.groupby(monthly_data['PickUpDate'].dt.day)['InclusiveRate'].mean()
-                best_day = daily_avg.idxmin()
-                
-                return f"Based on the data, the best time to rent a car in {location} during {month} " \
-                       f"is around the {best_day}th, with an average rate of ${daily_avg.min():.2f}."
-            else:
-                return f"Sorry, I don't have enough data for rentals in {location} during {month}."
-        except:
-            return "I couldn't determine the best time based on the available data."
-    
-    # Show deals below average
-    below_avg_match = re.search(r"deals more than (\d+)% below average", question)
-    if below_avg_match:
-        threshold = int(below_avg_match.group(1))
-        
-        deals = []
-        for category, avg_price in aggs['avg_by_category'].items():
-            category_data = df[df['WebsiteCarCategory'] == category]
-            for _, row in category_data.iterrows():
-                discount = (avg_price - row['InclusiveRate']) / avg_price * 100
-                if discount > threshold:
-                    deals.append({
-                        'category': category,
-                        'supplier': row['WebsiteSupplier'],
-                        'vehicle': row['VehicleName'],
-                        'price': row['InclusiveRate'],
-                        'discount': discount,
-                        'date': row['PickUpDate'].strftime('%Y-%m-%d')
-                    })
-        
-        if deals:
-            # Sort by discount percentage
-            deals.sort(key=lambda x: x['discount'], reverse=True)
-            
-            # Format response
-            response = f"I found {len(deals)} deals with more than {threshold}% below average price. Here are the top 5:\n\n"
-            for i, deal in enumerate(deals[:5]):
-                response += f"{i+1}. {deal['vehicle']} ({deal['category']}) from {deal['supplier']}: " \
-                           f"${deal['price']:.2f} ({deal['discount']:.1f}% below avg) on {deal['date']}\n"
-            
-            return response
-        else:
-            return f"Sorry, I couldn't find any deals more than {threshold}% below average price."
-    
-    # Compare suppliers for a category
-    supplier_compare_match = re.search(r"compare rates between (.*?) and (.*?) for (.*?) cars", question)
-    if supplier_compare_match:
-        supplier1 = supplier_compare_match.group(1).strip()
-        supplier2 = supplier_compare_match.group(2).strip()
-        category = supplier_compare_match.group(3).strip()
+        if 'WebsiteSupplier' in chunk.columns:
+            suppliers.update(chunk['WebsiteSupplier'].dropna().unique())
+        if 'WebsiteCarCategory' in chunk.columns:
+            categories.update(chunk['WebsiteCarCategory'].dropna().unique())
+        if 'Website' in chunk.columns:
+            websites.update(dict.fromkeys(chunk['Website'].unique()))
+        if 'PickUpDate' in chunk.columns:
+            chunk_min, chunk_max = chunk['PickUpDate'].min(), chunk['PickUpDate'].max()
+            date_min = chunk_min if date_min is None else min(date_min, chunk_min)
+            date_max = chunk_max if date_max is None else max(date_max, chunk_max)
         
-        filtered = df[df['WebsiteCarCategory'].str.contains(category, case=False)]
-        supplier1_data = filtered[filtered['WebsiteSupplier'] == supplier1]
-        supplier2_data = filtered[filtered['WebsiteSupplier'] == supplier2]
-        
-        if not supplier1_data.empty and not supplier2_data.empty:
-            avg1 = supplier1_data['InclusiveRate'].mean()
-            avg2 = supplier2_data['InclusiveRate'].mean()
-            
-            cheaper = supplier1 if avg1 < avg2 else supplier2
-            diff = abs(avg1 - avg2)
-            diff_percent = diff / max(avg1, avg2) * 100
-            
-            return f"For {category} cars, {cheaper} offers better rates with an average of ${min(avg1, avg2):.2f} " \
-                   f"compared to ${max(avg1, avg2):.2f} from {supplier2 if cheaper == supplier1 else supplier1}. " \
-                   f"That's a difference of ${diff:.2f} ({diff_percent:.1f}%)."
-        else:
-            return f"Sorry, I couldn't find comparison data for both {supplier1} and {supplier2} for {category} cars."
+        partial = build_cube(chunk)
+        if partial is not None:
+            cube = partial if cube is None else fold_cubes([cube, partial])
     
-    # Price difference between categories
-    category_diff_match = re.search(r"price difference between (.*?) and (.*?) cars", question)
-    if category_diff_match:
-        cat1 = category_diff_match.group(1).strip()
-        cat2 = category_diff_match.group(2).strip()
-        
-        filtered1 = df[df['WebsiteCarCategory'].str.contains(cat1, case=False)]
-        filtered2 = df[df['WebsiteCarCategory'].str.contains(cat2, case=False)]
-        
-        if not filtered1.empty and not filtered2.empty:
-            avg1 = filtered1['InclusiveRate'].mean()
-            avg2 = filtered2['InclusiveRate'].mean()
-            
-            diff = abs(avg1 - avg2)
-            diff_percent = diff / min(avg1, avg2) * 100
-            
-            return f"The average price difference between {cat1} and {cat2} cars is ${diff:.2f}. " \
-                   f"{cat2 if avg2 > avg1 else cat1} cars are {diff_percent:.1f}% more expensive than " \
-                   f"{cat1 if avg2 > avg1 else cat2} cars (${max(avg1, avg2):.2f} vs ${min(avg1, avg2):.2f})."
-        else:
-            return f"Sorry, I couldn't find comparison data for both {cat1} and {cat2} car categories."
+    ingest = {
+        'parse_seconds': time.perf_counter() - start,
+        'memory_bytes': int(cube.memory_usage(deep=True).sum()) if cube is not None else 0,
+        'peak_chunk_bytes': peak_chunk_bytes
+    }
+    print(f"Streamed {total_records} rows in {ingest['parse_seconds']:.2f}s "
+          f"({ingest['memory_bytes'] / 1024 / 1024:.1f} MB cube, "
+          f"{peak_chunk_bytes / 1024 / 1024:.1f} MB largest chunk)")
     
-    # Day of week with lowest rates
-    if "day of the week has the lowest rates" in question:
-        if 'avg_by_day_of_week' in aggs:
-            day_rates = aggs['avg_by_day_of_week']
-            lowest_day = min(day_rates.items(), key=lambda x: x[1])
-            
-            return f"Based on the data, {lowest_day[0]} has the lowest average rates at ${lowest_day[1]:.2f}."
-        else:
-            return "Sorry, I couldn't analyze rates by day of the week from the available data."
+    summary = {
+        'total_records': total_records,
+        'unique_suppliers': len(suppliers),
+        'unique_categories': len(categories),
+        'date_range': {
+            'min': date_min.strftime('%Y-%m-%d') if date_min is not None else '',
+            'max': date_max.strftime('%Y-%m-%d') if date_max is not None else ''
+        },
+        'websites': list(websites)
+    }
+    vocab = VocabularyIndex({
+        'WebsiteCarCategory': sorted(categories),
+        'WebsiteSupplier': sorted(suppliers),
+        'Website': list(websites)
+    })
     
-    # Most affordable car category
-    if "most affordable car category" in question or "cheapest car category" in question:
-        if 'avg_by_category' in aggs:
-            category_rates = aggs['avg_by_category']
-            affordable_categories = sorted(category_rates.items(), key=lambda x: x[1])
-            
-            # Take top 5 most affordable
-            top_affordable = affordable_categories[:5]
-            
-            response = "The most affordable car categories based on average rates are:\n\n"
-            for i, (category, rate) in enumerate(top_affordable):
-                response += f"{i+1}. {category}: ${rate:.2f} per day\n"
-            
-            return response
+    return {
+        'df': None,
+        'summary': summary,
+        'aggs': aggregations_from_cube(cube),
+        'cube': cube,
+        'vocab': vocab,
+        'ingest': ingest
+    }
+
+# Answer for row-level questions on datasets that were analyzed in streaming mode
+STREAMED_DATASET_MESSAGE = "This file was analyzed in streaming mode, so I only have its aggregated prices. " \
+                           "Try asking about average prices by supplier, category, website or date."
+
+def answer_visualization(match, data):
+    """Requests for a chart."""
+    return handle_visualization_request(match.string, data['df'])
+
+def answer_cheapest_car(match, data):
+    """Cheapest car by category and date."""
+    cube = data['cube']
+    vocab = data['vocab']
+    category = match.group(1).capitalize()
+    date_str = match.group(2).strip()
+
+    # Try to parse the date
+    try:
+        # Convert things like "April 5" to a date
+        current_year = datetime.datetime.now().year
+        date_obj = pd.to_datetime(f"{date_str}, {current_year}")
+        date_str = date_obj.strftime('%Y-%m-%d')
+
+        # Filter the cube cells for the category and date
+        filtered = category_cells(cube, vocab, category)
+        filtered = filtered[filtered.index.get_level_values('PickUpDate') == date_obj.normalize()]
+
+        if not filtered.empty:
+            cheapest = filtered.reset_index().nsmallest(1, 'min').iloc[0]
+            return f"The cheapest {category} car for {date_obj.strftime('%B %d')} is a {cheapest['vehicle']} " \
+                   f"from {cheapest['WebsiteSupplier']} at ${cheapest['min']:.2f} per day."
         else:
-            return "Sorry, I couldn't analyze prices by car category from the available data."
-    
-    # Luxury cars under specific price
-    luxury_price_match = re.search(r"(find|show|get) (luxury|premium) cars under \$(\d+)", question)
-    if luxury_price_match:
-        car_type = luxury_price_match.group(2).strip()
-        price_limit = float(luxury_price_match.group(3))
-        
-        # Find luxury categories
-        luxury_cats = [cat for cat in df['WebsiteCarCategory'].unique() 
-                      if car_type.lower() in cat.lower()]
-        
-        if luxury_cats:
-            luxury_cars = df[df['WebsiteCarCategory'].isin(luxury_cats)]
-            affordable_luxury = luxury_cars[luxury_cars['InclusiveRate'] < price_limit]
-            
-            if not affordable_luxury.empty:
-                # Group by model and supplier, take minimum price
-                grouped = affordable_luxury.groupby(['VehicleName', 'WebsiteSupplier'])['InclusiveRate'].min().reset_index()
-                sorted_cars = grouped.sort_values('InclusiveRate')
-                
-                response = f"Here are {car_type} cars under ${price_limit:.2f} per day:\n\n"
-                for i, (_, row) in enumerate(sorted_cars.iterrows()):
-                    if i >= 5:  # Limit to top 5
-                        break
-                    response += f"{i+1}. {row['VehicleName']} from {row['WebsiteSupplier']}: ${row['InclusiveRate']:.2f} per day\n"
-                
-                return response
-            else:
-                return f"Sorry, I couldn't find any {car_type} cars under ${price_limit:.2f} per day."
+            return f"Sorry, I couldn't find any {category} cars available for {date_str}."
+    except:
+        return f"I couldn't understand the date format. Please specify a date like 'April 5'."
+
+def answer_best_rates(match, data):
+    """Best rates by category."""
+    aggs = data['aggs']
+    cube = data['cube']
+    vocab = data['vocab']
+    category = match.group(2).strip()
+
+    # Check for SUVs
+    if "suv" in category.lower():
+        # Filter for SUV categories
+        filtered = category_cells(cube, vocab, 'SUV')
+
+        if not filtered.empty:
+            supplier_rates = cube_mean(filtered, 'WebsiteSupplier').sort_values()
+            best_supplier = supplier_rates.index[0]
+            best_rate = supplier_rates.iloc[0]
+
+            return f"For SUVs, {best_supplier} has the best average rate at ${best_rate:.2f} per day."
         else:
-            return f"Sorry, I couldn't find any car categories matching '{car_type}' in the data."
-    
-    # Average price for a category
-    avg_price_match = re.search(r"average price for a (.*?) car", question)
-    if avg_price_match:
-        category = avg_price_match.group(1).strip()
-        
-        matching_categories = [cat for cat in df['WebsiteCarCategory'].unique() 
-                              if category.lower() in cat.lower()]
-        
+            return "Sorry, I couldn't find any SUV categories in the data."
+    else:
+        # Try to match the category
+        matches = set(vocab.names('WebsiteCarCategory', category))
+        matching_categories = [cat for cat in aggs['supplier_by_category'] if cat in matches]
+
         if matching_categories:
-            response = f"Here are the average prices for {category} car categories:\n\n"
+            best_rates = {}
             for cat in matching_categories:
-                cat_data = df[df['WebsiteCarCategory'] == cat]
-                avg_price = cat_data['InclusiveRate'].mean()
-                response += f"- {cat}: ${avg_price:.2f} per day\n"
-            
-            return response
-        else:
-            return f"Sorry, I couldn't find any car categories matching '{category}' in the data."
-    
-    # Compare suppliers overall
-    if "which supplier has the lowest prices" in question:
-        if 'avg_by_supplier' in aggs:
-            supplier_rates = aggs['avg_by_supplier']
-            sorted_suppliers = sorted(supplier_rates.items(), key=lambda x: x[1])
-            
-            # Get top 5 cheapest suppliers
-            cheapest_suppliers = sorted_suppliers[:5]
-            
-            response = "The suppliers with the lowest average prices are:\n\n"
-            for i, (supplier, rate) in enumerate(cheapest_suppliers):
-                response += f"{i+1}. {supplier}: ${rate:.2f} per day\n"
-            
-            return response
+                supplier_rates = aggs['supplier_by_category'][cat]
+                best_supplier = min(supplier_rates, key=supplier_rates.get)
+                best_rates[cat] = (best_supplier, supplier_rates[best_supplier])
+
+            if best_rates:
+                response = f"Here are the suppliers with the best rates for {category} car categories:\n\n"
+                for cat, (supplier, rate) in best_rates.items():
+                    response += f"- {cat}: {supplier} at ${rate:.2f} per day\n"
+                return response
+
+        return f"Sorry, I couldn't find data for '{category}' car categories."
+
+def answer_compare_websites(match, data):
+    """Compare websites."""
+    cube = data['cube']
+    website1 = match.group(1).strip().capitalize()
+    website2 = match.group(2).strip().capitalize()
+
+    website_rates = cube_mean(cube, 'Website')
+
+    if website1 in website_rates.index and website2 in website_rates.index:
+        avg1 = website_rates[website1]
+        avg2 = website_rates[website2]
+
+        better_site = website1 if avg1 < avg2 else website2
+        diff_percent = abs(avg1 - avg2) / max(avg1, avg2) * 100
+
+        return f"{better_site} is currently offering better deals with average rates " \
+               f"${min(avg1, avg2):.2f} vs ${max(avg1, avg2):.2f} " \
+               f"({diff_percent:.1f}% difference)."
+    else:
+        available_websites = data['summary']['websites']
+        return f"Sorry, I couldn't find data for both {website1} and {website2}. Available websites in the data are: {', '.join(available_websites)}."
+
+def answer_best_time_to_rent(match, data):
+    """Best time to rent."""
+    cube = data['cube']
+    location = match.group(1).strip()
+    month = match.group(2).strip()
+
+    # Filter by month
+    try:
+        month_num = pd.to_datetime(month, format='%B').month
+        monthly_data = month_cells(cube, month_num)
+
+        if not monthly_data.empty:
+            daily_avg = cube_mean(monthly_data, monthly_data.index.get_level_values('PickUpDate').day)
+            best_day = daily_avg.idxmin()
+
+            return f"Based on the data, the best time to rent a car in {location} during {month} " \
+                   f"is around the {best_day}th, with an average rate of ${daily_avg.min():.2f}."
         else:
-            return "Sorry, I couldn't analyze prices by supplier from the available data."
-    
-    # Compare two specific suppliers
-    compare_suppliers_match = re.search(r"compare (.*?) and (.*?) prices", question)
-    if compare_suppliers_match:
-        supplier1 = compare_suppliers_match.group(1).strip()
-        supplier2 = compare_suppliers_match.group(2).strip()
-        
-        supplier1_data = df[df['WebsiteSupplier'] == supplier1]
-        supplier2_data = df[df['WebsiteSupplier'] == supplier2]
-        
-        if not supplier1_data.empty and not supplier2_data.empty:
-            avg1 = supplier1_data['InclusiveRate'].mean()
-            avg2 = supplier2_data['InclusiveRate'].mean()
-            
-            # Compare by car category
-            common_categories = set(supplier1_data['WebsiteCarCategory'].unique()) & set(supplier2_data['WebsiteCarCategory'].unique())
-            
-            response = f"Comparing {supplier1} vs {supplier2}:\n\n"
-            response += f"Overall average: {supplier1}: ${avg1:.2f} | {supplier2}: ${avg2:.2f}\n\n"
-            
-            if common_categories:
-                response += "Comparison by car category:\n"
-                for category in common_categories:
-                    cat1_price = supplier1_data[supplier1_data['WebsiteCarCategory'] == category]['InclusiveRate'].mean()
-                    cat2_price = supplier2_data[supplier2_data['WebsiteCarCategory'] == category]['InclusiveRate'].mean()
-                    cheaper = supplier1 if cat1_price < cat2_price else supplier2
-                    diff = abs(cat1_price - cat2_price)
-                    response += f"- {category}: {cheaper} is ${diff:.2f} cheaper\n"
-            
+            return f"Sorry, I don't have enough data for rentals in {location} during {month}."
+    except:
+        return "I couldn't determine the best time based on the available data."
+
+def answer_deals_below_average(match, data):
+    """Show deals below average."""
+    threshold = int(match.group(1))
+    count, deals = find_deals(data['df'], threshold, 5)
+
+    if count:
+        # Format response
+        response = f"I found {count} deals with more than {threshold}% below average price. Here are the top 5:\n\n"
+        for i, deal in enumerate(deals.itertuples()):
+            response += f"{i+1}. {deal.VehicleName} ({deal.WebsiteCarCategory}) from {deal.WebsiteSupplier}: " \
+                       f"${deal.InclusiveRate:.2f} ({deal.Discount:.1f}% below avg) on {deal.PickUpDate.strftime('%Y-%m-%d')}\n"
+
+        return response
+    else:
+        return f"Sorry, I couldn't find any deals more than {threshold}% below average price."
+
+def answer_compare_suppliers_for_category(match, data):
+    """Compare suppliers for a category."""
+    cube = data['cube']
+    vocab = data['vocab']
+    supplier1 = match.group(1).strip()
+    supplier2 = match.group(2).strip()
+    category = match.group(3).strip()
+
+    supplier_rates = cube_mean(category_cells(cube, vocab, category), 'WebsiteSupplier')
+
+    if supplier1 in supplier_rates.index and supplier2 in supplier_rates.index:
+        avg1 = supplier_rates[supplier1]
+        avg2 = supplier_rates[supplier2]
+
+        cheaper = supplier1 if avg1 < avg2 else supplier2
+        diff = abs(avg1 - avg2)
+        diff_percent = diff / max(avg1, avg2) * 100
+
+        return f"For {category} cars, {cheaper} offers better rates with an average of ${min(avg1, avg2):.2f} " \
+               f"compared to ${max(avg1, avg2):.2f} from {supplier2 if cheaper == supplier1 else supplier1}. " \
+               f"That's a difference of ${diff:.2f} ({diff_percent:.1f}%)."
+    else:
+        return f"Sorry, I couldn't find comparison data for both {supplier1} and {supplier2} for {category} cars."
+
+def answer_category_price_difference(match, data):
+    """Price difference between categories."""
+    cube = data['cube']
+    vocab = data['vocab']
+    cat1 = match.group(1).strip()
+    cat2 = match.group(2).strip()
+
+    filtered1 = category_cells(cube, vocab, cat1)
+    filtered2 = category_cells(cube, vocab, cat2)
+
+    if not filtered1.empty and not filtered2.empty:
+        avg1 = cells_mean(filtered1)
+        avg2 = cells_mean(filtered2)
+
+        diff = abs(avg1 - avg2)
+        diff_percent = diff / min(avg1, avg2) * 100
+
+        return f"The average price difference between {cat1} and {cat2} cars is ${diff:.2f}. " \
+               f"{cat2 if avg2 > avg1 else cat1} cars are {diff_percent:.1f}% more expensive than " \
+               f"{cat1 if avg2 > avg1 else cat2} cars (${max(avg1, avg2):.2f} vs ${min(avg1, avg2):.2f})."
+    else:
+        return f"Sorry, I couldn't find comparison data for both {cat1} and {cat2} car categories."
+
+def answer_cheapest_day_of_week(match, data):
+    """Day of week with lowest rates."""
+    aggs = data['aggs']
+    if 'avg_by_day_of_week' in aggs:
+        day_rates = aggs['avg_by_day_of_week']
+        lowest_day = min(day_rates.items(), key=lambda x: x[1])
+
+        return f"Based on the data, {lowest_day[0]} has the lowest average rates at ${lowest_day[1]:.2f}."
+    else:
+        return "Sorry, I couldn't analyze rates by day of the week from the available data."
+
+def answer_most_affordable_category(match, data):
+    """Most affordable car category."""
+    aggs = data['aggs']
+    if 'avg_by_category' in aggs:
+        category_rates = aggs['avg_by_category']
+        affordable_categories = sorted(category_rates.items(), key=lambda x: x[1])
+
+        # Take top 5 most affordable
+        top_affordable = affordable_categories[:5]
+
+        response = "The most affordable car categories based on average rates are:\n\n"
+        for i, (category, rate) in enumerate(top_affordable):
+            response += f"{i+1}. {category}: ${rate:.2f} per day\n"
+
+        return response
+    else:
+        return "Sorry, I couldn't analyze prices by car category from the available data."
+
+def answer_luxury_under_price(match, data):
+    """Luxury cars under specific price."""
+    df = data['df']
+    vocab = data['vocab']
+    car_type = match.group(2).strip()
+    price_limit = float(match.group(3))
+
+    # Find luxury categories
+    if vocab.codes('WebsiteCarCategory', car_type):
+        luxury_cars = df[vocab.rows(df, 'WebsiteCarCategory', car_type)]
+        affordable_luxury = luxury_cars[luxury_cars['InclusiveRate'] < price_limit]
+
+        if not affordable_luxury.empty:
+            # Group by model and supplier, take minimum price
+            grouped = affordable_luxury.groupby(['VehicleName', 'WebsiteSupplier'], observed=True)['InclusiveRate'].min().reset_index()
+            sorted_cars = grouped.sort_values('InclusiveRate')
+
+            response = f"Here are {car_type} cars under ${price_limit:.2f} per day:\n\n"
+            for i, (_, row) in enumerate(sorted_cars.iterrows()):
+                if i >= 5:  # Limit to top 5
+                    break
+                response += f"{i+1}. {row['VehicleName']} from {row['WebsiteSupplier']}: ${row['InclusiveRate']:.2f} per day\n"
+
             return response
         else:
-            return f"Sorry, I couldn't find data for both {supplier1} and {supplier2}."
-    
-    # Best value car category
-    if "which car category has the best value" in question:
-        # This is subjective, but we'll use a simple price-to-size ratio approach
-        # We'll categorize cars by size (small, medium, large) and calculate value
-        
-        size_categories = {
-            'small': ['Economy', 'Compact', 'Mini'],
-            'medium': ['Midsize', 'Standard', 'Intermediate'],
-            'large': ['Fullsize', 'Premium', 'Luxury', 'SUV']
+            return f"Sorry, I couldn't find any {car_type} cars under ${price_limit:.2f} per day."
+    else:
+        return f"Sorry, I couldn't find any car categories matching '{car_type}' in the data."
+
+def answer_average_category_price(match, data):
+    """Average price for a category."""
+    aggs = data['aggs']
+    vocab = data['vocab']
+    category = match.group(1).strip()
+
+    matches = set(vocab.names('WebsiteCarCategory', category))
+    matching_categories = [cat for cat in aggs['avg_by_category'] if cat in matches]
+
+    if matching_categories:
+        response = f"Here are the average prices for {category} car categories:\n\n"
+        for cat in matching_categories:
+            response += f"- {cat}: ${aggs['avg_by_category'][cat]:.2f} per day\n"
+
+        return response
+    else:
+        return f"Sorry, I couldn't find any car categories matching '{category}' in the data."
+
+def answer_cheapest_suppliers(match, data):
+    """Compare suppliers overall."""
+    aggs = data['aggs']
+    if 'avg_by_supplier' in aggs:
+        supplier_rates = aggs['avg_by_supplier']
+        sorted_suppliers = sorted(supplier_rates.items(), key=lambda x: x[1])
+
+        # Get top 5 cheapest suppliers
+        cheapest_suppliers = sorted_suppliers[:5]
+
+        response = "The suppliers with the lowest average prices are:\n\n"
+        for i, (supplier, rate) in enumerate(cheapest_suppliers):
+            response += f"{i+1}. {supplier}: ${rate:.2f} per day\n"
+
+        return response
+    else:
+        return "Sorry, I couldn't analyze prices by supplier from the available data."
+
+def answer_compare_suppliers(match, data):
+    """Compare two specific suppliers."""
+    aggs = data['aggs']
+    supplier1 = match.group(1).strip()
+    supplier2 = match.group(2).strip()
+
+    supplier_rates = aggs['avg_by_supplier']
+
+    if supplier1 in supplier_rates and supplier2 in supplier_rates:
+        avg1 = supplier_rates[supplier1]
+        avg2 = supplier_rates[supplier2]
+
+        # Compare by car category
+        common_categories = [category for category, rates in aggs['supplier_by_category'].items()
+                             if supplier1 in rates and supplier2 in rates]
+
+        response = f"Comparing {supplier1} vs {supplier2}:\n\n"
+        response += f"Overall average: {supplier1}: ${avg1:.2f} | {supplier2}: ${avg2:.2f}\n\n"
+
+        if common_categories:
+            response += "Comparison by car category:\n"
+            for category in common_categories:
+                cat1_price = aggs['supplier_by_category'][category][supplier1]
+                cat2_price = aggs['supplier_by_category'][category][supplier2]
+                cheaper = supplier1 if cat1_price < cat2_price else supplier2
+                diff = abs(cat1_price - cat2_price)
+                response += f"- {category}: {cheaper} is ${diff:.2f} cheaper\n"
+
+        return response
+    else:
+        return f"Sorry, I couldn't find data for both {supplier1} and {supplier2}."
+
+def answer_best_value_category(match, data):
+    """Best value car category."""
+    aggs = data['aggs']
+    cube = data['cube']
+    vocab = data['vocab']
+    # This is subjective, but we'll use a simple price-to-size ratio approach
+    # We'll categorize cars by size (small, medium, large) and calculate value
+
+    size_categories = {
+        'small': ['Economy', 'Compact', 'Mini'],
+        'medium': ['Midsize', 'Standard', 'Intermediate'],
+        'large': ['Fullsize', 'Premium', 'Luxury', 'SUV']
+    }
+
+    # Calculate average price for each size category
+    category_totals = cube.groupby('WebsiteCarCategory', observed=True)[['sum', 'count']].sum()
+    size_prices = {}
+    for size, categories in size_categories.items():
+        matches = {name for cat in categories for name in vocab.names('WebsiteCarCategory', cat)}
+        matching_cars = category_totals[category_totals.index.isin(matches)]
+        if not matching_cars.empty:
+            size_prices[size] = cells_mean(matching_cars)
+
+    if size_prices:
+        # Calculate a simple value score (lower is better)
+        size_values = {
+            'small': size_prices.get('small', float('inf')),
+            'medium': size_prices.get('medium', float('inf')) / 1.2,  # Adjust for more space
+            'large': size_prices.get('large', float('inf')) / 1.5   # Adjust for much more space
         }
-        
-        # Calculate average price for each size category
-        size_prices = {}
-        for size, categories in size_categories.items():
-            matching_cars = df[df['WebsiteCarCategory'].apply(
-                lambda x: any(cat.lower() in x.lower() for cat in categories))]
-            if not matching_cars.empty:
-                size_prices[size] = matching_cars['InclusiveRate'].mean()
-        
-        if size_prices:
-            # Calculate a simple value score (lower is better)
-            size_values = {
-                'small': size_prices.get('small', float('inf')),
-                'medium': size_prices.get('medium', float('inf')) / 1.2,  # Adjust for more space
-                'large': size_prices.get('large', float('inf')) / 1.5   # Adjust for much more space
-            }
-            
-            best_value_size = min(size_values.items(), key=lambda x: x[1])[0]
-            
-            # Find the specific category with the best value
-            best_categories = []
-            for category in df['WebsiteCarCategory'].unique():
-                size = next((s for s, cats in size_categories.items() 
-                           if any(cat.lower() in category.lower() for cat in cats)), None)
-                if size == best_value_size:
-                    cat_data = df[df['WebsiteCarCategory'] == category]
-                    avg_price = cat_data['InclusiveRate'].mean()
-                    best_categories.append((category, avg_price))
-            
-            if best_categories:
-                sorted_categories = sorted(best_categories, key=lambda x: x[1])
-                
-                response = f"Based on price-to-size value, {best_value_size.title()} cars offer the best value.\n\n"
-                response += "The best value specific categories are:\n"
-                for i, (category, price) in enumerate(sorted_categories[:3]):
-                    response += f"{i+1}. {category}: ${price:.2f} per day\n"
-                
-                return response
-        
-        return "Sorry, I couldn't determine which car category has the best value."
-    
-    # How much cheaper is Supplier X than Supplier Y
-    supplier_cheaper_match = re.search(r"how much cheaper is (.*?) than (.*)", question)
-    if supplier_cheaper_match:
-        supplier1 = supplier_cheaper_match.group(1).strip()
-        supplier2 = supplier_cheaper_match.group(2).strip()
-        
-        supplier1_data = df[df['WebsiteSupplier'] == supplier1]
-        supplier2_data = df[df['WebsiteSupplier'] == supplier2]
-        
-        if not supplier1_data.empty and not supplier2_data.empty:
-            avg1 = supplier1_data['InclusiveRate'].mean()
-            avg2 = supplier2_data['InclusiveRate'].mean()
-            
-            diff = abs(avg1 - avg2)
-            diff_percent = (diff / max(avg1, avg2)) * 100
-            
-            if avg1 < avg2:
-                return f"{supplier1} is ${diff:.2f} cheaper than {supplier2} on average, " \
-                       f"which is {diff_percent:.1f}% less (${avg1:.2f} vs ${avg2:.2f})."
-            else:
-                return f"{supplier1} is actually ${diff:.2f} more expensive than {supplier2} on average, " \
-                       f"which is {diff_percent:.1f}% more (${avg1:.2f} vs ${avg2:.2f})."
+
+        best_value_size = min(size_values.items(), key=lambda x: x[1])[0]
+
+        # Find the specific category with the best value
+        best_categories = []
+        for category, avg_price in aggs['avg_by_category'].items():
+            size = next((s for s, cats in size_categories.items() 
+                       if any(cat.lower() in category.lower() for cat in cats)), None)
+            if size == best_value_size:
+                best_categories.append((category, avg_price))
+
+        if best_categories:
+            sorted_categories = sorted(best_categories, key=lambda x: x[1])
+
+            response = f"Based on price-to-size value, {best_value_size.title()} cars offer the best value.\n\n"
+            response += "The best value specific categories are:\n"
+            for i, (category, price) in enumerate(sorted_categories[:3]):
+                response += f"{i+1}. {category}: ${price:.2f} per day\n"
+
+            return response
+
+    return "Sorry, I couldn't determine which car category has the best value."
+
+def answer_supplier_cheaper(match, data):
+    """How much cheaper is Supplier X than Supplier Y."""
+    aggs = data['aggs']
+    supplier1 = match.group(1).strip()
+    supplier2 = match.group(2).strip()
+
+    supplier_rates = aggs['avg_by_supplier']
+
+    if supplier1 in supplier_rates and supplier2 in supplier_rates:
+        avg1 = supplier_rates[supplier1]
+        avg2 = supplier_rates[supplier2]
+
+        diff = abs(avg1 - avg2)
+        diff_percent = (diff / max(avg1, avg2)) * 100
+
+        if avg1 < avg2:
+            return f"{supplier1} is ${diff:.2f} cheaper than {supplier2} on average, " \
+                   f"which is {diff_percent:.1f}% less (${avg1:.2f} vs ${avg2:.2f})."
         else:
-            return f"Sorry, I couldn't find data for both {supplier1} and {supplier2}."
-    
-    # Price differences between websites
-    if "price differences between websites" in question:
-        websites = df['Website'].unique()
-        
-        if len(websites) > 1:
-            response = "Here are the price differences between websites:\n\n"
-            
-            website_avgs = {}
-            for website in websites:
-                website_data = df[df['Website'] == website]
-                avg_price = website_data['InclusiveRate'].mean()
-                website_avgs[website] = avg_price
-            
-            # Compare each pair
-            for i, website1 in enumerate(websites):
-                for website2 in websites[i+1:]:
-                    diff = abs(website_avgs[website1] - website_avgs[website2])
-                    cheaper = website1 if website_avgs[website1] < website_avgs[website2] else website2
-                    diff_percent = (diff / max(website_avgs[website1], website_avgs[website2])) * 100
-                    
-                    response += f"{website1} vs {website2}: {cheaper} is ${diff:.2f} cheaper ({diff_percent:.1f}%)\n"
-            
+            return f"{supplier1} is actually ${diff:.2f} more expensive than {supplier2} on average, " \
+                   f"which is {diff_percent:.1f}% more (${avg1:.2f} vs ${avg2:.2f})."
+    else:
+        return f"Sorry, I couldn't find data for both {supplier1} and {supplier2}."
+
+def answer_website_differences(match, data):
+    """Price differences between websites."""
+    cube = data['cube']
+    website_avgs = cube_mean(cube, 'Website').to_dict()
+    websites = [website for website in data['summary']['websites'] if website in website_avgs]
+
+    if len(websites) > 1:
+        response = "Here are the price differences between websites:\n\n"
+
+        # Compare each pair
+        for i, website1 in enumerate(websites):
+            for website2 in websites[i+1:]:
+                diff = abs(website_avgs[website1] - website_avgs[website2])
+                cheaper = website1 if website_avgs[website1] < website_avgs[website2] else website2
+                diff_percent = (diff / max(website_avgs[website1], website_avgs[website2])) * 100
+
+                response += f"{website1} vs {website2}: {cheaper} is ${diff:.2f} cheaper ({diff_percent:.1f}%)\n"
+
+        return response
+    else:
+        return "Sorry, I could only find one website in the data, so there's no comparison to make."
+
+def answer_best_luxury_supplier(match, data):
+    """Which supplier offers the best luxury cars."""
+    df = data['df']
+    vocab = data['vocab']
+    car_type = match.group(2).strip()
+
+    # Find luxury categories
+    if vocab.codes('WebsiteCarCategory', car_type):
+        luxury_data = df[vocab.rows(df, 'WebsiteCarCategory', car_type)]
+
+        if not luxury_data.empty:
+            supplier_stats = {}
+            for supplier in luxury_data['WebsiteSupplier'].unique():
+                supplier_data = luxury_data[luxury_data['WebsiteSupplier'] == supplier]
+                supplier_stats[supplier] = {
+                    'avg_price': supplier_data['InclusiveRate'].mean(),
+                    'variety': supplier_data['VehicleName'].nunique()
+                }
+
+            # Sort by price (lower is better)
+            by_price = sorted(supplier_stats.items(), key=lambda x: x[1]['avg_price'])
+
+            # Sort by variety (higher is better)
+            by_variety = sorted(supplier_stats.items(), key=lambda x: -x[1]['variety'])
+
+            response = f"Best suppliers for {car_type} cars:\n\n"
+            response += "By price (lowest first):\n"
+            for i, (supplier, stats) in enumerate(by_price[:3]):
+                response += f"{i+1}. {supplier}: ${stats['avg_price']:.2f} avg, {stats['variety']} different models\n"
+
+            response += "\nBy variety (most options first):\n"
+            for i, (supplier, stats) in enumerate(by_variety[:3]):
+                response += f"{i+1}. {supplier}: {stats['variety']} different models, ${stats['avg_price']:.2f} avg\n"
+
             return response
         else:
-            return "Sorry, I could only find one website in the data, so there's no comparison to make."
-    
-    # Which supplier offers the best luxury cars
-    luxury_supplier_match = re.search(r"which supplier (has|offers) the best (luxury|premium) cars", question)
-    if luxury_supplier_match:
-        car_type = luxury_supplier_match.group(2).strip()
-        
-        # Find luxury categories
-        luxury_cats = [cat for cat in df['WebsiteCarCategory'].unique() 
-                      if car_type.lower() in cat.lower()]
-        
-        if luxury_cats:
-            luxury_data = df[df['WebsiteCarCategory'].isin(luxury_cats)]
-            
-            if not luxury_data.empty:
-                supplier_stats = {}
-                for supplier in luxury_data['WebsiteSupplier'].unique():
-                    supplier_data = luxury_data[luxury_data['WebsiteSupplier'] == supplier]
-                    supplier_stats[supplier] = {
-                        'avg_price': supplier_data['InclusiveRate'].mean(),
-                        'variety': supplier_data['VehicleName'].nunique()
-                    }
-                
-                # Sort by price (lower is better)
-                by_price = sorted(supplier_stats.items(), key=lambda x: x[1]['avg_price'])
-                
-                # Sort by variety (higher is better)
-                by_variety = sorted(supplier_stats.items(), key=lambda x: -x[1]['variety'])
-                
-                response = f"Best suppliers for {car_type} cars:\n\n"
-                response += "By price (lowest first):\n"
-                for i, (supplier, stats) in enumerate(by_price[:3]):
-                    response += f"{i+1}. {supplier}: ${stats['avg_price']:.2f} avg, {stats['variety']} different models\n"
-                
-                response += "\nBy variety (most options first):\n"
-                for i, (supplier, stats) in enumerate(by_variety[:3]):
-                    response += f"{i+1}. {supplier}: {stats['variety']} different models, ${stats['avg_price']:.2f} avg\n"
-                
-                return response
-            else:
-                return f"Sorry, I couldn't find any {car_type} cars in the data."
+            return f"Sorry, I couldn't find any {car_type} cars in the data."
+    else:
+        return f"Sorry, I couldn't find any car categories matching '{car_type}' in the data."
+
+def answer_weekend_vs_weekday(match, data):
+    """Are weekends more expensive than weekdays?"""
+    aggs = data['aggs']
+    if 'weekend_weekday' in aggs:
+        weekend_avg = aggs['weekend_weekday']['weekend']
+        weekday_avg = aggs['weekend_weekday']['weekday']
+
+        diff = abs(weekend_avg - weekday_avg)
+        diff_percent = (diff / min(weekend_avg, weekday_avg)) * 100
+
+        if weekend_avg > weekday_avg:
+            return f"Yes, weekends are ${diff:.2f} more expensive than weekdays on average, " \
+                   f"which is {diff_percent:.1f}% higher (${weekend_avg:.2f} vs ${weekday_avg:.2f})."
         else:
-            return f"Sorry, I couldn't find any car categories matching '{car_type}' in the data."
-    
-    # Are weekends more expensive than weekdays?
-    if "weekends more expensive than weekdays" in question:
-        if 'weekend_weekday' in aggs:
-            weekend_avg = aggs['weekend_weekday']['weekend']
-            weekday_avg = aggs['weekend_weekday']['weekday']
-            
-            diff = abs(weekend_avg - weekday_avg)
-            diff_percent = (diff / min(weekend_avg, weekday_avg)) * 100
-            
-            if weekend_avg > weekday_avg:
-                return f"Yes, weekends are ${diff:.2f} more expensive than weekdays on average, " \
-                       f"which is {diff_percent:.1f}% higher (${weekend_avg:.2f} vs ${weekday_avg:.2f})."
+            return f"No, weekends are actually ${diff:.2f} cheaper than weekdays on average, " \
+                   f"which is {diff_percent:.1f}% lower (${weekend_avg:.2f} vs ${weekday_avg:.2f})."
+    else:
+        return "Sorry, I couldn't analyze weekend vs weekday prices from the available data."
+
+def answer_month_price_trend(match, data):
+    """How do prices change throughout April?"""
+    cube = data['cube']
+    month = match.group(1).strip()
+
+    try:
+        month_num = pd.to_datetime(month, format='%B').month
+        monthly_data = month_cells(cube, month_num)
+
+        if not monthly_data.empty:
+            # Group by day and calculate average
+            days_of_month = monthly_data.index.get_level_values('PickUpDate').day
+            daily_avg = cube_mean(monthly_data, days_of_month)
+
+            # Find the trend
+            days = sorted(daily_avg.index)
+            start_price = daily_avg[days[0]]
+            end_price = daily_avg[days[-1]]
+
+            diff = end_price - start_price
+            diff_percent = (diff / start_price) * 100
+
+            min_day = daily_avg.idxmin()
+            max_day = daily_avg.idxmax()
+
+            response = f"Price trends throughout {month}:\n\n"
+
+            if diff > 0:
+                response += f"Overall: Prices increase by ${diff:.2f} ({diff_percent:.1f}%) from beginning to end of month\n"
             else:
-                return f"No, weekends are actually ${diff:.2f} cheaper than weekdays on average, " \
-                       f"which is {diff_percent:.1f}% lower (${weekend_avg:.2f} vs ${weekday_avg:.2f})."
+                response += f"Overall: Prices decrease by ${-diff:.2f} ({-diff_percent:.1f}%) from beginning to end of month\n"
+
+            response += f"Lowest price: ${daily_avg.min():.2f} on the {min_day}th\n"
+            response += f"Highest price: ${daily_avg.max():.2f} on the {max_day}th\n"
+
+            # Find price pattern by week
+            response += "\nWeekly pattern: "
+
+            week1_avg = cells_mean(monthly_data[days_of_month <= 7])
+            week2_avg = cells_mean(monthly_data[(days_of_month > 7) & (days_of_month <= 14)])
+            week3_avg = cells_mean(monthly_data[(days_of_month > 14) & (days_of_month <= 21)])
+            week4_avg = cells_mean(monthly_data[days_of_month > 21])
+
+            week_avgs = [
+                ("Week 1", week1_avg),
+                ("Week 2", week2_avg),
+                ("Week 3", week3_avg),
+                ("Week 4", week4_avg)
+            ]
+
+            sorted_weeks = sorted(week_avgs, key=lambda x: x[1])
+            response += f"{sorted_weeks[0][0]} is cheapest (${sorted_weeks[0][1]:.2f}), " \
+                       f"{sorted_weeks[-1][0]} is most expensive (${sorted_weeks[-1][1]:.2f})"
+
+            return response
         else:
-            return "Sorry, I couldn't analyze weekend vs weekday prices from the available data."
-    
-    # How do prices change throughout April?
-    price_change_month_match = re.search(r"how do prices change throughout (.*?)\?", question)
-    if price_change_month_match:
-        month = price_change_month_match.group(1).strip()
-        
-        try:
-            month_num = pd.to_datetime(month, format='%B').month
-            monthly_data = df[df['PickUpDate'].dt.month == month_num]
-            
-            if not monthly_data.empty:
-                # Group by day and calculate average
-                daily_avg = monthly_data.groupby(monthly_data['PickUpDate'].dt.day)['InclusiveRate'].mean()
-                
-                # Find the trend
-                days = sorted(daily_avg.index)
-                start_price = daily_avg[days[0]]
-                end_price = daily_avg[days[-1]]
-                
-                diff = end_price - start_price
-                diff_percent = (diff / start_price) * 100
-                
-                min_day = daily_avg.idxmin()
-                max_day = daily_avg.idxmax()
-                
-                response = f"Price trends throughout {month}:\n\n"
-                
-                if diff > 0:
-                    response += f"Overall: Prices increase by ${diff:.2f} ({diff_percent:.1f}%) from beginning to end of month\n"
+            return f"Sorry, I don't have data for {month} in the dataset."
+    except:
+        return f"I couldn't analyze price changes for {month}. Please specify a valid month name."
+
+def answer_cheapest_date(match, data):
+    """Which date has the lowest average price?"""
+    aggs = data['aggs']
+    if 'avg_by_date' in aggs:
+        date_prices = aggs['avg_by_date']
+        lowest_date = min(date_prices.items(), key=lambda x: x[1])
+
+        # Get day of week for context
+        day_of_week = pd.to_datetime(lowest_date[0]).strftime('%A')
+
+        return f"The date with the lowest average price is {lowest_date[0]} ({day_of_week}) " \
+               f"at ${lowest_date[1]:.2f} per day."
+    else:
+        return "Sorry, I couldn't analyze prices by date from the available data."
+
+def answer_compare_first_last_week(match, data):
+    """Compare first week vs last week of April."""
+    cube = data['cube']
+    month = match.group(1).strip()
+
+    try:
+        month_num = pd.to_datetime(month, format='%B').month
+        monthly_data = month_cells(cube, month_num)
+
+        if not monthly_data.empty:
+            # Define weeks
+            days_of_month = monthly_data.index.get_level_values('PickUpDate').day
+            first_week = monthly_data[days_of_month <= 7]
+            last_week = monthly_data[days_of_month >= 22]  # Approximate last week
+
+            if not first_week.empty and not last_week.empty:
+                first_week_avg = cells_mean(first_week)
+                last_week_avg = cells_mean(last_week)
+
+                diff = abs(first_week_avg - last_week_avg)
+                diff_percent = (diff / min(first_week_avg, last_week_avg)) * 100
+
+                if first_week_avg < last_week_avg:
+                    return f"First week of {month} (${first_week_avg:.2f}) is ${diff:.2f} cheaper than " \
+                           f"the last week (${last_week_avg:.2f}), a {diff_percent:.1f}% difference."
                 else:
-                    response += f"Overall: Prices decrease by ${-diff:.2f} ({-diff_percent:.1f}%) from beginning to end of month\n"
-                
-                response += f"Lowest price: ${daily_avg.min():.2f} on the {min_day}th\n"
-                response += f"Highest price: ${daily_avg.max():.2f} on the {max_day}th\n"
-                
-                # Find price pattern by week
-                response += "\nWeekly pattern: "
-                
-                week1_avg = monthly_data[monthly_data['PickUpDate'].dt.day <= 7]['InclusiveRate'].mean()
-                week2_avg = monthly_data[(monthly_data['PickUpDate'].dt.day > 7) & 
-                                       (monthly_data['PickUpDate'].dt.day <= 14)]['InclusiveRate'].mean()
-                week3_avg = monthly_data[(monthly_data['PickUpDate'].dt.day > 14) & 
-                                       (monthly_data['PickUpDate'].dt.day <= 21)]['InclusiveRate'].mean()
-                week4_avg = monthly_data[monthly_data['PickUpDate'].dt.day > 21]['InclusiveRate'].mean()
-                
-                week_avgs = [
-                    ("Week 1", week1_avg),
-                    ("Week 2", week2_avg),
-                    ("Week 3", week3_avg),
-                    ("Week 4", week4_avg)
-                ]
-                
-                sorted_weeks = sorted(week_avgs, key=lambda x: x[1])
-                response += f"{sorted_weeks[0][0]} is cheapest (${sorted_weeks[0][1]:.2f}), " \
-                           f"{sorted_weeks[-1][0]} is most expensive (${sorted_weeks[-1][1]:.2f})"
-                
-                return response
+                    return f"Last week of {month} (${last_week_avg:.2f}) is ${diff:.2f} cheaper than " \
+                           f"the first week (${first_week_avg:.2f}), a {diff_percent:.1f}% difference."
             else:
-                return f"Sorry, I don't have data for {month} in the dataset."
-        except:
-            return f"I couldn't analyze price changes for {month}. Please specify a valid month name."
-    
-    # Which date has the lowest average price?
-    if "which date has the lowest average price" in question:
-        if 'avg_by_date' in aggs:
-            date_prices = aggs['avg_by_date']
-            lowest_date = min(date_prices.items(), key=lambda x: x[1])
-            
-            # Get day of week for context
-            day_of_week = pd.to_datetime(lowest_date[0]).strftime('%A')
-            
-            return f"The date with the lowest average price is {lowest_date[0]} ({day_of_week}) " \
-                   f"at ${lowest_date[1]:.2f} per day."
+                return f"Sorry, I don't have enough data for both the first and last weeks of {month}."
         else:
-            return "Sorry, I couldn't analyze prices by date from the available data."
-    
-    # Compare first week vs last week of April
-    compare_weeks_match = re.search(r"compare first week vs last week of (.*?) prices", question)
-    if compare_weeks_match:
-        month = compare_weeks_match.group(1).strip()
-        
-        try:
-            month_num = pd.to_datetime(month, format='%B').month
-            monthly_data = df[df['PickUpDate'].dt.month == month_num]
-            
-            if not monthly_data.empty:
-                # Define weeks
-                first_week = monthly_data[monthly_data['PickUpDate'].dt.day <= 7]
-                last_week = monthly_data[monthly_data['PickUpDate'].dt.day >= 22]  # Approximate last week
-                
-                if not first_week.empty and not last_week.empty:
-                    first_week_avg = first_week['InclusiveRate'].mean()
-                    last_week_avg = last_week['InclusiveRate'].mean()
-                    
-                    diff = abs(first_week_avg - last_week_avg)
-                    diff_percent = (diff / min(first_week_avg, last_week_avg)) * 100
-                    
-                    if first_week_avg < last_week_avg:
-                        return f"First week of {month} (${first_week_avg:.2f}) is ${diff:.2f} cheaper than " \
-                               f"the last week (${last_week_avg:.2f}), a {diff_percent:.1f}% difference."
-                    else:
-                        return f"Last week of {month} (${last_week_avg:.2f}) is ${diff:.2f} cheaper than " \
-                               f"the first week (${first_week_avg:.2f}), a {diff_percent:.1f}% difference."
-                else:
-                    return f"Sorry, I don't have enough data for both the first and last weeks of {month}."
-            else:
-                return f"Sorry, I don't have data for {month} in the dataset."
-        except:
-            return f"I couldn't compare weeks for {month}. Please specify a valid month name."
-    
-    # If no specific analytical question is matched, return None to let Ollama handle it
-    return None
+            return f"Sorry, I don't have data for {month} in the dataset."
+    except:
+        return f"I couldn't compare weeks for {month}. Please specify a valid month name."
+
+# Questions query_data answers from the data, tried in order; the first match wins.
+# triggers are literal substrings that every match of pattern contains. needs_rows marks
+# intents that need data['df'] and can't be answered for streamed datasets.
+Intent = namedtuple('Intent', 'name triggers pattern handler needs_rows')
+
+INTENTS = [
+    Intent('visualization', ('plot', 'graph', 'chart', 'visualize', 'visualization', 'show me'), r"plot|graph|chart|visualize|visualization|show me", answer_visualization, False),
+    Intent('cheapest_car', ('cheapest',), r"cheapest\s+(\w+)\s+car.*?for\s+(.*?)(\?|$)", answer_cheapest_car, False),
+    Intent('best_rates', ('best rates',), r"(which|what) supplier has the best rates for (.*?)(\?|$)", answer_best_rates, False),
+    Intent('compare_websites', ('offering',), r"is (.*?) or (.*?) offering better deals", answer_compare_websites, False),
+    Intent('best_time_to_rent', ('best time',), r"best time to rent.*?in (.*?) in (.*?)(\?|$)", answer_best_time_to_rent, False),
+    Intent('deals_below_average', ('below average',), r"deals more than (\d+)% below average", answer_deals_below_average, True),
+    Intent('compare_suppliers_for_category', ('rates between',), r"compare rates between (.*?) and (.*?) for (.*?) cars", answer_compare_suppliers_for_category, False),
+    Intent('category_price_difference', ('difference between',), r"price difference between (.*?) and (.*?) cars", answer_category_price_difference, False),
+    Intent('cheapest_day_of_week', ('day of the week',), r"day of the week has the lowest rates", answer_cheapest_day_of_week, False),
+    Intent('most_affordable_category', ('car category',), r"most affordable car category|cheapest car category", answer_most_affordable_category, False),
+    Intent('luxury_under_price', ('cars under',), r"(find|show|get) (luxury|premium) cars under \$(\d+)", answer_luxury_under_price, True),
+    Intent('average_category_price', ('average price',), r"average price for a (.*?) car", answer_average_category_price, False),
+    Intent('cheapest_suppliers', ('lowest prices',), r"which supplier has the lowest prices", answer_cheapest_suppliers, False),
+    Intent('compare_suppliers', ('compare',), r"compare (.*?) and (.*?) prices", answer_compare_suppliers, False),
+    Intent('best_value_category', ('best value',), r"which car category has the best value", answer_best_value_category, False),
+    Intent('supplier_cheaper', ('cheaper',), r"how much cheaper is (.*?) than (.*)", answer_supplier_cheaper, False),
+    Intent('website_differences', ('differences between',), r"price differences between websites", answer_website_differences, False),
+    Intent('best_luxury_supplier', ('which supplier',), r"which supplier (has|offers) the best (luxury|premium) cars", answer_best_luxury_supplier, True),
+    Intent('weekend_vs_weekday', ('weekends',), r"weekends more expensive than weekdays", answer_weekend_vs_weekday, False),
+    Intent('month_price_trend', ('throughout',), r"how do prices change throughout (.*?)\?", answer_month_price_trend, False),
+    Intent('cheapest_date', ('date has',), r"which date has the lowest average price", answer_cheapest_date, False),
+    Intent('compare_first_last_week', ('first week',), r"compare first week vs last week of (.*?) prices", answer_compare_first_last_week, False),
+]
+INTENTS = [intent._replace(pattern=re.compile(intent.pattern)) for intent in INTENTS]
+
+def build_trigger_index(intents):
+    """Map each trigger to the positions of the intents it can start, plus one regex finding them all."""
+    index = defaultdict(set)
+    for position, intent in enumerate(intents):
+        for trigger in intent.triggers:
+            index[trigger].add(position)
+
+    # The regex reports the longest trigger at each position, so a trigger also stands in
+    # for every shorter trigger it starts with
+    triggers = sorted(index, key=len, reverse=True)
+    for trigger in triggers:
+        for other in triggers:
+            if other != trigger and trigger.startswith(other):
+                index[trigger] |= index[other]
+
+    pattern = re.compile('|'.join(re.escape(trigger) for trigger in triggers))
+    return {trigger: sorted(positions) for trigger, positions in index.items()}, pattern
+
+TRIGGER_INDEX, TRIGGER_PATTERN = build_trigger_index(INTENTS)
+
+def match_intent(question):
+    """Return (intent, match) for the first intent matching a lowercased question, or (None, None).
+
+    One scan for triggers narrows the table to the intents the question could match, so
+    only their patterns run, in table order.
+    """
+    candidates = set()
+    found = TRIGGER_PATTERN.search(question)
+    while found:
+        candidates.update(TRIGGER_INDEX[found.group()])
+        # Search again from the next character so overlapping triggers are found too
+        found = TRIGGER_PATTERN.search(question, found.start() + 1)
+    for position in sorted(candidates):
+        intent = INTENTS[position]
+        match = intent.pattern.search(question)
+        if match:
+            return intent, match
+    return None, None
+
+def query_data(question, data, on_timing=None):
+    """Attempt to answer analytical questions about the rate shopping data.
+
+    on_timing, if given, is called with the matched intent's name (None if nothing matched),
+    the seconds spent matching and the seconds spent answering, also when answering fails.
+    """
+    start = time.perf_counter()
+    intent, match = match_intent(question.lower())
+    matched = time.perf_counter()
+    try:
+        if intent is None:
+            # Let Ollama handle it
+            return None
+        if intent.needs_rows and data['df'] is None:
+            return STREAMED_DATASET_MESSAGE
+        return intent.handler(match, data)
+    finally:
+        if on_timing is not None:
+            on_timing(intent.name if intent else None, matched - start, time.perf_counter() - matched)
 
 def handle_visualization_request(question, df):
     """Handle requests for visualizations and charts."""
@@ -1,84 +1,334 @@
-from flask import Flask, render_template, request, jsonify
-import pandas as pd
-import numpy as np
+from flask import Flask, Response, g, render_template, request, jsonify, session, url_for
 import os
 import json
-import requests
-from models.analysis import analyze_file, query_data
-
-# For visualization
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-from matplotlib.dates import DateFormatter
-import seaborn as sns
-import io
-import base64
-from datetime import datetime, timedelta
+import functools
+import hashlib
+import hmac
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datastore import DatasetCache, DatasetRegistry, save_upload
+from lru import LRUCache
+from chart_pool import CHART_VERSION, GRAPH_TYPES, ChartError, ChartPool, render as render_chart
+from llm_client import LLMError, OllamaClient
+from llm_cache import ResponseCache
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, CounterFunction, Registry
+from profiling import RequestProfiler
+from singleflight import SingleFlight
+from datetime import timedelta
 
+# pandas, models.analysis and matplotlib are imported by the code paths that use them, on
+# the first upload, question or chart, so the server starts answering sooner
 app = Flask(__name__)
+app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24)  # Signs the session cookie holding the dataset id
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024 * 1024  # 2GB max file size
+app.config['UPLOAD_CHUNK_SIZE'] = 1024 * 1024  # Uploads are written to disk 1MB at a time
+app.config['STREAMING_THRESHOLD'] = 64 * 1024 * 1024  # Larger files are analyzed in chunks
+app.config['DATASET_CACHE_SIZE'] = 2 * 1024 * 1024 * 1024  # Disk budget for parsed datasets
+app.config['DATASET_MEMORY_BUDGET'] = 1024 * 1024 * 1024  # Memory budget for loaded datasets
+app.config['ANSWER_CACHE_SIZE'] = 4096  # Number of data answers kept in memory
+app.config['CHART_CACHE_SIZE'] = 64 * 1024 * 1024  # Memory budget for rendered chart PNGs
+app.config['CHART_WORKERS'] = int(os.environ.get('CHART_WORKERS', 2))  # Chart rendering processes; 0 renders inline
+app.config['CHART_QUEUE_DEPTH'] = 16  # Charts queued or rendering at once before new ones are refused
+app.config['CHART_TIMEOUT'] = 30  # Seconds to wait for a chart before giving up
+app.config['OLLAMA_URL'] = os.environ.get('OLLAMA_URL', 'http://localhost:11434')
+app.config['OLLAMA_MODEL'] = os.environ.get('OLLAMA_MODEL', 'llama3.2')  # Using the installed model
+app.config['OLLAMA_CONNECT_TIMEOUT'] = 3  # Seconds to wait for a connection to Ollama
+app.config['OLLAMA_READ_TIMEOUT'] = 120  # Seconds to wait for the next bytes of a reply
+app.config['OLLAMA_RETRIES'] = 2  # Retries after a failed connection or a 5xx reply
+app.config['LLM_CACHE_TTL'] = 7 * 24 * 60 * 60  # Seconds a cached Ollama reply is reused for
+app.config['PRECOMPUTE_AFTER_UPLOAD'] = True  # Warm the standard answers and charts for each new upload
+app.config['PRECOMPUTE_STATUS_SIZE'] = 256  # Datasets whose precomputation progress is remembered
+app.config['PROFILE_REQUESTS'] = os.environ.get('PROFILE_REQUESTS') == '1'  # Profile every /chat and /generate_graph
+app.config['PROFILE_TOKEN'] = os.environ.get('PROFILE_TOKEN')  # Sent as X-Profile, profiles one request; unset disables it
+app.config['PROFILE_FOLDER'] = 'profiles'
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Global variable to store the analyzed data
-analyzed_data = None
+# Parsed datasets keyed by the hash of the uploaded file, so re-uploads skip CSV parsing
+dataset_cache = DatasetCache(os.path.join(app.config['UPLOAD_FOLDER'], 'cache'),
+                             app.config['DATASET_CACHE_SIZE'])
+
+# Analyzed datasets by dataset id; each session points at the one it uploaded last
+datasets = DatasetRegistry(dataset_cache, app.config['DATASET_MEMORY_BUDGET'])
+
+def current_dataset():
+    """The caller's dataset: the dataset_id sent with the request, else the one in their session."""
+    payload = request.get_json(silent=True) or {}
+    dataset_id = payload.get('dataset_id') or session.get('dataset_id')
+    return datasets.get(dataset_id) if dataset_id else None
+
+# Keep-alive connections to Ollama shared by all requests
+llm = OllamaClient(app.config['OLLAMA_URL'], app.config['OLLAMA_MODEL'],
+                   connect_timeout=app.config['OLLAMA_CONNECT_TIMEOUT'],
+                   read_timeout=app.config['OLLAMA_READ_TIMEOUT'],
+                   retries=app.config['OLLAMA_RETRIES'])
+
+# Ollama replies to general questions, kept on disk so they survive restarts
+llm_cache = ResponseCache(os.path.join(app.config['UPLOAD_FOLDER'], 'llm_cache.sqlite3'),
+                          app.config['LLM_CACHE_TTL'])
+
+# Data answers keyed by (dataset id, normalized question). Dataset ids are content hashes,
+# so a newly uploaded file never sees answers computed for another one.
+answers = LRUCache(app.config['ANSWER_CACHE_SIZE'])
+NOT_CACHED = object()
+
+# Identical requests that arrive together share one computation: a data answer, an Ollama
+# reply or a chart, keyed like the caches they fill
+answer_flights = SingleFlight()
+llm_flights = SingleFlight()
+chart_flights = SingleFlight()
+
+# Latencies of requests and of the stages inside them, served on /metrics
+metrics_registry = Registry()
+request_seconds = metrics_registry.histogram(
+    'chatbot_request_duration_seconds', 'Time to handle a request, up to the start of its response.',
+    ('endpoint', 'method', 'status'))
+query_seconds = metrics_registry.histogram(
+    'chatbot_query_duration_seconds', 'Time query_data spent matching a question to an intent and answering it.',
+    ('intent', 'stage'))
+chart_seconds = metrics_registry.histogram(
+    'chatbot_chart_duration_seconds', 'Time to build the series of a chart and to render it to PNG.',
+    ('graph_type', 'stage'))
+llm_seconds = metrics_registry.histogram(
+    'chatbot_llm_duration_seconds', 'Time Ollama took for a whole reply.', ('call',))
+llm_first_token_seconds = metrics_registry.histogram(
+    'chatbot_llm_first_token_seconds', 'Time until Ollama streamed the first piece of a reply.')
+upload_seconds = metrics_registry.histogram(
+    'chatbot_upload_duration_seconds', 'Time spent in each stage of an upload.', ('stage',))
+llm_errors = metrics_registry.counter(
+    'chatbot_llm_errors', 'Ollama calls that failed after retries or timed out.', ('call',))
+chart_errors = metrics_registry.counter(
+    'chatbot_chart_errors', 'Charts the renderer refused, timed out on or lost to a dead worker.', ('graph_type',))
+
+def cache_lookups():
+    lookups = {}
+    for name, cache in (('answers', answers), ('charts', charts), ('datasets', datasets.datasets),
+                        ('llm_replies', llm_cache)):
+        lookups[(name, 'hit')] = cache.hits
+        lookups[(name, 'miss')] = cache.misses
+    return lookups
+
+metrics_registry.add(CounterFunction('chatbot_cache_lookups', 'Cache lookups by cache and result.',
+                                     ('cache', 'result'), cache_lookups))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    # Streamed responses are timed up to their first byte; their streams time Ollama themselves
+    if 'request_start' in g:
+        request_seconds.observe(time.perf_counter() - g.request_start, endpoint=request.endpoint or 'none',
+                                method=request.method, status=response.status_code)
+    return response
+
+# cProfile captures of single /chat and /generate_graph requests
+profiler = RequestProfiler(app.config['PROFILE_FOLDER'])
+
+def profiling_requested(header):
+    """Whether to profile a request with this X-Profile header: always with PROFILE_REQUESTS, else
+    only when the header is PROFILE_TOKEN.
+    """
+    token = app.config['PROFILE_TOKEN']
+    return app.config['PROFILE_REQUESTS'] or bool(token) and hmac.compare_digest(header.encode(), token.encode())
+
+def profiled(view):
+    """Run a view under the profiler when asked to. The profile is saved under PROFILE_FOLDER,
+    named in the X-Profile-File header, and a JSON reply also gets its summary under 'profile'.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not profiling_requested(request.headers.get('X-Profile', '')):
+            return view(*args, **kwargs)
+        response, summary = profiler.run(request.endpoint, view, *args, **kwargs)
+        response = app.make_response(response)
+        payload = response.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload['profile'] = summary
+            response.set_data(app.json.dumps(payload))
+        response.headers['X-Profile-File'] = summary['file']
+        return response
+    return wrapper
+
+def normalize_question(text):
+    """Lowercase a question and collapse its whitespace, so retyped questions share a cache entry."""
+    return ' '.join(text.lower().split())
+
+def answer_question(question, data):
+    """query_data with memoization; None answers are cached too, they mean "ask Ollama"."""
+    question = normalize_question(question)
+    key = (data['dataset_id'], question)
+    def compute():
+        from models.analysis import query_data
+        answer = query_data(question, data, on_timing=record_query_timing)
+        answers.put(key, answer)
+        return answer
+    
+    # A profiled request answers for itself, so its profile shows the work
+    if profiler.active():
+        return compute()
+    answer = answers.get(key, NOT_CACHED)
+    if answer is NOT_CACHED:
+        answer = answer_flights.do(key, compute)
+    return answer
+
+def record_query_timing(intent, match_seconds, answer_seconds):
+    # Questions no intent matches only cost the match; Ollama answers them
+    query_seconds.observe(match_seconds, intent=intent or 'none', stage='match')
+    if intent is not None:
+        query_seconds.observe(answer_seconds, intent=intent, stage='answer')
+
+def normalize_prompt(text):
+    """normalize_question, also ignoring trailing punctuation, for the Ollama reply cache."""
+    return normalize_question(text).rstrip('?!. ')
+
+def general_reply(question):
+    """Ollama's reply to a question the data can't answer, from the reply cache when possible."""
+    prompt = normalize_prompt(question)
+    reply = llm_cache.get(llm.model, prompt)
+    if reply is None:
+        def generate():
+            try:
+                with llm_seconds.time(call='generate'):
+                    reply = llm.generate(question)
+            except LLMError:
+                llm_errors.inc(call='generate')
+                raise
+            if reply:
+                llm_cache.put(llm.model, prompt, reply)
+            return reply
+        reply = llm_flights.do(('generate', llm.model, prompt), generate)
+    return reply
+
+def general_reply_stream(question):
+    """general_reply piece by piece; a cached reply comes as a single piece."""
+    prompt = normalize_prompt(question)
+    reply = llm_cache.get(llm.model, prompt)
+    if reply is not None:
+        yield reply
+        return
+    
+    def stream():
+        start = time.perf_counter()
+        pieces = []
+        try:
+            for token in llm.stream(question):
+                if not pieces:
+                    llm_first_token_seconds.observe(time.perf_counter() - start)
+                pieces.append(token)
+                yield token
+        except LLMError:
+            llm_errors.inc(call='stream')
+            raise
+        finally:
+            llm_seconds.observe(time.perf_counter() - start, call='stream')
+        # Only complete replies are cached; a failed stream raises before getting here
+        if pieces:
+            llm_cache.put(llm.model, prompt, ''.join(pieces))
+    # Identical questions asked while this one streams get the whole reply when it is done
+    yield from llm_flights.stream(('stream', llm.model, prompt), stream)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    user_message = request.json.get('message', '')
-    global analyzed_data
-    
+UPLOAD_REQUESTS = ["upload a file", "upload file", "upload", "i want to upload a file"]
+
+def data_reply(user_message, analyzed_data):
+    """The reply to a message we can answer without Ollama, or None."""
     # First check if it's a file upload request
-    if user_message.lower() in ["upload a file", "upload file", "upload", "i want to upload a file"]:
-        return jsonify({'response': "Please click the paperclip icon below to upload your CSV file for analysis."})
+    if user_message.lower() in UPLOAD_REQUESTS:
+        return {'response': "Please click the paperclip icon below to upload your CSV file for analysis."}
     
     # If we have analyzed data, check if the query is analytical
     if analyzed_data is not None:
         # Try to answer with our data analysis
         try:
-            answer = query_data(user_message, analyzed_data)
+            answer = answer_question(user_message, analyzed_data)
             
             # Check if the response contains visualization data
             if isinstance(answer, dict) and 'visualization' in answer:
-                return jsonify({
-                    'response': answer['response'],
-                    'visualization': answer['visualization']
-                })
+                return visualization_reply(answer, analyzed_data)
             elif answer:
-                return jsonify({'response': answer})
+                return {'response': answer}
         except Exception as e:
             print(f"Error in data query: {e}")
             # Return a friendly error message
-            return jsonify({'response': f"I encountered an issue analyzing that request. Could you rephrase your question?"})
+            return {'response': f"I encountered an issue analyzing that request. Could you rephrase your question?"}
+    return None
+
+def visualization_reply(answer, data):
+    """A reply with the chart to show and the URL of its image.
+
+    The browser draws the chart from /generate_graph's format=data series, so the image is
+    only rendered when a client that can't draw it fetches image_url.
+    """
+    visualization = answer['visualization']
+    reply = {'response': answer['response'], 'visualization': visualization}
+    graph_type = visualization.get('type', '')
+    args = {'suppliers': visualization.get('suppliers') or [], 'category': visualization.get('category') or '',
+            'categories': visualization.get('categories') or []}
+    reply['image_url'] = graph_url(data, graph_type, graph_params(graph_type, args))
+    return reply
+
+@app.route('/chat', methods=['POST'])
+@profiled
+def chat():
+    user_message = request.json.get('message', '')
+    reply = data_reply(user_message, current_dataset())
+    if reply is not None:
+        return jsonify(reply)
     
     # Otherwise, use Ollama for general questions
     try:
-        # Call the Ollama API
-        response = requests.post('http://localhost:11434/api/generate', 
-            json={
-                "model": "llama3.2",  # Using the installed model
-                "prompt": user_message,
-                "stream": False
-            })
-        
-        if response.status_code == 200:
-            return jsonify({'response': response.json().get('response', 'Sorry, I could not generate a response.')})
+        return jsonify({'response': general_reply(user_message) or 'Sorry, I could not generate a response.'})
+    except LLMError as e:
+        return jsonify({'response': str(e)})
+
+def sse_event(event, payload):
+    """One Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Like /chat, but streams Ollama's reply token by token as Server-Sent Events.
+    
+    Events: 'answer' carries a complete reply from the data (same fields as /chat), 'token'
+    carries the next piece of an Ollama reply, 'error' a failure message, and the final
+    'done' reports time to first token and total time in milliseconds.
+    """
+    start = time.perf_counter()
+    user_message = request.json.get('message', '')
+    reply = data_reply(user_message, current_dataset())
+    
+    def elapsed_ms():
+        return round((time.perf_counter() - start) * 1000, 1)
+    
+    def events():
+        first_token_ms = None
+        if reply is not None:
+            yield sse_event('answer', reply)
+            first_token_ms = elapsed_ms()
         else:
-            return jsonify({'response': f"Error: {response.status_code}"})
-    except Exception as e:
-        return jsonify({'response': f"Error connecting to Ollama: {str(e)}"})
+            try:
+                for token in general_reply_stream(user_message):
+                    if first_token_ms is None:
+                        first_token_ms = elapsed_ms()
+                    yield sse_event('token', {'token': token})
+            except LLMError as e:
+                yield sse_event('error', {'response': str(e)})
+        
+        yield sse_event('done', {'ttft_ms': first_token_ms, 'total_ms': elapsed_ms()})
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    global analyzed_data
-    
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'})
     
@@ -91,658 +341,426 @@ def upload_file():
         return jsonify({'error': 'No selected file'})
     
     if file and file.filename.lower().endswith('.csv'):
-        filename = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filename)
+        with upload_seconds.time(stage='save'):
+            digest, filename = save_upload(file, app.config['UPLOAD_FOLDER'], app.config['UPLOAD_CHUNK_SIZE'])
         
-        # Analyze the file
+        # Analyze the file, streaming it in chunks if it is too large to load at once
         try:
-            analyzed_data = analyze_file(filename)
+            from models.analysis import analyze_file, analyze_file_chunked
+            with upload_seconds.time(stage='load_cached'):
+                analyzed_data = datasets.get(digest)
+            if analyzed_data is not None:
+                print(f"Loaded {file.filename} from the dataset cache")
+            else:
+                if os.path.getsize(filename) > app.config['STREAMING_THRESHOLD']:
+                    with upload_seconds.time(stage='analyze_chunked'):
+                        analyzed_data = analyze_file_chunked(filename)
+                else:
+                    with upload_seconds.time(stage='analyze'):
+                        analyzed_data = analyze_file(filename)
+                with upload_seconds.time(stage='store'):
+                    dataset_cache.put(digest, analyzed_data)
+                    datasets.add(digest, analyzed_data)
+            session['dataset_id'] = digest
+            if app.config['PRECOMPUTE_AFTER_UPLOAD']:
+                start_precompute(analyzed_data)
             return jsonify({'success': 'File uploaded and analyzed successfully', 
-                           'summary': analyzed_data['summary']})
+                           'summary': analyzed_data['summary'],
+                           'dataset_id': digest,
+                           'precompute_url': url_for('precompute_status', dataset_id=digest)})
         except Exception as e:
             print(f"Error analyzing file: {e}")
             return jsonify({'error': f'Error analyzing file: {str(e)}'})
+        finally:
+            # The analysis is in the dataset cache; the CSV isn't read again
+            os.remove(filename)
     
     return jsonify({'error': 'Invalid file format. Please upload a CSV file.'})
 
-@app.route('/generate_graph', methods=['POST'])
-def generate_graph():
-    global analyzed_data
-    if analyzed_data is None:
-        return jsonify({'error': 'No data has been analyzed yet. Please upload a file first.'})
-    
-    graph_type = request.json.get('type', '')
+@app.route('/stats')
+def stats():
+    return jsonify({'answers': answers.stats(), 'charts': charts.stats(), 'datasets': datasets.stats(),
+                    'llm_replies': llm_cache.stats(),
+                    'coalesced': {'answers': answer_flights.stats(), 'llm': llm_flights.stats(),
+                                  'charts': chart_flights.stats()}})
+
+@app.route('/metrics')
+def metrics():
+    """Request and stage latency histograms and counters, in the Prometheus text format."""
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+# Charts that are drawn from the precomputed aggregations only
+AGGREGATE_GRAPHS = {'price_by_supplier', 'price_by_date', 'price_by_category', 'weekend_weekday_comparison'}
+
+class GraphError(Exception):
+    """A chart can't be drawn for the requested data; the message is shown to the user."""
+
+def graph_params(graph_type, args):
+    """The parameters a graph type reads from a request, normalized into a hashable cache key part."""
+    if graph_type == 'supplier_comparison':
+        return (('suppliers', tuple(str(s).strip() for s in args['suppliers'])),
+                ('category', str(args['category']).strip()))
+    if graph_type == 'category_price_difference':
+        categories = tuple(str(c).strip() for c in args['categories'])
+        # Fewer than two categories can't be compared; default to economy vs luxury
+        return (('categories', categories if len(categories) >= 2 else ('Economy', 'Luxury')),)
+    return ()
+
+def request_graph_params(graph_type):
+    """graph_params from a JSON body or, for GET requests, the query string."""
+    if request.method == 'GET':
+        args = {'suppliers': request.args.getlist('suppliers'), 'category': request.args.get('category', ''),
+                'categories': request.args.getlist('categories')}
+    else:
+        payload = request.json
+        args = {'suppliers': payload.get('suppliers') or [], 'category': payload.get('category') or '',
+                'categories': payload.get('categories') or []}
+    return graph_params(graph_type, args)
+
+def graph_series(data, graph_type, params):
+    """The pre-aggregated series a chart is drawn from. Raises GraphError if it can't be drawn."""
+    # Streamed datasets only keep aggregates, which the row-level charts can't use
+    if data['df'] is None and graph_type not in AGGREGATE_GRAPHS:
+        raise GraphError('This chart needs the full dataset, but this file was analyzed in streaming mode.')
     
+    params = dict(params)
     if graph_type == 'price_by_supplier':
-        return generate_price_by_supplier_graph()
+        return price_by_supplier_series(data)
     elif graph_type == 'price_by_date':
-        return generate_price_by_date_graph()
+        return price_by_date_series(data)
     elif graph_type == 'price_by_category':
-        return generate_price_by_category_graph()
+        return price_by_category_series(data)
     elif graph_type == 'supplier_comparison':
-        suppliers = request.json.get('suppliers', [])
-        category = request.json.get('category', '')
-        return generate_supplier_comparison_graph(suppliers, category)
+        return supplier_comparison_series(data, list(params['suppliers']), params['category'])
     elif graph_type == 'weekend_weekday_comparison':
-        return generate_weekend_weekday_comparison()
+        return weekend_weekday_comparison_series(data)
     elif graph_type == 'best_deals':
-        return generate_best_deals_graph()
+        return best_deals_series(data)
     elif graph_type == 'category_price_difference':
-        categories = request.json.get('categories', [])
-        return generate_category_price_difference(categories)
+        return category_price_difference_series(data, list(params['categories']))
     elif graph_type == 'weekly_comparison':
-        return generate_weekly_comparison()
+        return weekly_comparison_series(data)
     else:
-        return jsonify({'error': 'Unknown graph type'})
+        raise GraphError('Unknown graph type')
 
-def generate_price_by_supplier_graph():
-    df = analyzed_data['df']
-    
-    # Calculate average price by supplier
-    supplier_prices = df.groupby('WebsiteSupplier')['InclusiveRate'].mean().sort_values()
-    
-    # Set the style
-    plt.style.use('seaborn-v0_8-whitegrid')
-    
-    # Create the plot with a larger figure
-    plt.figure(figsize=(12, 7))
-    
-    # Use a nicer color palette
-    colors = sns.color_palette("viridis", len(supplier_prices))
-    
-    bars = plt.bar(supplier_prices.index, supplier_prices.values, color=colors)
-    plt.xticks(rotation=45, ha='right', fontsize=10)
-    plt.xlabel('Supplier', fontsize=12)
-    plt.ylabel('Average Price ($)', fontsize=12)
-    plt.title('Average Rental Prices by Supplier', fontsize=14, fontweight='bold')
-    
-    # Add price labels on top of the bars
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height + 5,
-                f'${height:.2f}',
-                ha='center', va='bottom', fontsize=9)
-    
-    # Add a light grid
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    
-    # Improve layout
-    plt.tight_layout()
-    
-    # Add a subtle border
-    plt.gca().spines['top'].set_visible(False)
-    plt.gca().spines['right'].set_visible(False)
-    
-    # Save the plot to a bytes buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=100)
-    buffer.seek(0)
-    
-    # Encode the image to base64
-    image_png = buffer.getvalue()
-    buffer.close()
-    encoded = base64.b64encode(image_png).decode('utf-8')
-    
-    return jsonify({'image': encoded})
+def compact_series(value):
+    """A series ready for JSON: numbers rounded to cents, NaN (no data) as None."""
+    if isinstance(value, dict):
+        return {key: compact_series(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact_series(item) for item in value]
+    if isinstance(value, float):
+        return None if value != value else round(value, 2)
+    return value
 
-def generate_price_by_date_graph():
-    df = analyzed_data['df']
-    
-    # Calculate average price by date
-    date_prices = df.groupby(df['PickUpDate'].dt.strftime('%Y-%m-%d'))['InclusiveRate'].mean()
-    
-    # Set the style
-    plt.style.use('seaborn-v0_8-whitegrid')
-    
-    # Create the plot with a larger figure
-    plt.figure(figsize=(12, 7))
-    
-    # Convert string dates to datetime for better x-axis formatting
-    dates = [datetime.strptime(date, '%Y-%m-%d') for date in date_prices.index]
-    
-    # Plot with improved styling
-    plt.plot(dates, date_prices.values, marker='o', linestyle='-', linewidth=2, 
-             color='#3498db', markerfacecolor='white', markeredgecolor='#3498db', 
-             markeredgewidth=2, markersize=8)
-    
-    # Format the date axis
-    date_format = DateFormatter('%b %d')
-    plt.gca().xaxis.set_major_formatter(date_format)
-    
-    # Improve the look
-    plt.xticks(rotation=45, fontsize=10)
-    plt.xlabel('Pickup Date', fontsize=12)
-    plt.ylabel('Average Price ($)', fontsize=12)
-    plt.title('Average Rental Prices by Pickup Date', fontsize=14, fontweight='bold')
-    
-    # Add prices directly on the graph
-    for i, (date, price) in enumerate(zip(dates, date_prices.values)):
-        plt.text(date, price + 5, f'${price:.2f}', ha='center', fontsize=8)
-    
-    # Add a light grid
-    plt.grid(True, linestyle='--', alpha=0.7)
-    
-    # Highlight weekends with a light background
-    min_price = min(date_prices.values) - 20
-    max_price = max(date_prices.values) + 20
-    
-    for date in dates:
-        if date.weekday() >= 5:  # 5 is Saturday, 6 is Sunday
-            plt.axvspan(date - timedelta(hours=12), date + timedelta(hours=12), 
-                        color='#f5f5f5', alpha=0.5, zorder=0)
-    
-    # Improve layout
-    plt.tight_layout()
-    
-    # Remove top and right spines
-    plt.gca().spines['top'].set_visible(False)
-    plt.gca().spines['right'].set_visible(False)
-    
-    # Save the plot to a bytes buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=100)
-    buffer.seek(0)
-    
-    # Encode the image to base64
-    image_png = buffer.getvalue()
-    buffer.close()
-    encoded = base64.b64encode(image_png).decode('utf-8')
-    
-    return jsonify({'image': encoded})
+chart_pool = None
+chart_pool_lock = threading.Lock()
 
-def generate_price_by_category_graph():
-    df = analyzed_data['df']
-    
-    # Calculate average price by car category
-    category_prices = df.groupby('WebsiteCarCategory')['InclusiveRate'].mean().sort_values()
-    
-    # Select top 15 categories for better visualization
-    top_categories = category_prices.tail(15)
-    
-    # Set the style
-    plt.style.use('seaborn-v0_8-whitegrid')
-    
-    # Create the plot with a larger figure
-    plt.figure(figsize=(12, 8))
-    
-    # Use a nicer color palette
-    colors = sns.color_palette("viridis", len(top_categories))
-    
-    # Create horizontal bar chart
-    bars = plt.barh(top_categories.index, top_categories.values, color=colors)
-    
-    # Improve styling
-    plt.xlabel('Average Price ($)', fontsize=12)
-    plt.ylabel('Car Category', fontsize=12)
-    plt.title('Average Rental Prices by Car Category (Top 15)', fontsize=14, fontweight='bold')
-    
-    # Add price labels
-    for bar in bars:
-        width = bar.get_width()
-        plt.text(width + 5, bar.get_y() + bar.get_height()/2.,
-                f'${width:.2f}',
-                ha='left', va='center', fontsize=9)
-    
-    # Add a light grid
-    plt.grid(axis='x', linestyle='--', alpha=0.7)
+def get_chart_pool():
+    """The chart renderer, started on first use so pool workers never start pools of their own."""
+    global chart_pool
+    with chart_pool_lock:
+        if chart_pool is None:
+            chart_pool = ChartPool(app.config['CHART_WORKERS'], app.config['CHART_QUEUE_DEPTH'],
+                                   app.config['CHART_TIMEOUT'])
+    return chart_pool
+
+def stop_chart_pool():
+    """Stop the chart workers, for servers that exit without running atexit handlers."""
+    if chart_pool is not None:
+        chart_pool.shutdown()
+
+def graph_label(graph_type):
+    # Only known graph types become label values, so made up ones can't grow /metrics
+    return graph_type if graph_type in GRAPH_TYPES else 'unknown'
+
+def render_graph(data, graph_type, params):
+    """PNG bytes of a chart, drawn by the chart pool from its series."""
+    label = graph_label(graph_type)
+    with chart_seconds.time(graph_type=label, stage='series'):
+        series = graph_series(data, graph_type, params)
+    try:
+        # Includes the trip to the worker process and the PNG encoding
+        with chart_seconds.time(graph_type=label, stage='render'):
+            if profiler.active():
+                # In this thread rather than a worker process, so the profile includes matplotlib
+                return render_chart(graph_type, series)
+            return get_chart_pool().render(graph_type, series)
+    except ChartError:
+        chart_errors.inc(graph_type=label)
+        raise
+
+# Rendered charts keyed by (dataset id, renderer version, graph type, params), bounded by their total PNG size
+charts = LRUCache(app.config['CHART_CACHE_SIZE'], sizeof=len)
+
+def cached_graph(data, graph_type, params):
+    """PNG bytes of a chart, rendered once per dataset, type and params."""
+    key = (data['dataset_id'], CHART_VERSION, graph_type, params)
+    def render():
+        png = render_graph(data, graph_type, params)
+        charts.put(key, png)
+        return png
+    
+    # A profiled request draws the chart itself, so its profile shows the drawing
+    if profiler.active():
+        return render()
+    png = charts.get(key)
+    if png is None:
+        png = chart_flights.do(key, render)
+    return png
+
+def graph_url(data, graph_type, params):
+    return url_for('graph_image', graph_type=graph_type, dataset=data['dataset_id'], v=CHART_VERSION,
+                   **{name: list(value) if isinstance(value, tuple) else value for name, value in params})
+
+@app.route('/generate_graph', methods=['POST'])
+@profiled
+def generate_graph():
+    data = current_dataset()
+    if data is None:
+        return jsonify({'error': 'No data has been analyzed yet. Please upload a file first.'})
     
-    # Improve layout
-    plt.tight_layout()
+    graph_type = request.json.get('type', '')
+    params = request_graph_params(graph_type)
     
-    # Remove top and right spines
-    plt.gca().spines['top'].set_visible(False)
-    plt.gca().spines['right'].set_visible(False)
+    # format=data returns the numbers behind the chart for the browser to draw
+    if request.json.get('format') == 'data':
+        try:
+            with chart_seconds.time(graph_type=graph_label(graph_type), stage='series'):
+                series = graph_series(data, graph_type, params)
+        except GraphError as e:
+            return jsonify({'error': str(e)})
+        return jsonify({'type': graph_type, 'params': dict(params), 'series': compact_series(series)})
     
-    # Save the plot to a bytes buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=100)
-    buffer.seek(0)
+    try:
+        # Render now so errors are reported here and the image request is a cache hit
+        cached_graph(data, graph_type, params)
+    except (GraphError, ChartError) as e:
+        return jsonify({'error': str(e)})
+    return jsonify({'image_url': graph_url(data, graph_type, params)})
+
+@app.route('/graph/<graph_type>.png')
+def graph_image(graph_type):
+    data = datasets.get(request.args.get('dataset', ''))
+    if data is None:
+        return jsonify({'error': 'Unknown dataset. Please upload the file again.'}), 404
     
-    # Encode the image to base64
-    image_png = buffer.getvalue()
-    buffer.close()
-    encoded = base64.b64encode(image_png).decode('utf-8')
+    try:
+        png = cached_graph(data, graph_type, request_graph_params(graph_type))
+    except GraphError as e:
+        return jsonify({'error': str(e)}), 404
+    except ChartError as e:
+        return jsonify({'error': str(e)}), 503
+    
+    response = Response(png, mimetype='image/png')
+    response.set_etag(hashlib.sha256(png).hexdigest())
+    if request.args.get('v') == str(CHART_VERSION):
+        # The URL names the dataset by content hash and the renderer by version, so the image behind it never changes
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        # URLs from before a renderer change get the current image, to be revalidated next time
+        response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+# Questions users start with after an upload: the suggested replies and the common analyses
+STANDARD_QUESTIONS = [
+    "show me a supplier price comparison",
+    "show me the best deals",
+    "plot price trends over time",
+    "chart car category prices",
+    "which supplier has the lowest prices?",
+    "what is the most affordable car category?",
+    "which day of the week has the lowest rates?",
+    "are weekends more expensive than weekdays?",
+]
+
+# Progress of the precomputation for each recently uploaded dataset
+precompute_jobs = LRUCache(app.config['PRECOMPUTE_STATUS_SIZE'])
+precompute_lock = threading.Lock()
+# One dataset at a time, so precomputing never takes more than one thread from requests
+precompute_executor = ThreadPoolExecutor(1, thread_name_prefix='precompute')
+
+def standard_questions(data):
+    questions = list(STANDARD_QUESTIONS)
+    websites = data['summary'].get('websites') or []
+    if len(websites) > 1:
+        questions.append(f"is {websites[0]} or {websites[1]} offering better deals?")
+    return questions
+
+def standard_charts(data):
+    """The eight dashboard charts as (graph type, params), or those of them a streamed dataset has.
+    
+    The two that take parameters compare the two cheapest suppliers across categories, and
+    the cheapest category with the most expensive one.
+    """
+    import pandas as pd
+    charts = [('price_by_supplier', ()), ('best_deals', ()), ('price_by_date', ()), ('price_by_category', ()),
+              ('weekend_weekday_comparison', ()), ('weekly_comparison', ())]
+    suppliers = pd.Series(data['aggs'].get('avg_by_supplier', {}), dtype=float).dropna().sort_values()
+    if len(suppliers) > 1:
+        charts.append(('supplier_comparison', graph_params('supplier_comparison',
+                                                           {'suppliers': suppliers.index[:2], 'category': ''})))
+    categories = pd.Series(data['aggs'].get('avg_by_category', {}), dtype=float).dropna().sort_values()
+    if len(categories) > 1:
+        charts.append(('category_price_difference', graph_params('category_price_difference',
+                                                                 {'categories': categories.index[[0, -1]]})))
+    if data['df'] is None:
+        # Streamed datasets only have the aggregations to draw from
+        charts = [chart for chart in charts if chart[0] in AGGREGATE_GRAPHS]
+    return charts
+
+def update_precompute(dataset_id, **changes):
+    with precompute_lock:
+        status = precompute_jobs.get(dataset_id)
+        if status is not None:
+            status.update(changes)
+
+def start_precompute(data):
+    """Queue precompute(data), unless this dataset is already queued or in progress."""
+    dataset_id = data['dataset_id']
+    with precompute_lock:
+        status = precompute_jobs.get(dataset_id)
+        if status is not None and status['state'] != 'done':
+            return
+        precompute_jobs.put(dataset_id, {'state': 'queued', 'total': 0, 'completed': 0, 'failed': [],
+                                         'seconds': None})
+    precompute_executor.submit(precompute, data)
+
+def precompute(data):
+    """Answer the standard questions and render the standard charts into their caches."""
+    dataset_id = data['dataset_id']
+    tasks = [('question', question, None) for question in standard_questions(data)]
+    tasks += [('chart', graph_type, params) for graph_type, params in standard_charts(data)]
+    update_precompute(dataset_id, state='running', total=len(tasks))
+    
+    start = time.perf_counter()
+    failed = []
+    for completed, (kind, name, params) in enumerate(tasks, 1):
+        try:
+            if kind == 'question':
+                answer_question(name, data)
+            else:
+                cached_graph(data, name, params)
+        except Exception as e:
+            # Whatever failed here is computed again when it is asked for
+            failed.append({kind: name, 'error': str(e)})
+        update_precompute(dataset_id, completed=completed, failed=list(failed))
     
-    return jsonify({'image': encoded})
+    seconds = round(time.perf_counter() - start, 2)
+    update_precompute(dataset_id, state='done', seconds=seconds)
+    print(f"Precomputed {len(tasks)} answers and charts for dataset {dataset_id[:12]} in {seconds}s")
+
+@app.route('/precompute/<dataset_id>')
+def precompute_status(dataset_id):
+    """Progress of the precomputation started by uploading a dataset."""
+    with precompute_lock:
+        status = precompute_jobs.get(dataset_id)
+        if status is None:
+            return jsonify({'error': 'Nothing has been precomputed for this dataset.'}), 404
+        return jsonify(status)
+
+def price_by_supplier_series(data):
+    import pandas as pd
+    # Average price by supplier
+    supplier_prices = pd.Series(data['aggs']['avg_by_supplier']).sort_values()
+    return {'suppliers': supplier_prices.index.tolist(), 'prices': supplier_prices.tolist()}
+
+def price_by_date_series(data):
+    import pandas as pd
+    # Average price by date
+    date_prices = pd.Series(data['aggs']['avg_by_date']).sort_index()
+    return {'dates': date_prices.index.tolist(), 'prices': date_prices.tolist()}
 
-def generate_supplier_comparison_graph(suppliers, category):
-    df = analyzed_data['df']
+def price_by_category_series(data):
+    import pandas as pd
+    # Average price by car category, top 15 categories for better visualization
+    top_categories = pd.Series(data['aggs']['avg_by_category']).sort_values().tail(15)
+    return {'categories': top_categories.index.tolist(), 'prices': top_categories.tolist()}
+
+def supplier_comparison_series(data, suppliers, category):
+    from models.analysis import dated_rows, day_labels
+    df = data['df']
     
     if not category:
         # Filter only for the specified suppliers
         filtered_data = df[df['WebsiteSupplier'].isin(suppliers)]
         
         # Calculate average price by supplier and car category
-        comparison_data = filtered_data.groupby(['WebsiteSupplier', 'WebsiteCarCategory'])['InclusiveRate'].mean().unstack()
+        comparison_data = filtered_data.groupby(['WebsiteSupplier', 'WebsiteCarCategory'], observed=True)['InclusiveRate'].mean().unstack()
+        labels = [str(label) for label in comparison_data.columns]
     else:
         # Filter for the specified suppliers and category
         filtered_data = df[(df['WebsiteSupplier'].isin(suppliers)) & 
-                          (df['WebsiteCarCategory'].str.contains(category, case=False))]
+                          data['vocab'].rows(df, 'WebsiteCarCategory', category)]
         
         # Calculate average price by supplier and pickup date
-        comparison_data = filtered_data.groupby(['WebsiteSupplier', filtered_data['PickUpDate'].dt.strftime('%Y-%m-%d')])['InclusiveRate'].mean().unstack()
-    
-    # Set the style
-    plt.style.use('seaborn-v0_8-whitegrid')
-    
-    # Create the plot
-    plt.figure(figsize=(12, 8))
-    
-    # Create a better color palette
-    colors = sns.color_palette("Set2", len(comparison_data.index))
-    
-    # Plot with better styling
-    for i, supplier in enumerate(comparison_data.index):
-        plt.plot(comparison_data.columns, comparison_data.loc[supplier], 
-                 marker='o', linestyle='-', linewidth=2, color=colors[i], 
-                 markerfacecolor='white', markeredgecolor=colors[i], 
-                 markeredgewidth=2, markersize=8, label=supplier)
-    
-    # Improve styling
-    plt.title(f'Price Comparison for {category if category else "All Categories"}', 
-              fontsize=14, fontweight='bold')
-    plt.xlabel('Date' if category else 'Car Category', fontsize=12)
-    plt.ylabel('Average Price ($)', fontsize=12)
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.legend(title='Supplier', fontsize=10, title_fontsize=12)
-    
-    if len(comparison_data.columns) > 10:
-        plt.xticks(rotation=45, ha='right', fontsize=10)
-    
-    # Remove top and right spines
-    plt.gca().spines['top'].set_visible(False)
-    plt.gca().spines['right'].set_visible(False)
-    
-    # Improve layout
-    plt.tight_layout()
-    
-    # Save the plot to a bytes buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=100)
-    buffer.seek(0)
-    
-    # Encode the image to base64
-    image_png = buffer.getvalue()
-    buffer.close()
-    encoded = base64.b64encode(image_png).decode('utf-8')
-    
-    return jsonify({'image': encoded})
+        filtered_data = dated_rows(filtered_data)
+        comparison_data = filtered_data.groupby(['WebsiteSupplier', 'PickUpOrdinal'], observed=True)['InclusiveRate'].mean().unstack()
+        labels = day_labels(comparison_data.columns).tolist()
+    
+    return {
+        'category': category,
+        'labels': labels,
+        'suppliers': {str(supplier): prices.tolist() for supplier, prices in comparison_data.iterrows()}
+    }
 
-def generate_weekend_weekday_comparison():
-    df = analyzed_data['df']
-    
-    # Add day of week
-    df['DayOfWeek'] = df['PickUpDate'].dt.day_name()
-    
-    # Classify as weekend or weekday
-    df['IsWeekend'] = df['PickUpDate'].dt.dayofweek >= 5
-    
-    # Calculate average prices
-    weekend_price = df[df['IsWeekend']]['InclusiveRate'].mean()
-    weekday_price = df[~df['IsWeekend']]['InclusiveRate'].mean()
-    
-    # Create a DataFrame for easier plotting
-    comparison_df = pd.DataFrame({
-        'Period': ['Weekday', 'Weekend'],
-        'Average Price': [weekday_price, weekend_price]
-    })
-    
-    # Set the style
-    plt.style.use('seaborn-v0_8-whitegrid')
-    
-    # Create the plot with a larger figure
-    plt.figure(figsize=(10, 7))
-    
-    # Use nicer colors
-    colors = ['#3498db', '#e74c3c']
-    
-    # Create bar chart
-    bars = plt.bar(comparison_df['Period'], comparison_df['Average Price'], color=colors, width=0.6)
-    
-    # Improve styling
-    plt.ylabel('Average Price ($)', fontsize=12)
-    plt.title('Weekend vs Weekday Average Rental Prices', fontsize=14, fontweight='bold')
-    
-    # Add price labels
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height + 2,
-                f'${height:.2f}',
-                ha='center', va='bottom', fontsize=11)
-    
-    # Highlight price difference
-    price_diff = abs(weekend_price - weekday_price)
-    diff_percent = (price_diff / min(weekend_price, weekday_price)) * 100
-    
-    if weekend_price > weekday_price:
-        plt.text(0.5, 0.5, f"Weekends are ${price_diff:.2f} more expensive\n({diff_percent:.1f}% higher)", 
-                 ha='center', va='center', transform=plt.gca().transAxes, 
-                 bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'), 
-                 fontsize=12)
-    else:
-        plt.text(0.5, 0.5, f"Weekdays are ${price_diff:.2f} more expensive\n({diff_percent:.1f}% higher)", 
-                 ha='center', va='center', transform=plt.gca().transAxes, 
-                 bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'), 
-                 fontsize=12)
-    
-    # Add a light grid
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    
-    # Improve layout
-    plt.tight_layout()
-    
-    # Remove top and right spines
-    plt.gca().spines['top'].set_visible(False)
-    plt.gca().spines['right'].set_visible(False)
-    
-    # Save the plot to a bytes buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=100)
-    buffer.seek(0)
-    
-    # Encode the image to base64
-    image_png = buffer.getvalue()
-    buffer.close()
-    encoded = base64.b64encode(image_png).decode('utf-8')
-    
-    return jsonify({'image': encoded})
-
-def generate_best_deals_graph():
-    df = analyzed_data['df']
-    aggs = analyzed_data['aggs']
-    
-    # Find deals below average price by category
-    deals = []
-    threshold = 30  # 30% below average
-    
-    for category, avg_price in aggs['avg_by_category'].items():
-        category_data = df[df['WebsiteCarCategory'] == category]
-        for _, row in category_data.iterrows():
-            discount = (avg_price - row['InclusiveRate']) / avg_price * 100
-            if discount > threshold:
-                deals.append({
-                    'category': category,
-                    'supplier': row['WebsiteSupplier'],
-                    'vehicle': row['VehicleName'],
-                    'price': row['InclusiveRate'],
-                    'avg_price': avg_price,
-                    'discount': discount,
-                    'date': row['PickUpDate'].strftime('%Y-%m-%d')
-                })
-    
-    # Sort by discount percentage
-    deals.sort(key=lambda x: x['discount'], reverse=True)
-    
-    # Take top 10 deals
-    top_deals = deals[:10]
-    
-    # Create a DataFrame
-    deals_df = pd.DataFrame(top_deals)
-    
-    # Set the style
-    plt.style.use('seaborn-v0_8-whitegrid')
-    
-    # Create the plot with a larger figure
-    plt.figure(figsize=(14, 8))
-    
-    # Create bar chart of discounts
-    labels = [f"{row['supplier']} - {row['vehicle'][:15]}..." for _, row in deals_df.iterrows()]
-    discount_bars = plt.barh(labels, deals_df['discount'], color='#27ae60')
-    
-    # Add price comparison on the same plot
-    for i, (_, row) in enumerate(deals_df.iterrows()):
-        plt.text(row['discount'] + 2, i, 
-                 f"${row['price']:.2f} vs. avg ${row['avg_price']:.2f}", 
-                 va='center', fontsize=9)
-    
-    # Improve styling
-    plt.xlabel('Discount Percentage (%)', fontsize=12)
-    plt.title('Top 10 Car Rental Deals (% Below Average Price)', fontsize=14, fontweight='bold')
-    
-    # Add percentage labels
-    for bar in discount_bars:
-        width = bar.get_width()
-        plt.text(width - 5, bar.get_y() + bar.get_height()/2.,
-                f"{width:.1f}%",
-                ha='right', va='center', fontsize=9, color='white', fontweight='bold')
-    
-    # Improve layout
-    plt.tight_layout()
-    plt.grid(axis='x', linestyle='--', alpha=0.7)
-    
-    # Remove top and right spines
-    plt.gca().spines['top'].set_visible(False)
-    plt.gca().spines['right'].set_visible(False)
-    
-    # Save the plot to a bytes buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=100)
-    buffer.seek(0)
-    
-    # Encode the image to base64
-    image_png = buffer.getvalue()
-    buffer.close()
-    encoded = base64.b64encode(image_png).decode('utf-8')
-    
-    return jsonify({'image': encoded})
-
-def generate_category_price_difference(categories):
-    df = analyzed_data['df']
-    
-    if not categories or len(categories) < 2:
-        # Default to comparing economy and luxury
-        categories = ['Economy', 'Luxury']
-    
-    # Filter data for the requested categories
-    category_data = {}
-    all_prices = []
+def weekend_weekday_comparison_series(data):
+    # Average weekend and weekday prices
+    return dict(data['aggs']['weekend_weekday'])
+
+def best_deals_series(data):
+    from models.analysis import find_deals
+    df = data['df']
+    avg_by_category = data['aggs']['avg_by_category']
+    
+    # Top 10 deals more than 30% below their category's average price
+    _, deals = find_deals(df, 30, 10)
+    return {'deals': [{
+        'supplier': str(deal.WebsiteSupplier),
+        'vehicle': str(deal.VehicleName),
+        'price': deal.InclusiveRate,
+        'avg_price': avg_by_category[deal.WebsiteCarCategory],
+        'discount': deal.Discount
+    } for deal in deals.itertuples()]}
+
+def category_price_difference_series(data, categories):
+    df = data['df']
     
+    # Average price of each requested category that has data
+    category_prices = {}
     for category in categories:
-        filtered = df[df['WebsiteCarCategory'].str.contains(category, case=False)]
+        filtered = df[data['vocab'].rows(df, 'WebsiteCarCategory', category)]
         if not filtered.empty:
-            avg_price = filtered['InclusiveRate'].mean()
-            category_data[category] = {
-                'avg_price': avg_price,
-                'min_price': filtered['InclusiveRate'].min(),
-                'max_price': filtered['InclusiveRate'].max(),
-                'count': len(filtered),
-                'suppliers': filtered['WebsiteSupplier'].nunique()
-            }
-            all_prices.append(avg_price)
-    
-    if len(category_data) < 2:
-        return jsonify({'error': 'Could not find enough data for the requested categories'})
-    
-    # Set the style
-    plt.style.use('seaborn-v0_8-whitegrid')
-    
-    # Create the plot with a larger figure
-    plt.figure(figsize=(12, 8))
-    
-    # Create a comparison chart with multiple segments
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 7), gridspec_kw={'width_ratios': [2, 1]})
-    
-    # 1. Price bars on the left
-    categories_list = list(category_data.keys())
-    avg_prices = [category_data[cat]['avg_price'] for cat in categories_list]
-    
-    colors = sns.color_palette("viridis", len(categories_list))
-    bars = ax1.bar(categories_list, avg_prices, color=colors)
-    
-    # Add price labels
-    for bar in bars:
-        height = bar.get_height()
-        ax1.text(bar.get_x() + bar.get_width()/2., height + 5,
-                f'${height:.2f}',
-                ha='center', va='bottom', fontsize=10)
-    
-    # Improve left subplot
-    ax1.set_ylabel('Average Price ($)', fontsize=12)
-    ax1.set_title('Average Prices by Category', fontsize=13)
-    ax1.grid(axis='y', linestyle='--', alpha=0.7)
-    
-    # 2. Price difference on the right
-    price_diffs = []
-    labels = []
-    for i in range(len(categories_list)):
-        for j in range(i+1, len(categories_list)):
-            cat1, cat2 = categories_list[i], categories_list[j]
-            price1, price2 = category_data[cat1]['avg_price'], category_data[cat2]['avg_price']
-            diff = abs(price1 - price2)
-            pct_diff = (diff / min(price1, price2)) * 100
-            price_diffs.append(diff)
-            labels.append(f"{cat1} vs {cat2}")
-            
-            # Add percent diff annotation
-            higher = cat1 if price1 > price2 else cat2
-            ax2.text(0.5, 0.3 + 0.2*len(price_diffs), 
-                      f"{higher} is {pct_diff:.1f}% more expensive", 
-                      ha='center', va='center', transform=ax2.transAxes, 
-                      bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'), 
-                      fontsize=10)
-    
-    # Plot the differences
-    diff_bars = ax2.bar(labels, price_diffs, color='#3498db')
-    
-    # Add difference labels
-    for bar in diff_bars:
-        height = bar.get_height()
-        ax2.text(bar.get_x() + bar.get_width()/2., height + 2,
-                f'${height:.2f}',
-                ha='center', va='bottom', fontsize=10)
-    
-    # Improve right subplot
-    ax2.set_ylabel('Price Difference ($)', fontsize=12)
-    ax2.set_title('Price Differences Between Categories', fontsize=13)
-    ax2.tick_params(axis='x', rotation=45)
-    ax2.grid(axis='y', linestyle='--', alpha=0.7)
-    
-    # Overall figure improvements
-    plt.suptitle(f'Price Comparison: {" vs ".join(categories_list)}', fontsize=14, fontweight='bold')
-    
-    # Remove top and right spines
-    for ax in [ax1, ax2]:
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-    
-    # Improve layout
-    plt.tight_layout()
-    
-    # Save the plot to a bytes buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=100)
-    plt.close(fig)  # Close this figure to avoid warnings
-    buffer.seek(0)
-    
-    # Encode the image to base64
-    image_png = buffer.getvalue()
-    buffer.close()
-    encoded = base64.b64encode(image_png).decode('utf-8')
-    
-    return jsonify({'image': encoded})
-
-def generate_weekly_comparison():
-    df = analyzed_data['df']
+            category_prices[category] = filtered['InclusiveRate'].mean()
+    
+    if len(category_prices) < 2:
+        raise GraphError('Could not find enough data for the requested categories')
+    
+    return {'categories': list(category_prices), 'prices': list(category_prices.values())}
+
+def weekly_comparison_series(data):
+    from models.analysis import date_slice
+    df = data['df']
     
     # Get all dates
     min_date = df['PickUpDate'].min()
     max_date = df['PickUpDate'].max()
     
     # Define weeks
-    first_week_start = min_date
-    first_week_end = min_date + timedelta(days=6)
-    last_week_start = max_date - timedelta(days=6)
-    last_week_end = max_date
-    
-    # Filter by week
-    first_week_data = df[(df['PickUpDate'] >= first_week_start) & (df['PickUpDate'] <= first_week_end)]
-    last_week_data = df[(df['PickUpDate'] >= last_week_start) & (df['PickUpDate'] <= last_week_end)]
-    
-    # Calculate daily averages for each week
-    first_week_daily = first_week_data.groupby(first_week_data['PickUpDate'].dt.strftime('%Y-%m-%d'))['InclusiveRate'].mean()
-    last_week_daily = last_week_data.groupby(last_week_data['PickUpDate'].dt.strftime('%Y-%m-%d'))['InclusiveRate'].mean()
-    
-    # Calculate overall averages
-    first_week_avg = first_week_data['InclusiveRate'].mean()
-    last_week_avg = last_week_data['InclusiveRate'].mean()
-    
-    # Set the style
-    plt.style.use('seaborn-v0_8-whitegrid')
-    
-    # Create the plot with a larger figure
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10), gridspec_kw={'height_ratios': [2, 1]})
-    
-    # Plot daily averages on top subplot
-    ax1.plot(range(len(first_week_daily)), first_week_daily.values, 'o-', label=f'First Week ({first_week_start.strftime("%b %d")} - {first_week_end.strftime("%b %d")})', color='#3498db')
-    ax1.plot(range(len(last_week_daily)), last_week_daily.values, 'o-', label=f'Last Week ({last_week_start.strftime("%b %d")} - {last_week_end.strftime("%b %d")})', color='#e74c3c')
-    
-    # Add data labels
-    for i, (price1, price2) in enumerate(zip(first_week_daily.values, last_week_daily.values)):
-        ax1.text(i, price1 + 2, f'${price1:.2f}', ha='center', va='bottom', fontsize=9, color='#3498db')
-        ax1.text(i, price2 + 2, f'${price2:.2f}', ha='center', va='bottom', fontsize=9, color='#e74c3c')
-    
-# Improve top subplot
-    ax1.set_ylabel('Average Daily Price ($)', fontsize=12)
-    ax1.set_title('Daily Price Comparison: First Week vs Last Week', fontsize=14)
-    ax1.set_xticks(range(len(first_week_daily)))
-    ax1.set_xticklabels([f'Day {i+1}' for i in range(len(first_week_daily))], rotation=45)
-    ax1.legend()
-    ax1.grid(True, linestyle='--', alpha=0.7)
-    
-    # Plot overall averages on bottom subplot
-    weeks = ['First Week', 'Last Week']
-    avgs = [first_week_avg, last_week_avg]
-    colors = ['#3498db', '#e74c3c']
-    
-    bars = ax2.bar(weeks, avgs, color=colors)
-    
-    # Add price labels
-    for bar in bars:
-        height = bar.get_height()
-        ax2.text(bar.get_x() + bar.get_width()/2., height + 2,
-                f'${height:.2f}',
-                ha='center', va='bottom', fontsize=10)
-    
-    # Calculate and show price difference
-    price_diff = abs(first_week_avg - last_week_avg)
-    diff_percent = (price_diff / min(first_week_avg, last_week_avg)) * 100
-    
-    if last_week_avg > first_week_avg:
-        ax2.text(0.5, 0.8, f"Last week is ${price_diff:.2f} more expensive\n({diff_percent:.1f}% higher)", 
-                ha='center', va='center', transform=ax2.transAxes, 
-                bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'), 
-                fontsize=10)
-    else:
-        ax2.text(0.5, 0.8, f"First week is ${price_diff:.2f} more expensive\n({diff_percent:.1f}% higher)", 
-                ha='center', va='center', transform=ax2.transAxes, 
-                bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'), 
-                fontsize=10)
-    
-    # Improve bottom subplot
-    ax2.set_ylabel('Average Price ($)', fontsize=12)
-    ax2.set_title('Overall Weekly Price Comparison', fontsize=14)
-    ax2.grid(axis='y', linestyle='--', alpha=0.7)
-    
-    # Remove top and right spines
-    for ax in [ax1, ax2]:
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-    
-    # Improve layout
-    plt.tight_layout()
-    
-    # Save the plot to a bytes buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=100)
-    plt.close(fig)
-    buffer.seek(0)
-    
-    # Encode the image to base64
-    image_png = buffer.getvalue()
-    buffer.close()
-    encoded = base64.b64encode(image_png).decode('utf-8')
-    
-    return jsonify({'image': encoded})
+    weeks = {
+        'first_week': (min_date, min_date + timedelta(days=6)),
+        'last_week': (max_date - timedelta(days=6), max_date)
+    }
+    
+    series = {}
+    for week, (start, end) in weeks.items():
+        week_data = date_slice(df, start, end)
+        series[week] = {
+            'label': f'{start.strftime("%b %d")} - {end.strftime("%b %d")}',
+            'daily': week_data.groupby('PickUpOrdinal')['InclusiveRate'].mean().tolist(),
+            'average': week_data['InclusiveRate'].mean()
+        }
+    return series
 
 if __name__ == '__main__':
     app.run(debug=True, port=5002)
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""ASGI entry point in which waiting on Ollama doesn't hold a thread.
+
+    uvicorn asgi:application --port 5002
+
+/chat and /chat/stream are handled natively: Ollama is awaited through AsyncOllamaClient and
+only data questions, which are pandas work, run in a worker thread. Requests asking to be
+profiled go to the Flask views instead, which profile them in one thread. Every other route is the
+Flask app from app.py behind a2wsgi's WSGI adapter, which runs it on a pool of WSGI_THREADS
+threads. Needs the optional a2wsgi, httpx and uvicorn packages:
+
+    pip install -r requirements-asgi.txt
+"""
+import asyncio
+import json
+import os
+import time
+from contextlib import aclosing
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.wrappers import Request
+
+from app import (app, data_reply, datasets, llm_cache, llm_errors, llm_first_token_seconds, llm_seconds,
+                 normalize_prompt, profiling_requested, request_seconds, sse_event, stop_chart_pool)
+from llm_client import AsyncOllamaClient, LLMError
+from singleflight import AsyncSingleFlight
+
+WSGI_THREADS = int(os.environ.get('WSGI_THREADS', 8))
+
+# The whole Flask app on a fixed pool of threads; served on its own, it is the synchronous
+# baseline where every chat waiting on Ollama holds one of them
+wsgi_application = WSGIMiddleware(app, workers=WSGI_THREADS)
+
+llm = AsyncOllamaClient(app.config['OLLAMA_URL'], app.config['OLLAMA_MODEL'],
+                        connect_timeout=app.config['OLLAMA_CONNECT_TIMEOUT'],
+                        read_timeout=app.config['OLLAMA_READ_TIMEOUT'],
+                        retries=app.config['OLLAMA_RETRIES'])
+
+# app.llm_flights for the event loop
+llm_flights = AsyncSingleFlight()
+
+def request_dataset(payload, headers):
+    """app.current_dataset for an ASGI request: the dataset_id sent with it, else the session's."""
+    dataset_id = payload.get('dataset_id')
+    if not dataset_id:
+        cookies = Request({'HTTP_COOKIE': headers.get(b'cookie', b'').decode('latin-1')})
+        session = app.session_interface.open_session(app, cookies)
+        dataset_id = session.get('dataset_id') if session else None
+    return datasets.get(dataset_id) if dataset_id else None
+
+def request_data_reply(payload, headers):
+    # A request context of its own, for url_for in the image URLs of chart replies
+    with app.test_request_context():
+        return data_reply(payload.get('message', ''), request_dataset(payload, headers))
+
+async def general_reply(question):
+    """app.general_reply, awaiting Ollama."""
+    prompt = normalize_prompt(question)
+    reply = llm_cache.get(llm.model, prompt)
+    if reply is None:
+        async def generate():
+            try:
+                with llm_seconds.time(call='generate'):
+                    reply = await llm.generate(question)
+            except LLMError:
+                llm_errors.inc(call='generate')
+                raise
+            if reply:
+                llm_cache.put(llm.model, prompt, reply)
+            return reply
+        reply = await llm_flights.do(('generate', llm.model, prompt), generate)
+    return reply
+
+async def general_reply_stream(question):
+    """app.general_reply_stream, awaiting Ollama."""
+    prompt = normalize_prompt(question)
+    reply = llm_cache.get(llm.model, prompt)
+    if reply is not None:
+        yield reply
+        return
+
+    async def stream():
+        start = time.perf_counter()
+        pieces = []
+        try:
+            async for token in llm.stream(question):
+                if not pieces:
+                    llm_first_token_seconds.observe(time.perf_counter() - start)
+                pieces.append(token)
+                yield token
+        except LLMError:
+            llm_errors.inc(call='stream')
+            raise
+        finally:
+            llm_seconds.observe(time.perf_counter() - start, call='stream')
+        if pieces:
+            llm_cache.put(llm.model, prompt, ''.join(pieces))
+    async with aclosing(llm_flights.stream(('stream', llm.model, prompt), stream)) as tokens:
+        async for token in tokens:
+            yield token
+
+async def read_json(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return json.loads(body or b'{}')
+
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload).encode()
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def chat(scope, receive, send):
+    """/chat from app.py."""
+    try:
+        payload = await read_json(receive)
+    except ValueError:
+        return await send_json(send, {'error': 'Invalid JSON'}, 400)
+
+    reply = await asyncio.to_thread(request_data_reply, payload, dict(scope['headers']))
+    if reply is not None:
+        return await send_json(send, reply)
+
+    try:
+        reply = await general_reply(payload.get('message', ''))
+        await send_json(send, {'response': reply or 'Sorry, I could not generate a response.'})
+    except LLMError as e:
+        await send_json(send, {'response': str(e)})
+
+async def chat_stream(scope, receive, send):
+    """/chat/stream from app.py. Stops reading from Ollama if the browser goes away."""
+    start = time.perf_counter()
+    try:
+        payload = await read_json(receive)
+    except ValueError:
+        return await send_json(send, {'error': 'Invalid JSON'}, 400)
+
+    def elapsed_ms():
+        return round((time.perf_counter() - start) * 1000, 1)
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    async def emit(event, data):
+        await send({'type': 'http.response.body', 'body': sse_event(event, data).encode(), 'more_body': True})
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream; charset=utf-8'),
+                                (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+
+        first_token_ms = None
+        reply = await asyncio.to_thread(request_data_reply, payload, dict(scope['headers']))
+        if reply is not None:
+            await emit('answer', reply)
+            first_token_ms = elapsed_ms()
+        else:
+            try:
+                async with aclosing(general_reply_stream(payload.get('message', ''))) as tokens:
+                    async for token in tokens:
+                        if disconnected.is_set():
+                            print(f"Chat stream abandoned by the client after {elapsed_ms()} ms")
+                            return
+                        if first_token_ms is None:
+                            first_token_ms = elapsed_ms()
+                        await emit('token', {'token': token})
+            except LLMError as e:
+                await emit('error', {'response': str(e)})
+
+        await emit('done', {'ttft_ms': first_token_ms, 'total_ms': elapsed_ms()})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+
+CHAT_ROUTES = {'/chat': chat, '/chat/stream': chat_stream}
+
+async def timed_route(handler, scope, receive, send):
+    """Run a native route, timed up to the start of its response like app.record_request_time."""
+    start = time.perf_counter()
+
+    async def timed_send(message):
+        if message['type'] == 'http.response.start':
+            request_seconds.observe(time.perf_counter() - start, endpoint=handler.__name__,
+                                    method=scope['method'], status=message['status'])
+        await send(message)
+    await handler(scope, receive, timed_send)
+
+def wants_profile(scope):
+    # Profiling is done by the Flask views, which handle the whole request in one thread
+    header = next((value for name, value in scope['headers'] if name == b'x-profile'), b'')
+    return profiling_requested(header.decode('latin-1'))
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await llm.aclose()
+            # uvicorn re-raises SIGTERM once shut down, so atexit won't get to stop them
+            stop_chart_pool()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if (scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] in CHAT_ROUTES
+            and not wants_profile(scope)):
+        return await timed_route(CHAT_ROUTES[scope['path']], scope, receive, send)
+    await wsgi_application(scope, receive, send)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(application, port=5002)
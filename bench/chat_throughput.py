@@ -0,0 +1,125 @@
+"""Throughput of mixed /chat traffic, served synchronously and by the async mode in asgi.py.
+
+Starts uvicorn twice against a fake Ollama that takes `latency` seconds per reply: once with
+the plain Flask app on WSGI_THREADS threads (asgi:wsgi_application) and once with
+asgi:application. Clients send a mix of data questions about csv_file and general
+questions, each general question unique so the reply cache never answers it.
+
+Usage: python bench/chat_throughput.py csv_file [clients] [requests] [general_fraction] [latency]
+"""
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_ollama import FakeOllama
+
+DATA_QUESTIONS = [
+    "which supplier has the lowest prices?",
+    "what is the most affordable car category?",
+    "which day of the week has the lowest rates?",
+    "are weekends more expensive than weekdays?",
+    "what are the price differences between websites?",
+    "how do prices change throughout april?",
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 1) if values else None
+
+
+def run(target, csv_file, clients, count, general_fraction, ollama_url):
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix='chat-throughput-')  # Fresh uploads/ and reply cache
+    env = dict(os.environ, PYTHONPATH=ROOT, OLLAMA_URL=ollama_url, CHART_WORKERS='0')
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', target, '--port', str(port),
+                               '--log-level', 'warning'], cwd=workdir, env=env,
+                              stdout=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    try:
+        for _ in range(100):
+            if server.poll() is not None:
+                sys.exit(f'{target} failed to start')
+            try:
+                requests.get(f'{base}/stats', timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        with open(csv_file, 'rb') as f:
+            dataset_id = requests.post(f'{base}/upload', files={'file': f}).json()['dataset_id']
+
+        rng = random.Random(0)
+        jobs = []
+        for i in range(count):
+            if rng.random() < general_fraction:
+                jobs.append(('general', f"what does an inclusive rate mean? (question {i})"))
+            else:
+                jobs.append(('data', rng.choice(DATA_QUESTIONS)))
+
+        session = requests.Session()
+        session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=clients))
+
+        def ask(job):
+            kind, message = job
+            start = time.perf_counter()
+            response = session.post(f'{base}/chat', json={'message': message, 'dataset_id': dataset_id})
+            response.raise_for_status()
+            return kind, (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as pool:
+            results = list(pool.map(ask, jobs))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {'seconds': round(elapsed, 2), 'requests_per_second': round(count / elapsed, 1)}
+    for kind in ('data', 'general'):
+        latencies = [ms for k, ms in results if k == kind]
+        report[kind] = {'requests': len(latencies), 'p50_ms': percentile(latencies, 0.5),
+                        'p95_ms': percentile(latencies, 0.95), 'max_ms': percentile(latencies, 1.0)}
+    return report
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    csv_file = sys.argv[1]
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 400
+    general_fraction = float(sys.argv[4]) if len(sys.argv) > 4 else 0.5
+    latency = float(sys.argv[5]) if len(sys.argv) > 5 else 1.0
+
+    with FakeOllama(latency=latency) as fake:
+        results = {target: run(target, csv_file, clients, count, general_fraction, fake.url)
+                   for target in ('asgi:wsgi_application', 'asgi:application')}
+    print(json.dumps({
+        'clients': clients,
+        'requests': count,
+        'general_fraction': general_fraction,
+        'ollama_latency_s': latency,
+        'wsgi_threads': int(os.environ.get('WSGI_THREADS', 8)),
+        'results': results
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Write a synthetic rate shopping CSV with the columns the analysis expects.
+
+Rates depend on the car category, the supplier, the website and the pickup weekday, plus
+noise, so every intent and chart has something to find. The same arguments always produce
+the same file.
+
+Usage: python bench/generate_data.py rows output.csv [--suppliers 8] [--categories 12]
+                                     [--websites 3] [--days 30] [--start 2026-04-01] [--seed 0]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# Names the intents and benchmark questions refer to come first
+SUPPLIERS = ['Hertz', 'Avis', 'Enterprise', 'Budget', 'Alamo', 'National', 'Dollar', 'Thrifty', 'Sixt',
+             'Fox', 'Payless', 'Advantage', 'Ace', 'Europcar', 'Zipcar', 'Routes']
+CATEGORIES = [('Economy', 38), ('Compact', 42), ('Midsize', 48), ('Standard', 52), ('Fullsize', 58),
+              ('Standard SUV', 70), ('Luxury', 110), ('Compact SUV', 60), ('Premium', 75), ('Minivan', 90),
+              ('Luxury SUV', 140), ('Mini', 35), ('Fullsize SUV', 85), ('Premium SUV', 105),
+              ('Convertible', 95), ('Pickup', 80)]
+WEBSITES = ['Expedia', 'Kayak', 'Priceline', 'Travelocity', 'Orbitz', 'Hotwire', 'Rentalcars', 'Costco Travel']
+VEHICLES = {
+    'Economy': ['Chevrolet Spark', 'Mitsubishi Mirage', 'Kia Rio'],
+    'Compact': ['Nissan Versa', 'Toyota Yaris', 'Hyundai Accent'],
+    'Midsize': ['Toyota Corolla', 'Hyundai Elantra', 'Kia Forte'],
+    'Standard': ['Volkswagen Jetta', 'Kia K5'],
+    'Fullsize': ['Toyota Camry', 'Chevrolet Malibu', 'Nissan Altima'],
+    'Standard SUV': ['Toyota RAV4', 'Ford Escape'],
+    'Luxury': ['Cadillac CT5', 'BMW 5 Series', 'Mercedes-Benz E-Class'],
+    'Compact SUV': ['Jeep Compass', 'Kia Seltos'],
+    'Premium': ['Chrysler 300', 'Nissan Maxima'],
+    'Minivan': ['Chrysler Pacifica', 'Toyota Sienna'],
+    'Luxury SUV': ['Cadillac Escalade', 'BMW X5'],
+    'Mini': ['Fiat 500'],
+    'Fullsize SUV': ['Chevrolet Tahoe', 'Ford Expedition'],
+    'Premium SUV': ['GMC Yukon', 'Jeep Grand Cherokee'],
+    'Convertible': ['Ford Mustang Convertible', 'Chevrolet Camaro Convertible'],
+    'Pickup': ['Ford F-150', 'Ram 1500'],
+}
+CHUNK_ROWS = 1_000_000  # Rows generated and written at a time, so 10M row files fit in memory
+
+
+def numbered(known, count, prefix):
+    """count names: the known ones first, then numbered ones."""
+    return known[:count] + [f'{prefix} {i}' for i in range(len(known) + 1, count + 1)]
+
+
+def generate(rows, output, suppliers=8, categories=12, websites=3, days=30, start='2026-04-01', seed=0):
+    """Write rows rows of rate shopping data to output."""
+    rng = np.random.default_rng(seed)
+    supplier_names = np.array(numbered(SUPPLIERS, suppliers, 'Supplier'))
+    website_names = np.array(numbered(WEBSITES, websites, 'Website'))
+    category_names = numbered([name for name, _ in CATEGORIES], categories, 'Category')
+    base_rates = dict(CATEGORIES)
+    base_rate = np.array([base_rates.get(name) or rng.uniform(35, 150) for name in category_names])
+
+    # Each category's vehicles, stored back to back
+    vehicle_lists = [VEHICLES.get(name) or [f'{name} Model {i}' for i in range(1, 4)] for name in category_names]
+    vehicle_names = np.array([vehicle for vehicles in vehicle_lists for vehicle in vehicles])
+    vehicle_counts = np.array([len(vehicles) for vehicles in vehicle_lists])
+    vehicle_offsets = np.concatenate([[0], np.cumsum(vehicle_counts)[:-1]])
+
+    # Some suppliers and websites are consistently cheaper than others
+    supplier_factor = rng.uniform(0.85, 1.2, size=suppliers)
+    website_factor = rng.uniform(0.97, 1.05, size=websites)
+    first_day = np.datetime64(start, 'D')
+
+    for offset in range(0, rows, CHUNK_ROWS):
+        n = min(CHUNK_ROWS, rows - offset)
+        supplier = rng.integers(suppliers, size=n)
+        category = rng.integers(categories, size=n)
+        website = rng.integers(websites, size=n)
+        day = rng.integers(days, size=n)
+        pickup = first_day + day.astype('timedelta64[D]')
+
+        # 1970-01-01 was a Thursday; weekday 5 and 6 are Saturday and Sunday
+        weekend = (pickup.astype('int64') + 3) % 7 >= 5
+        rate = (base_rate[category] * supplier_factor[supplier] * website_factor[website]
+                * np.where(weekend, 1.12, 1.0)
+                * (1 + 0.1 * np.sin(day / days * 2 * np.pi))
+                * rng.lognormal(0, 0.12, size=n))
+        vehicle = vehicle_offsets[category] + rng.integers(0, vehicle_counts[category])
+
+        chunk = pd.DataFrame({
+            'ShopDate': (pickup - rng.integers(1, 61, size=n).astype('timedelta64[D]')).astype(str),
+            'Website': website_names[website],
+            'WebsiteSupplier': supplier_names[supplier],
+            'WebsiteCarCategory': np.array(category_names)[category],
+            'VehicleName': vehicle_names[vehicle],
+            'InclusiveRate': rate.round(2),
+            'PickUpDate': pickup.astype(str),
+            'DropOffDate': (pickup + rng.integers(1, 8, size=n).astype('timedelta64[D]')).astype(str)
+        })
+        chunk.to_csv(output, mode='w' if offset == 0 else 'a', header=offset == 0, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('rows', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--suppliers', type=int, default=8)
+    parser.add_argument('--categories', type=int, default=12)
+    parser.add_argument('--websites', type=int, default=3)
+    parser.add_argument('--days', type=int, default=30, help='pickup dates span this many days')
+    parser.add_argument('--start', default='2026-04-01', help='first pickup date')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generate(args.rows, args.output, args.suppliers, args.categories, args.websites, args.days,
+             args.start, args.seed)
+    print(f"Wrote {args.rows} rows to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Compare CSV ingest time and memory for the untyped and the schema-aware loader.
+
+Usage: python bench/ingest.py path/to/rate_shop.csv
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from models.analysis import DATE_COLUMNS, load_rate_shop_csv
+
+
+def load_untyped(filename):
+    # The original ingest: infer every dtype and date format
+    df = pd.read_csv(filename)
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+
+def measure(loader, filename):
+    start = time.perf_counter()
+    df = loader(filename)
+    return {
+        'parse_seconds': round(time.perf_counter() - start, 4),
+        'memory_bytes': int(df.memory_usage(deep=True).sum()),
+        'rows': len(df),
+        'columns': len(df.columns)
+    }
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit(__doc__.strip())
+    filename = sys.argv[1]
+    before = measure(load_untyped, filename)
+    after = measure(load_rate_shop_csv, filename)
+    print(json.dumps({
+        'file': filename,
+        'file_bytes': os.path.getsize(filename),
+        'before': before,
+        'after': after,
+        'speedup': round(before['parse_seconds'] / after['parse_seconds'], 2),
+        'memory_ratio': round(before['memory_bytes'] / after['memory_bytes'], 2)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Per-intent match latency of the query_data dispatcher against trying every pattern in turn.
+
+Usage: python bench/intent_dispatch.py [repeat]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.analysis import INTENTS, match_intent
+
+# One question per intent, plus one that falls through to Ollama
+QUESTIONS = {
+    'visualization': "show me a chart of prices by supplier",
+    'cheapest_car': "what is the cheapest economy car available for april 5?",
+    'best_rates': "which supplier has the best rates for suv?",
+    'compare_websites': "is expedia or kayak offering better deals?",
+    'best_time_to_rent': "when is the best time to rent a compact car in april in 2025?",
+    'deals_below_average': "are there deals more than 20% below average?",
+    'compare_suppliers_for_category': "compare rates between hertz and avis for suv cars",
+    'category_price_difference': "what is the price difference between economy and luxury cars",
+    'cheapest_day_of_week': "which day of the week has the lowest rates?",
+    'most_affordable_category': "what is the most affordable car category?",
+    'luxury_under_price': "find luxury cars under $300",
+    'average_category_price': "what is the average price for a compact car?",
+    'cheapest_suppliers': "which supplier has the lowest prices?",
+    'compare_suppliers': "compare hertz and avis prices",
+    'best_value_category': "which car category has the best value?",
+    'supplier_cheaper': "how much cheaper is avis than hertz",
+    'website_differences': "what are the price differences between websites?",
+    'best_luxury_supplier': "which supplier offers the best luxury cars?",
+    'weekend_vs_weekday': "are weekends more expensive than weekdays?",
+    'month_price_trend': "how do prices change throughout april?",
+    'cheapest_date': "which date has the lowest average price?",
+    'compare_first_last_week': "compare first week vs last week of april prices",
+    None: "what's the weather like in berlin tomorrow and do i need an umbrella?",
+}
+
+
+def match_sequential(question):
+    # The original cascade: run every pattern in order until one matches
+    for intent in INTENTS:
+        match = intent.pattern.search(question)
+        if match:
+            return intent, match
+    return None, None
+
+
+def time_per_call(matcher, question, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        matcher(question)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    results = {}
+    for name, question in QUESTIONS.items():
+        intent, _ = match_intent(question)
+        matched = intent.name if intent else None
+        if matched != name:
+            sys.exit(f"{question!r} matched {matched}, expected {name}")
+        results[name or 'no_match'] = {
+            'dispatcher_us': round(time_per_call(match_intent, question, repeat), 2),
+            'sequential_us': round(time_per_call(match_sequential, question, repeat), 2)
+        }
+    print(json.dumps({'intents': len(INTENTS), 'repeat': repeat, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
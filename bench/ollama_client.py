@@ -0,0 +1,74 @@
+"""OllamaClient against the fake Ollama server: connection reuse, retries and timeouts.
+
+Usage: python bench/ollama_client.py [requests]
+"""
+import json
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama import FakeOllama
+from llm_client import LLMError, OllamaClient
+
+
+def timed(fn):
+    start = time.perf_counter()
+    try:
+        result = fn()
+    except LLMError as e:
+        result = e
+    return result, round((time.perf_counter() - start) * 1000, 1)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    report = {}
+
+    # Sequential calls over the pool against a new connection per call, as before
+    with FakeOllama() as fake:
+        client = OllamaClient(fake.url, 'llama3.2')
+        _, pooled_ms = timed(lambda: [client.generate('hi') for _ in range(count)])
+        report['pooled'] = {'ms_per_call': round(pooled_ms / count, 3), 'connections': fake.connections}
+
+    with FakeOllama() as fake:
+        url = f'{fake.url}/api/generate'
+        _, fresh_ms = timed(lambda: [requests.post(url, json={'model': 'llama3.2', 'prompt': 'hi', 'stream': False})
+                                     for _ in range(count)])
+        report['fresh_connections'] = {'ms_per_call': round(fresh_ms / count, 3), 'connections': fake.connections}
+
+    # Two 500s, then a reply: recovered by the retries after 0.1 + 0.2 s of backoff
+    with FakeOllama(failures=2) as fake:
+        client = OllamaClient(fake.url, 'llama3.2', retries=2, backoff=0.1)
+        result, ms = timed(lambda: client.generate('hi'))
+        report['retry_after_500s'] = {'ok': not isinstance(result, LLMError), 'ms': ms, 'requests': fake.requests}
+
+    # A model slower than the read timeout fails fast rather than pinning a worker
+    with FakeOllama(latency=2.0) as fake:
+        client = OllamaClient(fake.url, 'llama3.2', read_timeout=0.5)
+        result, ms = timed(lambda: client.generate('hi'))
+        report['read_timeout'] = {'error': str(result) if isinstance(result, LLMError) else None, 'ms': ms}
+
+    # Nothing listening: every attempt is refused, then the error is reported
+    client = OllamaClient('http://127.0.0.1:9', 'llama3.2', retries=2, backoff=0.05)
+    result, ms = timed(lambda: client.generate('hi'))
+    report['refused'] = {'error': isinstance(result, LLMError), 'ms': ms}
+
+    # Time to first token and total time of a streamed reply
+    with FakeOllama(latency=0.2, token_delay=0.02) as fake:
+        client = OllamaClient(fake.url, 'llama3.2')
+        start = time.perf_counter()
+        first_token_ms = None
+        for _ in client.stream('hi'):
+            if first_token_ms is None:
+                first_token_ms = round((time.perf_counter() - start) * 1000, 1)
+        report['stream'] = {'ttft_ms': first_token_ms, 'total_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
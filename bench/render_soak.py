@@ -0,0 +1,79 @@
+"""Render every chart type over and over and report resident memory along the way.
+
+Memory should level off after the first few hundred renders. Charts are drawn from
+threads to exercise concurrent rendering as well.
+
+Usage: python bench/render_soak.py [renders] [threads]
+"""
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from charts import RENDERERS, render
+
+DAYS = [f'2026-04-{day:02d}' for day in range(1, 31)]
+SUPPLIERS = ['Alamo', 'Avis', 'Budget', 'Dollar', 'Enterprise', 'Hertz', 'National', 'Sixt']
+CATEGORIES = ['Economy', 'Compact', 'Midsize', 'Standard', 'Fullsize', 'Premium', 'Luxury', 'Compact SUV']
+
+# Series shaped like the ones app.py builds for each chart
+SAMPLE_SERIES = {
+    'price_by_supplier': {'suppliers': SUPPLIERS, 'prices': [70 + i for i in range(len(SUPPLIERS))]},
+    'price_by_date': {'dates': DAYS, 'prices': [75 + i % 7 for i in range(len(DAYS))]},
+    'price_by_category': {'categories': CATEGORIES, 'prices': [40 + 15 * i for i in range(len(CATEGORIES))]},
+    'supplier_comparison': {'category': 'suv', 'labels': DAYS,
+                            'suppliers': {'Hertz': [90 + i % 5 for i in range(30)], 'Avis': [88 + i % 3 for i in range(30)]}},
+    'weekend_weekday_comparison': {'weekend': 81.5, 'weekday': 77.25},
+    'best_deals': {'deals': [{'supplier': SUPPLIERS[i % 8], 'vehicle': f'Vehicle model {i}', 'price': 30.0 + i,
+                              'avg_price': 60.0, 'discount': 50.0 - i} for i in range(10)]},
+    'category_price_difference': {'categories': ['Economy', 'Luxury'], 'prices': [42.0, 145.0]},
+    'weekly_comparison': {'first_week': {'label': 'Apr 01 - Apr 07', 'daily': [70 + i for i in range(7)], 'average': 73.0},
+                          'last_week': {'label': 'Apr 24 - Apr 30', 'daily': [80 - i for i in range(7)], 'average': 77.0}}
+}
+
+
+def rss_mb():
+    # Current resident set size; Linux only
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+
+
+def main():
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    graph_types = list(RENDERERS)
+    samples = []
+    done = [0]
+    lock = threading.Lock()
+
+    def job(i):
+        graph_type = graph_types[i % len(graph_types)]
+        render(graph_type, SAMPLE_SERIES[graph_type])
+        with lock:
+            done[0] += 1
+            if done[0] % 100 == 0:
+                samples.append({'renders': done[0], 'rss_mb': round(rss_mb(), 1)})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(job, range(renders)))
+    elapsed = time.perf_counter() - start
+
+    # Growth over the second half, after caches and fonts have warmed up
+    half = samples[len(samples) // 2]['rss_mb'] if samples else 0
+    print(json.dumps({
+        'renders': renders,
+        'threads': threads,
+        'seconds': round(elapsed, 2),
+        'renders_per_second': round(renders / elapsed, 1),
+        'rss_mb': samples,
+        'second_half_growth_mb': round(samples[-1]['rss_mb'] - half, 1) if samples else 0
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""Benchmark ingest, every query_data intent and every chart on generated data, reported as JSON.
+
+Each size runs in a fresh process, so its peak RSS is its own. The generated CSVs are kept
+in --data-dir and reused by later runs. With --baseline, timings and memory that grew by
+more than --threshold since an earlier report are listed under "regressions".
+
+Usage: python bench/run_suite.py [--rows 10000,100000,1000000] [--suppliers 8] [--categories 12]
+                                 [--repeat 5] [--data-dir DIR] [--output report.json]
+                                 [--baseline old_report.json] [--threshold 0.25]
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generate_data import generate
+from intent_dispatch import QUESTIONS
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(times), 3)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def dataset_file(args, rows):
+    path = os.path.join(args.data_dir, f'rates_{rows}_{args.suppliers}s_{args.categories}c.csv')
+    if not os.path.exists(path):
+        generate(rows, path, suppliers=args.suppliers, categories=args.categories)
+    return path
+
+
+def measure(args, rows):
+    """Results for one size, measured in this process."""
+    path = dataset_file(args, rows)
+
+    # app.py keeps its uploads and reply cache under the working directory
+    os.chdir(tempfile.mkdtemp(prefix='bench-suite-'))
+    import app
+    from charts import render
+    from datastore import dataset_memory
+    from models.analysis import analyze_file, query_data
+
+    start = time.perf_counter()
+    data = analyze_file(path)
+    ingest = {
+        'seconds': round(time.perf_counter() - start, 3),
+        'file_mb': round(os.path.getsize(path) / 1024 / 1024, 1),
+        'memory_mb': round(dataset_memory(data) / 1024 / 1024, 1),
+        'peak_rss_mb': peak_rss_mb()
+    }
+    data['dataset_id'] = 'bench'
+
+    intents = {}
+    for name, question in QUESTIONS.items():
+        if name is not None:
+            intents[name] = {'median_ms': median_ms(lambda: query_data(question, data), args.repeat)}
+
+    charts = {}
+    for graph_type, params in app.standard_charts(data):
+        series = app.graph_series(data, graph_type, params)
+        charts[graph_type] = {
+            'series_ms': median_ms(lambda: app.graph_series(data, graph_type, params), args.repeat),
+            'render_ms': median_ms(lambda: render(graph_type, series), args.repeat),
+            'png_bytes': len(render(graph_type, series))
+        }
+
+    return {
+        'rows': rows,
+        'ingest': ingest,
+        'intents': intents,
+        'charts': charts,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def flatten(value, prefix=''):
+    if isinstance(value, dict):
+        items = {}
+        for key, item in value.items():
+            items.update(flatten(item, f'{prefix}{key}.'))
+        return items
+    return {prefix[:-1]: value}
+
+
+def regressions(report, baseline, threshold):
+    """Timings and memory in report more than threshold above the baseline's."""
+    found = []
+    old = flatten(baseline.get('sizes', {}))
+    for metric, value in flatten(report['sizes']).items():
+        if not metric.endswith(('_ms', 'seconds', '_mb')) or not isinstance(old.get(metric), (int, float)):
+            continue
+        # Sub-millisecond timings are too noisy to compare on their own
+        if old[metric] > 0 and value > old[metric] * (1 + threshold) and value - old[metric] > 0.5:
+            found.append({'metric': metric, 'baseline': old[metric], 'value': value,
+                          'ratio': round(value / old[metric], 2)})
+    return found
+
+
+def environment():
+    import matplotlib
+    import numpy
+    import pandas
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'matplotlib': matplotlib.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default='10000,100000,1000000', help='comma separated dataset sizes')
+    parser.add_argument('--suppliers', type=int, default=8)
+    parser.add_argument('--categories', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=5, help='runs per intent and chart; the median is reported')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'rate-shop-bench'))
+    parser.add_argument('--output', help='also write the report to this file')
+    parser.add_argument('--baseline', help='an earlier report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='slowdown reported as a regression')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.data_dir = os.path.abspath(args.data_dir)
+    os.makedirs(args.data_dir, exist_ok=True)
+    sizes = [int(rows) for rows in args.rows.split(',')]
+
+    if args.single:
+        # One size in this process; the analysis logs to stdout, so keep it off the report
+        with contextlib.redirect_stdout(sys.stderr):
+            result = measure(args, sizes[0])
+        print(json.dumps(result))
+        return
+
+    report = {'environment': environment(), 'suppliers': args.suppliers, 'categories': args.categories,
+              'repeat': args.repeat, 'sizes': {}}
+    for rows in sizes:
+        command = [sys.executable, os.path.abspath(__file__), '--single', '--rows', str(rows),
+                   '--suppliers', str(args.suppliers), '--categories', str(args.categories),
+                   '--repeat', str(args.repeat), '--data-dir', args.data_dir]
+        child = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+        if child.returncode:
+            sys.exit(f'Benchmark for {rows} rows failed')
+        report['sizes'][str(rows)] = json.loads(child.stdout)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = regressions(report, json.load(f), args.threshold)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
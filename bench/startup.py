@@ -0,0 +1,141 @@
+"""Cold start of app.py: import time by module and time until a fresh server answers its first request.
+
+Each measurement starts a new interpreter. Time to first response runs from starting the
+server process until GET /stats returns; Python's own startup is reported alongside for
+reference. With --csv, the server then also times the first upload, data answer and
+chart, which now pay for the imports the app no longer makes at startup.
+
+Usage: python bench/startup.py [--repeat 5] [--top 15] [--csv rates.csv]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_APP = """
+import sys, time
+start = time.perf_counter()
+import app
+print(round((time.perf_counter() - start) * 1000, 1))
+print(' '.join(name for name in sys.argv[1:] if name in sys.modules))
+"""
+
+SERVE_APP = """
+import sys
+from werkzeug.serving import make_server
+import app
+make_server('127.0.0.1', int(sys.argv[1]), app.app, threaded=True).serve_forever()
+"""
+
+# Modules that used to be imported with the app
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'seaborn', 'requests', 'httpx', 'models.analysis', 'charts']
+
+def python(code, *args, flags=()):
+    """Run code in a fresh interpreter that imports app.py from a scratch directory."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, *flags, '-c', code, *args], cwd=tempfile.mkdtemp(prefix='startup-'),
+                          env=env, capture_output=True, text=True, check=True)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def python_startup_ms():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return (time.perf_counter() - start) * 1000
+
+def import_by_module(top):
+    """Cumulative import time in ms of each module app.py imports directly, from -X importtime."""
+    stderr = python('import app', flags=('-X', 'importtime')).stderr
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented two spaces per level and listed before the module that
+        # imported them, so app's own imports are the top level + 1 lines just before it
+        if not name.startswith('   '):
+            if name.strip() == 'app':
+                break
+            modules = {}
+        elif not name.startswith('     '):
+            modules[name.strip()] = round(int(cumulative) / 1000, 1)
+    return dict(sorted(modules.items(), key=lambda item: item[1], reverse=True)[:top])
+
+def serve(csv_file):
+    """(ms until GET /stats answered, first use timings) for a fresh server process."""
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-c', SERVE_APP, str(port)], cwd=tempfile.mkdtemp(prefix='startup-'),
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if server.poll() is not None:
+                sys.exit('The server failed to start')
+            try:
+                requests.get(f'{base}/stats', timeout=1).raise_for_status()
+                break
+            except requests.ConnectionError:
+                time.sleep(0.005)
+        first_response_ms = (time.perf_counter() - start) * 1000
+
+        first_use = None
+        if csv_file:
+            session = requests.Session()
+
+            def timed(method, path, **kwargs):
+                start = time.perf_counter()
+                session.request(method, f'{base}{path}', **kwargs).raise_for_status()
+                return round((time.perf_counter() - start) * 1000, 1)
+
+            with open(csv_file, 'rb') as f:
+                upload_ms = timed('POST', '/upload', files={'file': f})
+            first_use = {
+                'upload_ms': upload_ms,
+                'data_answer_ms': timed('POST', '/chat', json={'message': 'which supplier has the lowest prices?'}),
+                'chart_ms': timed('POST', '/generate_graph', json={'type': 'price_by_supplier'})
+            }
+    finally:
+        server.terminate()
+        server.wait()
+    return first_response_ms, first_use
+
+def median(values):
+    return round(statistics.median(values), 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='fresh processes per measurement; the median is reported')
+    parser.add_argument('--top', type=int, default=15, help='modules listed by import time')
+    parser.add_argument('--csv', help='also time the first upload, answer and chart with this file')
+    args = parser.parse_args()
+
+    imports = [python(IMPORT_APP, *HEAVY_MODULES).stdout.split('\n') for _ in range(args.repeat)]
+    served = [serve(args.csv) for _ in range(args.repeat)]
+    report = {
+        'python_startup_ms': median([python_startup_ms() for _ in range(args.repeat)]),
+        'import_app_ms': median([float(lines[0]) for lines in imports]),
+        'first_response_ms': median([first_response_ms for first_response_ms, _ in served]),
+        'heavy_modules_after_import': imports[0][1].split(),
+        'import_by_module_ms': import_by_module(args.top)
+    }
+    if args.csv:
+        report['first_use'] = {key: median([first_use[key] for _, first_use in served])
+                               for key in served[0][1]}
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
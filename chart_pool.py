@@ -0,0 +1,109 @@
+"""The chart renderer process pool. charts, and with it matplotlib, is only imported to draw a chart."""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+# The keys of charts.RENDERERS, known without importing matplotlib
+GRAPH_TYPES = frozenset({'price_by_supplier', 'price_by_date', 'price_by_category', 'supplier_comparison',
+                         'weekend_weekday_comparison', 'best_deals', 'category_price_difference',
+                         'weekly_comparison'})
+
+# Bump when charts.py changes how a chart looks, so image URLs cached by browsers stop matching
+CHART_VERSION = 1
+
+def render(graph_type, series):
+    """charts.render, importing matplotlib on the first chart."""
+    import charts
+    return charts.render(graph_type, series)
+
+def warm_worker():
+    """Pool initializer: import matplotlib and load its fonts before the first job."""
+    import charts
+    charts.warm_worker()
+
+class ChartError(Exception):
+    """A chart couldn't be rendered: the pool is busy, the job timed out or a worker died."""
+
+class ChartPool:
+    """Renders charts in worker processes that loaded matplotlib and its fonts up front.
+
+    At most max_pending charts are queued or rendering at once; render() refuses more rather
+    than letting requests pile up, and gives up on a chart after timeout seconds. A chart
+    that times out, or a worker that dies, gets the whole pool replaced: the old workers are
+    killed, so a hung render can't keep a worker or a slot. With workers=0 charts are
+    rendered inline in the calling thread.
+    """
+
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.executor = None
+        if workers:
+            self.executor = self._start()
+
+    def _start(self):
+        # Fresh interpreters rather than forks of a threaded server process
+        executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=warm_worker)
+        # Workers are started on demand; submitting a no-op per worker starts and warms them now
+        for _ in range(self.workers):
+            executor.submit(int)
+        return executor
+
+    def _restart(self, broken):
+        """Replace the executor broken, unless another thread already has, and kill its workers."""
+        with self.lock:
+            if self.executor is not broken:
+                return
+            self.executor = self._start()
+        _stop(broken)
+
+    def render(self, graph_type, series):
+        if not self.slots.acquire(blocking=False):
+            raise ChartError('Too many charts are being drawn right now. Please try again in a moment.')
+
+        if not self.workers:
+            try:
+                return render(graph_type, series)
+            finally:
+                self.slots.release()
+
+        with self.lock:
+            executor = self.executor
+        if executor is None:
+            self.slots.release()
+            raise ChartError('The chart renderer has been stopped.')
+        try:
+            future = executor.submit(render, graph_type, series)
+        except BrokenProcessPool:
+            self.slots.release()
+            self._restart(executor)
+            raise ChartError('The chart renderer restarted. Please try again.')
+        # The slot is freed when the job ends: it finishes, fails, or its worker is killed
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # A running job can't be cancelled; killing the pool's workers is what stops it
+            self._restart(executor)
+            raise ChartError('Drawing the chart took too long.')
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise ChartError('The chart renderer restarted. Please try again.')
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            _stop(executor)
+
+def _stop(executor):
+    """Shut an executor down without waiting, killing any worker still busy with a job."""
+    # ProcessPoolExecutor has no public way to stop a running job; its processes are in _processes
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
@@ -0,0 +1,453 @@
+"""Chart rendering. Each renderer takes the pre-aggregated series for one chart and returns PNG bytes.
+
+Importing this module loads matplotlib; chart_pool imports it on the first chart drawn.
+"""
+import io
+from datetime import datetime, timedelta
+
+import matplotlib
+matplotlib.use('Agg')  # Charts are only ever saved as PNG
+import matplotlib.style
+from matplotlib.artist import setp
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.dates import DateFormatter
+from matplotlib.figure import Figure
+
+# Applied once for the whole process; every chart uses the same style
+STYLE = 'seaborn-v0_8-whitegrid'
+matplotlib.style.use(STYLE)
+
+def new_figure(figsize):
+    """A figure with its own Agg canvas, independent of pyplot's global figure registry."""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+def palette(name, n):
+    """n colors from a matplotlib colormap, picked like seaborn's color_palette picks them.
+
+    Qualitative colormaps, which list a handful of distinct colors, give their first n,
+    cycling if needed. Continuous ones are sampled evenly, leaving out both ends.
+    """
+    cmap = matplotlib.colormaps[name]
+    if cmap.N <= 20:
+        return [cmap(i % cmap.N) for i in range(n)]
+    return [cmap((i + 1) / (n + 1)) for i in range(n)]
+
+def figure_png(fig):
+    """PNG bytes of a figure. The figure is cleared afterwards, so its artists can be freed at once."""
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=100)
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+def render_price_by_supplier(series):
+    # Create the plot with a larger figure
+    fig = new_figure(figsize=(12, 7))
+    ax = fig.subplots()
+
+    # Use a nicer color palette
+    colors = palette("viridis", len(series['suppliers']))
+
+    bars = ax.bar(series['suppliers'], series['prices'], color=colors)
+    setp(ax.get_xticklabels(), rotation=45, ha='right', fontsize=10)
+    ax.set_xlabel('Supplier', fontsize=12)
+    ax.set_ylabel('Average Price ($)', fontsize=12)
+    ax.set_title('Average Rental Prices by Supplier', fontsize=14, fontweight='bold')
+
+    # Add price labels on top of the bars
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 5,
+                f'${height:.2f}',
+                ha='center', va='bottom', fontsize=9)
+
+    # Add a light grid
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+    # Improve layout
+    fig.tight_layout()
+
+    # Add a subtle border
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+
+    return figure_png(fig)
+
+def render_price_by_date(series):
+    # Create the plot with a larger figure
+    fig = new_figure(figsize=(12, 7))
+    ax = fig.subplots()
+
+    # Convert string dates to datetime for better x-axis formatting
+    dates = [datetime.strptime(date, '%Y-%m-%d') for date in series['dates']]
+    prices = series['prices']
+
+    # Plot with improved styling
+    ax.plot(dates, prices, marker='o', linestyle='-', linewidth=2,
+             color='#3498db', markerfacecolor='white', markeredgecolor='#3498db',
+             markeredgewidth=2, markersize=8)
+
+    # Format the date axis
+    date_format = DateFormatter('%b %d')
+    ax.xaxis.set_major_formatter(date_format)
+
+    # Improve the look
+    setp(ax.get_xticklabels(), rotation=45, fontsize=10)
+    ax.set_xlabel('Pickup Date', fontsize=12)
+    ax.set_ylabel('Average Price ($)', fontsize=12)
+    ax.set_title('Average Rental Prices by Pickup Date', fontsize=14, fontweight='bold')
+
+    # Add prices directly on the graph
+    for date, price in zip(dates, prices):
+        ax.text(date, price + 5, f'${price:.2f}', ha='center', fontsize=8)
+
+    # Add a light grid
+    ax.grid(True, linestyle='--', alpha=0.7)
+
+    # Highlight weekends with a light background
+    for date in dates:
+        if date.weekday() >= 5:  # 5 is Saturday, 6 is Sunday
+            ax.axvspan(date - timedelta(hours=12), date + timedelta(hours=12),
+                        color='#f5f5f5', alpha=0.5, zorder=0)
+
+    # Improve layout
+    fig.tight_layout()
+
+    # Remove top and right spines
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+
+    return figure_png(fig)
+
+def render_price_by_category(series):
+    # Create the plot with a larger figure
+    fig = new_figure(figsize=(12, 8))
+    ax = fig.subplots()
+
+    # Use a nicer color palette
+    colors = palette("viridis", len(series['categories']))
+
+    # Create horizontal bar chart
+    bars = ax.barh(series['categories'], series['prices'], color=colors)
+
+    # Improve styling
+    ax.set_xlabel('Average Price ($)', fontsize=12)
+    ax.set_ylabel('Car Category', fontsize=12)
+    ax.set_title('Average Rental Prices by Car Category (Top 15)', fontsize=14, fontweight='bold')
+
+    # Add price labels
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 5, bar.get_y() + bar.get_height()/2.,
+                f'${width:.2f}',
+                ha='left', va='center', fontsize=9)
+
+    # Add a light grid
+    ax.grid(axis='x', linestyle='--', alpha=0.7)
+
+    # Improve layout
+    fig.tight_layout()
+
+    # Remove top and right spines
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+
+    return figure_png(fig)
+
+def render_supplier_comparison(series):
+    category = series['category']
+
+    # Create the plot
+    fig = new_figure(figsize=(12, 8))
+    ax = fig.subplots()
+
+    # Create a better color palette
+    colors = palette("Set2", len(series['suppliers']))
+
+    # Plot with better styling
+    for i, (supplier, prices) in enumerate(series['suppliers'].items()):
+        ax.plot(series['labels'], prices,
+                 marker='o', linestyle='-', linewidth=2, color=colors[i],
+                 markerfacecolor='white', markeredgecolor=colors[i],
+                 markeredgewidth=2, markersize=8, label=supplier)
+
+    # Improve styling
+    ax.set_title(f'Price Comparison for {category if category else "All Categories"}',
+              fontsize=14, fontweight='bold')
+    ax.set_xlabel('Date' if category else 'Car Category', fontsize=12)
+    ax.set_ylabel('Average Price ($)', fontsize=12)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.legend(title='Supplier', fontsize=10, title_fontsize=12)
+
+    if len(series['labels']) > 10:
+        setp(ax.get_xticklabels(), rotation=45, ha='right', fontsize=10)
+
+    # Remove top and right spines
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+
+    # Improve layout
+    fig.tight_layout()
+
+    return figure_png(fig)
+
+def render_weekend_weekday_comparison(series):
+    weekend_price = series['weekend']
+    weekday_price = series['weekday']
+
+    # Create the plot with a larger figure
+    fig = new_figure(figsize=(10, 7))
+    ax = fig.subplots()
+
+    # Use nicer colors
+    colors = ['#3498db', '#e74c3c']
+
+    # Create bar chart
+    bars = ax.bar(['Weekday', 'Weekend'], [weekday_price, weekend_price], color=colors, width=0.6)
+
+    # Improve styling
+    ax.set_ylabel('Average Price ($)', fontsize=12)
+    ax.set_title('Weekend vs Weekday Average Rental Prices', fontsize=14, fontweight='bold')
+
+    # Add price labels
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 2,
+                f'${height:.2f}',
+                ha='center', va='bottom', fontsize=11)
+
+    # Highlight price difference
+    price_diff = abs(weekend_price - weekday_price)
+    diff_percent = (price_diff / min(weekend_price, weekday_price)) * 100
+
+    if weekend_price > weekday_price:
+        ax.text(0.5, 0.5, f"Weekends are ${price_diff:.2f} more expensive\n({diff_percent:.1f}% higher)",
+                 ha='center', va='center', transform=ax.transAxes,
+                 bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'),
+                 fontsize=12)
+    else:
+        ax.text(0.5, 0.5, f"Weekdays are ${price_diff:.2f} more expensive\n({diff_percent:.1f}% higher)",
+                 ha='center', va='center', transform=ax.transAxes,
+                 bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'),
+                 fontsize=12)
+
+    # Add a light grid
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+    # Improve layout
+    fig.tight_layout()
+
+    # Remove top and right spines
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+
+    return figure_png(fig)
+
+def render_best_deals(series):
+    deals = series['deals']
+
+    # Create the plot with a larger figure
+    fig = new_figure(figsize=(14, 8))
+    ax = fig.subplots()
+
+    # Create bar chart of discounts
+    labels = [f"{deal['supplier']} - {deal['vehicle'][:15]}..." for deal in deals]
+    discount_bars = ax.barh(labels, [deal['discount'] for deal in deals], color='#27ae60')
+
+    # Add price comparison on the same plot
+    for i, deal in enumerate(deals):
+        ax.text(deal['discount'] + 2, i,
+                 f"${deal['price']:.2f} vs. avg ${deal['avg_price']:.2f}",
+                 va='center', fontsize=9)
+
+    # Improve styling
+    ax.set_xlabel('Discount Percentage (%)', fontsize=12)
+    ax.set_title('Top 10 Car Rental Deals (% Below Average Price)', fontsize=14, fontweight='bold')
+
+    # Add percentage labels
+    for bar in discount_bars:
+        width = bar.get_width()
+        ax.text(width - 5, bar.get_y() + bar.get_height()/2.,
+                f"{width:.1f}%",
+                ha='right', va='center', fontsize=9, color='white', fontweight='bold')
+
+    # Improve layout
+    fig.tight_layout()
+    ax.grid(axis='x', linestyle='--', alpha=0.7)
+
+    # Remove top and right spines
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+
+    return figure_png(fig)
+
+def render_category_price_difference(series):
+    categories_list = series['categories']
+    avg_prices = series['prices']
+
+    # Create the plot with a larger figure
+    # Create a comparison chart with multiple segments
+    fig = new_figure(figsize=(14, 7))
+    ax1, ax2 = fig.subplots(1, 2, gridspec_kw={'width_ratios': [2, 1]})
+
+    # 1. Price bars on the left
+    colors = palette("viridis", len(categories_list))
+    bars = ax1.bar(categories_list, avg_prices, color=colors)
+
+    # Add price labels
+    for bar in bars:
+        height = bar.get_height()
+        ax1.text(bar.get_x() + bar.get_width()/2., height + 5,
+                f'${height:.2f}',
+                ha='center', va='bottom', fontsize=10)
+
+    # Improve left subplot
+    ax1.set_ylabel('Average Price ($)', fontsize=12)
+    ax1.set_title('Average Prices by Category', fontsize=13)
+    ax1.grid(axis='y', linestyle='--', alpha=0.7)
+
+    # 2. Price difference on the right
+    price_diffs = []
+    labels = []
+    for i in range(len(categories_list)):
+        for j in range(i+1, len(categories_list)):
+            cat1, cat2 = categories_list[i], categories_list[j]
+            price1, price2 = avg_prices[i], avg_prices[j]
+            diff = abs(price1 - price2)
+            pct_diff = (diff / min(price1, price2)) * 100
+            price_diffs.append(diff)
+            labels.append(f"{cat1} vs {cat2}")
+
+            # Add percent diff annotation
+            higher = cat1 if price1 > price2 else cat2
+            ax2.text(0.5, 0.3 + 0.2*len(price_diffs),
+                      f"{higher} is {pct_diff:.1f}% more expensive",
+                      ha='center', va='center', transform=ax2.transAxes,
+                      bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'),
+                      fontsize=10)
+
+    # Plot the differences
+    diff_bars = ax2.bar(labels, price_diffs, color='#3498db')
+
+    # Add difference labels
+    for bar in diff_bars:
+        height = bar.get_height()
+        ax2.text(bar.get_x() + bar.get_width()/2., height + 2,
+                f'${height:.2f}',
+                ha='center', va='bottom', fontsize=10)
+
+    # Improve right subplot
+    ax2.set_ylabel('Price Difference ($)', fontsize=12)
+    ax2.set_title('Price Differences Between Categories', fontsize=13)
+    ax2.tick_params(axis='x', rotation=45)
+    ax2.grid(axis='y', linestyle='--', alpha=0.7)
+
+    # Overall figure improvements
+    fig.suptitle(f'Price Comparison: {" vs ".join(categories_list)}', fontsize=14, fontweight='bold')
+
+    # Remove top and right spines
+    for ax in [ax1, ax2]:
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+
+    # Improve layout
+    fig.tight_layout()
+
+    return figure_png(fig)
+
+def render_weekly_comparison(series):
+    first_week = series['first_week']
+    last_week = series['last_week']
+
+    # Create the plot with a larger figure
+    fig = new_figure(figsize=(12, 10))
+    ax1, ax2 = fig.subplots(2, 1, gridspec_kw={'height_ratios': [2, 1]})
+
+    # Plot daily averages on top subplot
+    ax1.plot(range(len(first_week['daily'])), first_week['daily'], 'o-', label=f"First Week ({first_week['label']})", color='#3498db')
+    ax1.plot(range(len(last_week['daily'])), last_week['daily'], 'o-', label=f"Last Week ({last_week['label']})", color='#e74c3c')
+
+    # Add data labels
+    for i, (price1, price2) in enumerate(zip(first_week['daily'], last_week['daily'])):
+        ax1.text(i, price1 + 2, f'${price1:.2f}', ha='center', va='bottom', fontsize=9, color='#3498db')
+        ax1.text(i, price2 + 2, f'${price2:.2f}', ha='center', va='bottom', fontsize=9, color='#e74c3c')
+
+    # Improve top subplot
+    ax1.set_ylabel('Average Daily Price ($)', fontsize=12)
+    ax1.set_title('Daily Price Comparison: First Week vs Last Week', fontsize=14)
+    ax1.set_xticks(range(len(first_week['daily'])))
+    ax1.set_xticklabels([f'Day {i+1}' for i in range(len(first_week['daily']))], rotation=45)
+    ax1.legend()
+    ax1.grid(True, linestyle='--', alpha=0.7)
+
+    # Plot overall averages on bottom subplot
+    first_week_avg = first_week['average']
+    last_week_avg = last_week['average']
+    weeks = ['First Week', 'Last Week']
+    avgs = [first_week_avg, last_week_avg]
+    colors = ['#3498db', '#e74c3c']
+
+    bars = ax2.bar(weeks, avgs, color=colors)
+
+    # Add price labels
+    for bar in bars:
+        height = bar.get_height()
+        ax2.text(bar.get_x() + bar.get_width()/2., height + 2,
+                f'${height:.2f}',
+                ha='center', va='bottom', fontsize=10)
+
+    # Calculate and show price difference
+    price_diff = abs(first_week_avg - last_week_avg)
+    diff_percent = (price_diff / min(first_week_avg, last_week_avg)) * 100
+
+    if last_week_avg > first_week_avg:
+        ax2.text(0.5, 0.8, f"Last week is ${price_diff:.2f} more expensive\n({diff_percent:.1f}% higher)",
+                ha='center', va='center', transform=ax2.transAxes,
+                bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'),
+                fontsize=10)
+    else:
+        ax2.text(0.5, 0.8, f"First week is ${price_diff:.2f} more expensive\n({diff_percent:.1f}% higher)",
+                ha='center', va='center', transform=ax2.transAxes,
+                bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'),
+                fontsize=10)
+
+    # Improve bottom subplot
+    ax2.set_ylabel('Average Price ($)', fontsize=12)
+    ax2.set_title('Overall Weekly Price Comparison', fontsize=14)
+    ax2.grid(axis='y', linestyle='--', alpha=0.7)
+
+    # Remove top and right spines
+    for ax in [ax1, ax2]:
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+
+    # Improve layout
+    fig.tight_layout()
+
+    return figure_png(fig)
+
+RENDERERS = {
+    'price_by_supplier': render_price_by_supplier,
+    'price_by_date': render_price_by_date,
+    'price_by_category': render_price_by_category,
+    'supplier_comparison': render_supplier_comparison,
+    'weekend_weekday_comparison': render_weekend_weekday_comparison,
+    'best_deals': render_best_deals,
+    'category_price_difference': render_category_price_difference,
+    'weekly_comparison': render_weekly_comparison
+}
+
+def render(graph_type, series):
+    """PNG bytes of a chart drawn from its series."""
+    return RENDERERS[graph_type](series)
+
+def warm_worker():
+    """Pool initializer: load fonts by drawing a throwaway chart."""
+    fig = new_figure(figsize=(2, 2))
+    ax = fig.subplots()
+    ax.bar(['warm'], [1.0])
+    ax.set_title('$0.00', fontweight='bold')
+    figure_png(fig)
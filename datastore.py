@@ -0,0 +1,187 @@
+"""On-disk cache of analyzed rate shopping files, keyed by the hash of their contents."""
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+
+from lru import LRUCache
+
+# Bump when the loader or the aggregations change so older cache entries stop matching
+CACHE_VERSION = 5
+
+def save_upload(file, folder, chunk_size):
+    """Write an uploaded file into folder chunk by chunk; return (SHA-256 of its contents, path).
+
+    Each upload gets a file of its own, so concurrent uploads never write to or remove each
+    other's file. The file is only needed until it is analyzed: the caller removes it, and
+    the dataset cache keeps the results.
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(dir=folder, prefix='.upload-', suffix='.csv')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for block in iter(lambda: file.stream.read(chunk_size), b''):
+                digest.update(block)
+                out.write(block)
+    except BaseException:
+        os.remove(path)
+        raise
+    return digest.hexdigest(), path
+
+def is_dataset_id(value):
+    """Whether value is a dataset id: the lowercase hex SHA-256 save_upload returns."""
+    return isinstance(value, str) and len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+def directory_size(path):
+    """Total size of the files directly inside path."""
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+class DatasetCache:
+    """Analyzed datasets stored as one .npy file per column, loaded back with memory mapping.
+
+    Each entry lives in root/<digest>.v<CACHE_VERSION>/ and holds the column arrays plus a
+    pickle with the summary, aggs and cube. Categorical columns are stored as their integer
+    codes with the categories kept in the pickle. When the entries exceed max_bytes, the
+    least recently used ones are deleted.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.root, f'{digest}.v{CACHE_VERSION}')
+
+    def get(self, digest):
+        """Return the cached analysis for digest, or None if it isn't cached."""
+        path = self._path(digest)
+        try:
+            with open(os.path.join(path, 'meta.pickle'), 'rb') as f:
+                data = pickle.load(f)
+            os.utime(path)  # Mark as recently used for eviction
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        frame = data.pop('frame')
+        if frame is None:
+            data['df'] = None
+            return data
+
+        # Imported here rather than with the app, which starts before any dataset is loaded
+        import numpy as np
+        import pandas as pd
+        columns = {}
+        for i, column in enumerate(frame['columns']):
+            values = np.load(os.path.join(path, f'{i}.npy'), mmap_mode='r')
+            if 'categories' in column:
+                values = pd.Categorical.from_codes(values, categories=column['categories'])
+            columns[column['name']] = values
+        index = frame['index'] if frame['index'] is not None else pd.RangeIndex(frame['rows'])
+        data['df'] = pd.DataFrame(columns, index=index, copy=False)
+        return data
+
+    def put(self, digest, data):
+        """Store an analysis returned by analyze_file or analyze_file_chunked."""
+        path = self._path(digest)
+        if os.path.isdir(path):
+            return
+
+        # Write into a scratch directory and rename it into place so readers never see a partial entry
+        scratch = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        try:
+            meta = {key: value for key, value in data.items() if key != 'df'}
+            meta['frame'] = self._write_frame(data['df'], scratch) if data['df'] is not None else None
+            with open(os.path.join(scratch, 'meta.pickle'), 'wb') as f:
+                pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.rename(scratch, path)
+        except OSError:
+            shutil.rmtree(scratch, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+        self._evict(keep=path)
+
+    def _write_frame(self, df, path):
+        import numpy as np
+        import pandas as pd
+        columns = []
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            column = {'name': name}
+            if not isinstance(series.dtype, pd.CategoricalDtype) and series.dtype.kind not in 'biufM':
+                # Text columns the schema didn't cover are stored as categories too
+                series = series.astype('category')
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                column['categories'] = series.cat.categories.tolist()
+                values = series.cat.codes.to_numpy()
+            else:
+                values = series.to_numpy()
+            np.save(os.path.join(path, f'{i}.npy'), values)
+            columns.append(column)
+
+        default_index = isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1
+        return {
+            'columns': columns,
+            'rows': len(df),
+            'index': None if default_index else df.index
+        }
+
+    def _evict(self, keep):
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and not entry.name.startswith('.'):
+                entries.append((entry.stat().st_mtime, entry.path, directory_size(entry.path)))
+
+        total = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                print(f"Evicted cached dataset {os.path.basename(path)} ({size / 1024 / 1024:.1f} MB)")
+
+def dataset_memory(data):
+    """Bytes held in memory by an analyzed dataset's frame and cube."""
+    total = 0
+    for key in ('df', 'cube'):
+        if data.get(key) is not None:
+            total += int(data[key].memory_usage(deep=True).sum())
+    return total
+
+class DatasetRegistry:
+    """Analyzed datasets kept in memory by dataset id, within a memory budget.
+
+    When the datasets in memory exceed max_bytes, the least recently used ones are dropped.
+    They remain in the on-disk DatasetCache and are loaded back from it on their next use.
+    """
+
+    def __init__(self, cache, max_bytes):
+        self.cache = cache
+        self.datasets = LRUCache(max_bytes, sizeof=dataset_memory, on_evict=self._evicted)
+
+    def _evicted(self, dataset_id, data):
+        print(f"Dropped dataset {dataset_id[:12]} from memory ({dataset_memory(data) / 1024 / 1024:.1f} MB)")
+
+    def add(self, dataset_id, data):
+        data['dataset_id'] = dataset_id
+        self.datasets.put(dataset_id, data)
+
+    def get(self, dataset_id):
+        """Return the dataset, reloading it from disk if it was evicted, or None if it is gone.
+
+        Ids come from requests, so anything that isn't a SHA-256 hex digest is unknown rather
+        than a cache key or part of a path.
+        """
+        if not is_dataset_id(dataset_id):
+            return None
+        data = self.datasets.get(dataset_id)
+        if data is None:
+            data = self.cache.get(dataset_id)
+            if data is not None:
+                self.add(dataset_id, data)
+        return data
+
+    def stats(self):
+        return self.datasets.stats()
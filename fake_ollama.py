@@ -0,0 +1,140 @@
+"""A stand-in for Ollama's /api/generate with configurable latency and failures.
+
+Runs in-process on a background thread, so the chat endpoints and OllamaClient can be
+exercised without a real model:
+
+    with FakeOllama(latency=0.2, failures=1) as fake:
+        client = OllamaClient(fake.url, 'llama3.2')
+
+Or on its own, in place of Ollama: python fake_ollama.py [--port 11434] [--latency 0.5] ...
+"""
+import argparse
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeOllama:
+    """Answers every prompt with a canned reply.
+
+    latency is the delay before the first byte of a reply, token_delay the delay between
+    streamed tokens. The next `failures` requests get `failure_status` instead of a reply.
+    """
+
+    def __init__(self, port=0, latency=0.0, token_delay=0.0, failures=0, failure_status=500,
+                 reply="This is a reply from the fake Ollama server."):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.failures = failures
+        self.failure_status = failure_status
+        self.reply = reply
+        self.requests = 0
+        self.connections = 0
+        self.cancelled = 0  # Streamed replies the client hung up on
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like Ollama
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; like Ollama, don't hold them back
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with fake.lock:
+                    fake.connections += 1
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with fake.lock:
+                    fake.requests += 1
+                    failing = fake.failures > 0
+                    if failing:
+                        fake.failures -= 1
+
+                time.sleep(fake.latency)
+                if self.path != '/api/generate':
+                    return self._send(404, {'error': 'not found'})
+                if failing:
+                    return self._send(fake.failure_status, {'error': 'simulated failure'})
+                if body.get('stream', True):
+                    return self._stream(body.get('model'))
+                self._send(200, {'model': body.get('model'), 'response': fake.reply, 'done': True})
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, model):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                words = fake.reply.split(' ')
+                tokens = [word if i == 0 else ' ' + word for i, word in enumerate(words)]
+                try:
+                    for i, token in enumerate(tokens):
+                        if i:
+                            time.sleep(fake.token_delay)
+                        self._chunk({'model': model, 'response': token, 'done': False})
+                    self._chunk({'model': model, 'response': '', 'done': True})
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    # Like Ollama, stop generating when the client goes away
+                    with fake.lock:
+                        fake.cancelled += 1
+                    self.close_connection = True
+
+            def _chunk(self, payload):
+                line = json.dumps(payload).encode() + b'\n'
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds before each reply starts')
+    parser.add_argument('--token-delay', type=float, default=0.05, help='seconds between streamed tokens')
+    parser.add_argument('--failures', type=int, default=0, help='number of requests to fail first')
+    args = parser.parse_args()
+
+    fake = FakeOllama(args.port, args.latency, args.token_delay, args.failures)
+    print(f"Fake Ollama listening on {fake.url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        fake.server.server_close()
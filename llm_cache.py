@@ -0,0 +1,59 @@
+"""Ollama replies stored in SQLite so repeated general questions skip the model, even across restarts."""
+import sqlite3
+import threading
+import time
+
+class ResponseCache:
+    """Exact-match cache of model replies keyed by (model, prompt), expiring after ttl seconds.
+
+    Prompts should be normalized by the caller. Hit and miss counts cover this process only.
+    """
+
+    def __init__(self, path, ttl):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # One connection shared by all request threads, serialized by the lock
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS responses ('
+                        'model TEXT NOT NULL, prompt TEXT NOT NULL, response TEXT NOT NULL, '
+                        'created REAL NOT NULL, PRIMARY KEY (model, prompt))')
+        self.db.execute('CREATE INDEX IF NOT EXISTS responses_created ON responses (created)')
+        self.purge()
+
+    def get(self, model, prompt):
+        """The cached reply, or None if there is none or it has expired."""
+        with self.lock:
+            row = self.db.execute('SELECT response FROM responses WHERE model = ? AND prompt = ? AND created > ?',
+                                  (model, prompt, time.time() - self.ttl)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, model, prompt, response):
+        with self.lock:
+            now = time.time()
+            self.db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)', (model, prompt, response, now))
+            # Expired replies are dropped as new ones come in; the index keeps this cheap
+            self.db.execute('DELETE FROM responses WHERE created <= ?', (now - self.ttl,))
+
+    def purge(self):
+        """Delete expired replies."""
+        with self.lock:
+            self.db.execute('DELETE FROM responses WHERE created <= ?', (time.time() - self.ttl,))
+
+    def stats(self):
+        with self.lock:
+            entries = self.db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'entries': entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
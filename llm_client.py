@@ -0,0 +1,174 @@
+"""Ollama clients with pooled keep-alive connections, timeouts and retries."""
+import asyncio
+import json
+import threading
+import time
+
+# requests and httpx are imported when a client first talks to Ollama, so importing the
+# app doesn't wait on them
+
+class LLMError(Exception):
+    """Ollama couldn't be reached, timed out or answered with an error."""
+
+class OllamaClient:
+    """Calls Ollama's /api/generate over a pool of keep-alive connections.
+
+    Connecting gives up after connect_timeout seconds and waiting for the next bytes of a
+    reply after read_timeout seconds. Failed connections and 5xx replies are retried up to
+    retries times, waiting backoff, 2 * backoff, ... seconds in between. Read timeouts are
+    not retried: a model that is too slow once is likely to be too slow again.
+    """
+
+    def __init__(self, url, model, connect_timeout=3, read_timeout=120, retries=2, backoff=0.5,
+                 pool_size=8):
+        self.url = url.rstrip('/')
+        self.model = model
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The keep-alive connection pool, created on the first call."""
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                self._session.mount('http://', adapter)
+                self._session.mount('https://', adapter)
+            return self._session
+
+    def _post(self, prompt, stream):
+        import requests
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                response = self.session.post(f'{self.url}/api/generate',
+                    json={
+                        "model": self.model,
+                        "prompt": prompt,
+                        "stream": stream
+                    }, timeout=self.timeout, stream=stream)
+            except requests.exceptions.ReadTimeout as e:
+                raise LLMError(f"Ollama took too long to answer: {e}")
+            except requests.exceptions.RequestException as e:
+                error = LLMError(f"Error connecting to Ollama: {e}")
+                continue
+
+            if response.status_code == 200:
+                return response
+            response.close()
+            error = LLMError(f"Error: {response.status_code}")
+            if response.status_code < 500:
+                break
+        raise error
+
+    def generate(self, prompt):
+        """The model's complete reply to prompt."""
+        import requests
+        response = self._post(prompt, stream=False)
+        try:
+            return response.json().get('response', '')
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise LLMError(f"Error reading Ollama's reply: {e}")
+
+    def stream(self, prompt):
+        """Yield the model's reply to prompt piece by piece as it is generated."""
+        import requests
+        response = self._post(prompt, stream=True)
+        try:
+            # Ollama streams one JSON object per line
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('response'):
+                    yield chunk['response']
+                if chunk.get('done'):
+                    break
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise LLMError(f"Error reading Ollama's reply: {e}")
+        finally:
+            response.close()
+
+class AsyncOllamaClient:
+    """OllamaClient for asyncio, built on httpx: waiting for the model doesn't hold a thread.
+
+    Takes the same arguments and raises the same errors as OllamaClient. Call aclose() when done.
+    """
+
+    def __init__(self, url, model, connect_timeout=3, read_timeout=120, retries=2, backoff=0.5,
+                 pool_size=8):
+        try:
+            import httpx
+        except ImportError:  # Only this client needs it, for the async server in asgi.py
+            raise RuntimeError('AsyncOllamaClient needs httpx: pip install httpx')
+        self.httpx = httpx
+        self.model = model
+        self.retries = retries
+        self.backoff = backoff
+        self.client = httpx.AsyncClient(base_url=url.rstrip('/'),
+                                        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                                        limits=httpx.Limits(max_connections=None,
+                                                            max_keepalive_connections=pool_size))
+
+    async def _post(self, prompt, stream):
+        httpx = self.httpx
+        request = self.client.build_request('POST', '/api/generate',
+            json={
+                "model": self.model,
+                "prompt": prompt,
+                "stream": stream
+            })
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                response = await self.client.send(request, stream=stream)
+            except httpx.ReadTimeout as e:
+                raise LLMError(f"Ollama took too long to answer: {e}")
+            except httpx.HTTPError as e:
+                error = LLMError(f"Error connecting to Ollama: {e}")
+                continue
+
+            if response.status_code == 200:
+                return response
+            await response.aclose()
+            error = LLMError(f"Error: {response.status_code}")
+            if response.status_code < 500:
+                break
+        raise error
+
+    async def generate(self, prompt):
+        """The model's complete reply to prompt."""
+        response = await self._post(prompt, stream=False)
+        try:
+            return response.json().get('response', '')
+        except ValueError as e:
+            raise LLMError(f"Error reading Ollama's reply: {e}")
+
+    async def stream(self, prompt):
+        """Yield the model's reply to prompt piece by piece as it is generated."""
+        response = await self._post(prompt, stream=True)
+        try:
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('response'):
+                    yield chunk['response']
+                if chunk.get('done'):
+                    break
+        except (self.httpx.HTTPError, ValueError) as e:
+            raise LLMError(f"Error reading Ollama's reply: {e}")
+        finally:
+            await response.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
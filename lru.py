@@ -0,0 +1,87 @@
+"""Thread-safe LRU cache with a size budget and hit/miss counters."""
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """Least-recently-used mapping bounded by max_size.
+
+    By default every entry counts as 1, so max_size is an entry count. Pass sizeof to
+    budget by something else, e.g. bytes. The most recently added entry is never evicted,
+    even if it alone is over budget. on_evict(key, value) is called for every eviction.
+    """
+
+    def __init__(self, max_size, sizeof=None, on_evict=None):
+        self.max_size = max_size
+        self.sizeof = sizeof or (lambda value: 1)
+        self.on_evict = on_evict
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        evicted = []
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.sizes.pop(key)
+                del self.entries[key]
+            self.entries[key] = value
+            self.sizes[key] = self.sizeof(value)
+            self.size += self.sizes[key]
+
+            while self.size > self.max_size and len(self.entries) > 1:
+                old_key, old_value = self.entries.popitem(last=False)
+                self.size -= self.sizes.pop(old_key)
+                self.evictions += 1
+                evicted.append((old_key, old_value))
+
+        # Callbacks run outside the lock so they can use the cache themselves
+        if self.on_evict:
+            for old_key, old_value in evicted:
+                self.on_evict(old_key, old_value)
+
+    def pop(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.size -= self.sizes.pop(key)
+            return self.entries.pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.size = 0
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'size': self.size,
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,58 @@
+"""cProfile capture of single requests, saved as .prof files and summarized by their costliest functions."""
+import cProfile
+import os
+import pstats
+import threading
+import time
+import uuid
+
+class RequestProfiler:
+    """Profiles one call at a time and keeps the profiles in directory.
+
+    Profiled calls are serialized, so each profile shows a single request rather than
+    whatever else the process was doing. Code that caches or hands work to other processes
+    can check active() to do the work in the calling thread instead, where it is profiled.
+    """
+
+    def __init__(self, directory, top=25):
+        self.directory = directory
+        self.top = top
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def active(self):
+        """Whether the calling thread is being profiled."""
+        return getattr(self.local, 'active', False)
+
+    def run(self, name, fn, *args, **kwargs):
+        """(fn(*args, **kwargs), summary) with fn's profile saved under name; fn's exceptions propagate."""
+        profile = cProfile.Profile()
+        with self.lock:
+            self.local.active = True
+            start = time.perf_counter()
+            try:
+                result = profile.runcall(fn, *args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                self.local.active = False
+                summary = self.save(name, profile, seconds)
+        return result, summary
+
+    def save(self, name, profile, seconds):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:8]}.prof")
+        profile.dump_stats(path)
+        print(f"Profiled {name} in {seconds:.3f}s, saved to {path}")
+        return {'file': path, 'seconds': round(seconds, 4), 'functions': self.summarize(profile)}
+
+    def summarize(self, profile):
+        """The top functions by cumulative time, with their own time and call counts."""
+        stats = pstats.Stats(profile)
+        functions = []
+        for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+            # Two path components are enough to tell pandas/core/frame.py from app.py
+            location = '/'.join(filename.replace('\\', '/').split('/')[-2:])
+            functions.append({'function': f'{location}:{line}({function})', 'calls': calls,
+                              'own_ms': round(own * 1000, 3), 'cumulative_ms': round(cumulative * 1000, 3)})
+        functions.sort(key=lambda f: f['cumulative_ms'], reverse=True)
+        return functions[:self.top]
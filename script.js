@@ -19,6 +19,7 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Dataset status
     let datasetLoaded = false;
+    let datasetId = null;
     let generalQuestionAsked = false;
     
     // Initialize by showing chat widget (for development)
@@ -191,6 +192,7 @@ document.addEventListener('DOMContentLoaded', function() {
             if (data.success) {
                 showUploadNotification('File uploaded successfully!', 'success');
                 datasetLoaded = true;
+                datasetId = data.dataset_id;
                 
                 // Add message from bot about successful upload with typing animation
                 const summaryText = `I've analyzed your file. Here's a summary:
@@ -222,135 +224,456 @@ You can now ask me analytical questions about this data!`;
         
         // Add data-specific suggestions
         if (summary.unique_suppliers > 5) {
-            suggestions.push('Show supplier price comparison');
+            suggestions.push('Show me a supplier price comparison');
         }
         
         suggestions.push('Show me the best deals');
         suggestions.push('Plot price trends over time');
         
         if (summary.unique_categories > 10) {
-            suggestions.push('Compare car categories');
+            suggestions.push('Chart car category prices');
         }
         
         if (summary.websites && summary.websites.length > 1) {
-            suggestions.push(`Compare ${summary.websites[0]} vs ${summary.websites[1]}`);
+            suggestions.push(`Is ${summary.websites[0]} or ${summary.websites[1]} offering better deals?`);
         }
         
         // Limit to 3 suggestions for UI space
         updateSuggestedReplies(suggestions.slice(0, 3));
     }
     
-    // Fetch chat response from backend
+    // Fetch chat response from backend, streaming Ollama replies as they are generated
     function fetchChatResponse(message) {
         // Show typing indicator
         const typingIndicator = addTypingIndicator();
+        const removeTypingIndicator = () => {
+            if (typingIndicator.parentNode) {
+                chatMessages.removeChild(typingIndicator);
+            }
+        };
+        
+        // Bot message that streamed tokens are appended to
+        let streamedMessage = null;
+        let streamedText = '';
+        let finished = false;
         
         // Send message to backend
-        fetch('/chat', {
+        fetch('/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ message: message }),
+            body: JSON.stringify({ message: message, dataset_id: datasetId }),
         })
-        .then(response => response.json())
-        .then(data => {
-            // Remove typing indicator
-            chatMessages.removeChild(typingIndicator);
-            
-            // Format response properly
-            const formattedResponse = formatBotResponse(data.response);
+        .then(response => {
+            // Error pages are HTML, not events; without this the typing indicator never goes away
+            if (!response.ok) {
+                throw new Error(`Chat request failed with status ${response.status}`);
+            }
+            return readEventStream(response, handleEvent);
+        })
+        .then(() => {
+            if (!finished) {
+                throw new Error('The chat stream ended before the reply was complete');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
             
-            // Add bot response with typing animation
-            addMessageWithTyping(formattedResponse, 'bot');
+            // Remove typing indicator
+            removeTypingIndicator();
             
-            // If this is a general response, recommend uploading a file
-            // But only if not already uploaded and this is the first general question
-            if (!datasetLoaded && generalQuestionAsked && 
-                !message.toLowerCase().includes('upload') && 
-                !message.toLowerCase().includes('file')) {
+            // Add error message
+            addMessageWithTyping('Sorry, an error occurred. Please try again.', 'bot');
+        });
+        
+        function handleEvent(event, data) {
+            if (event === 'answer') {
+                // A complete answer from the uploaded data
+                removeTypingIndicator();
+                showChatResponse(data, message);
+            } else if (event === 'token') {
+                if (!streamedMessage) {
+                    removeTypingIndicator();
+                    streamedMessage = addMessage('', 'bot');
+                }
+                streamedText += data.token;
+                streamedMessage.querySelector('.message-content').innerHTML = formatTextWithHTML(formatBotResponse(streamedText));
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            } else if (event === 'error') {
+                removeTypingIndicator();
+                addMessageWithTyping(data.response, 'bot');
+            } else if (event === 'done') {
+                finished = true;
+                removeTypingIndicator();
+                console.debug(`Chat reply: first token after ${data.ttft_ms} ms, done after ${data.total_ms} ms`);
+                if (streamedMessage) {
+                    suggestUploadAfterGeneralQuestion(message);
+                }
+            }
+        }
+    }
+    
+    // Read a Server-Sent Events response, calling onEvent(event, data) for each message
+    function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        function pump() {
+            return reader.read().then(({ done, value }) => {
+                if (done) {
+                    return;
+                }
+                buffer += decoder.decode(value, { stream: true });
                 
-                generalQuestionAsked = false; // Reset so we don't show this after every general question
+                // Messages are separated by a blank line
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const message = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    
+                    let event = 'message';
+                    let data = '';
+                    message.split('\n').forEach(line => {
+                        if (line.startsWith('event: ')) {
+                            event = line.slice(7);
+                        } else if (line.startsWith('data: ')) {
+                            data += line.slice(6);
+                        }
+                    });
+                    onEvent(event, JSON.parse(data));
+                }
+                return pump();
+            });
+        }
+        return pump();
+    }
+    
+    // Show a complete chat response, and its visualization if it has one
+    function showChatResponse(data, message) {
+        // Format response properly
+        const formattedResponse = formatBotResponse(data.response);
+        
+        // Add bot response with typing animation
+        addMessageWithTyping(formattedResponse, 'bot');
+        
+        suggestUploadAfterGeneralQuestion(message);
+        
+        // Charts are drawn here from their numbers; the image rendered by the server is the fallback
+        if (data.visualization) {
+            showChart(data.visualization, data.image_url).then(shown => {
+                if (!shown) {
+                    return;
+                }
                 
-                // Wait a bit before showing the upload suggestion
+                // Add tip about clicking the image
                 setTimeout(() => {
-                    addMessageWithTyping("To get detailed car rental analysis, please upload a rate shopping CSV file using the paperclip icon below.", 'bot');
+                    addMessageWithTyping("Tip: Click on the graph to enlarge and download it.", 'bot');
+                    
+                    // Update suggestions to ask about the visualization
+                    updateContextualSuggestions(data.visualization.type);
                 }, 1000);
+            });
+        }
+    }
+    
+    // Add a chart image to the chat
+    function addGraphImage(imageUrl) {
+        // Create the image element
+        const img = document.createElement('img');
+        img.src = imageUrl;
+        img.alt = 'Data Visualization';
+        addGraphElement(img);
+    }
+    
+    // Add a chart, an image or a canvas drawn here, to the chat
+    function addGraphElement(element) {
+        // Create container for the chart
+        const imgContainer = document.createElement('div');
+        imgContainer.className = 'message bot';
+        
+        const imgContent = document.createElement('div');
+        imgContent.className = 'message-content graph-container';
+        element.classList.add('graph-image');
+        
+        // Add click event to open modal; canvases are shown and downloaded as PNG
+        element.addEventListener('click', function() {
+            modalImage.src = this.src || this.toDataURL('image/png');
+            imageModal.style.display = 'block';
+        });
+        
+        // Add chart to container
+        imgContent.appendChild(element);
+        imgContainer.appendChild(imgContent);
+        
+        // Add container to chat
+        chatMessages.appendChild(imgContainer);
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    }
+    
+    // Fetch a chart's series with format=data and draw it, or show the server's image if it can't be drawn here.
+    // Resolves to whether a chart was shown.
+    function showChart(visualization, imageUrl) {
+        return fetch('/generate_graph', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                type: visualization.type,
+                suppliers: visualization.suppliers,
+                category: visualization.category,
+                categories: visualization.categories,
+                dataset_id: datasetId,
+                format: 'data'
+            }),
+        })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`Chart request failed with status ${response.status}`);
             }
-            
-            // Check if response includes visualization info
-            if (data.visualization) {
-                // Show loading message
-                const loadingMsg = addMessage('Generating visualization...', 'bot');
-                
-                // Request the graph
-                fetch('/generate_graph', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify(data.visualization),
-                })
-                .then(response => response.json())
-                .then(graphData => {
-                    // Remove loading message
-                    chatMessages.removeChild(loadingMsg);
-                    
-                    if (graphData.image) {
-                        // Create container for the image
-                        const imgContainer = document.createElement('div');
-                        imgContainer.className = 'message bot';
-                        
-                        const imgContent = document.createElement('div');
-                        imgContent.className = 'message-content graph-container';
-                        
-                        // Create the image element
-                        const img = document.createElement('img');
-                        img.src = 'data:image/png;base64,' + graphData.image;
-                        img.className = 'graph-image';
-                        img.alt = 'Data Visualization';
-                        
-                        // Add click event to open modal
-                        img.addEventListener('click', function() {
-                            modalImage.src = this.src;
-                            imageModal.style.display = 'block';
-                        });
-                        
-                        // Add image to container
-                        imgContent.appendChild(img);
-                        imgContainer.appendChild(imgContent);
-                        
-                        // Add container to chat
-                        chatMessages.appendChild(imgContainer);
-                        chatMessages.scrollTop = chatMessages.scrollHeight;
-                        
-                        // Add tip about clicking the image
-                        setTimeout(() => {
-                            addMessageWithTyping("Tip: Click on the graph to enlarge and download it.", 'bot');
-                            
-                            // Update suggestions to ask about the visualization
-                            updateContextualSuggestions(data.visualization.type);
-                        }, 1000);
-                    } else if (graphData.error) {
-                        addMessageWithTyping('Error generating visualization: ' + graphData.error, 'bot');
-                    }
-                })
-                .catch(error => {
-                    console.error('Error:', error);
-                    chatMessages.removeChild(loadingMsg);
-                    addMessageWithTyping('Sorry, I couldn\'t generate the visualization.', 'bot');
-                });
+            return response.json();
+        })
+        .then(chart => {
+            if (chart.error) {
+                addMessageWithTyping('Error generating visualization: ' + chart.error, 'bot');
+                return false;
             }
+            const spec = chartSpec(chart.type, chart.series);
+            const canvas = spec ? drawChart(spec) : null;
+            if (canvas) {
+                addGraphElement(canvas);
+            } else if (imageUrl) {
+                addGraphImage(imageUrl);
+            } else {
+                return false;
+            }
+            return true;
         })
         .catch(error => {
             console.error('Error:', error);
+            if (imageUrl) {
+                addGraphImage(imageUrl);
+                return true;
+            }
+            addMessageWithTyping('Error generating visualization. Please try again.', 'bot');
+            return false;
+        });
+    }
+    
+    // Title, axis labels and datasets to draw for each graph type's series, or null for types drawn only by the server
+    function chartSpec(type, series) {
+        const price = value => '$' + value.toFixed(2);
+        switch(type) {
+            case 'price_by_supplier':
+                return {
+                    kind: 'bar', title: 'Average Rental Prices by Supplier', yLabel: 'Average Price ($)', format: price,
+                    labels: series.suppliers, datasets: [{ name: 'Average price', values: series.prices }]
+                };
+            case 'price_by_date':
+                return {
+                    kind: 'line', title: 'Average Rental Prices by Pickup Date', yLabel: 'Average Price ($)', format: price,
+                    labels: series.dates, datasets: [{ name: 'Average price', values: series.prices }]
+                };
+            case 'price_by_category':
+                return {
+                    kind: 'bar', title: 'Average Rental Prices by Car Category (Top 15)', yLabel: 'Average Price ($)', format: price,
+                    labels: series.categories, datasets: [{ name: 'Average price', values: series.prices }]
+                };
+            case 'supplier_comparison':
+                // Prices over time for one category, else across categories
+                return {
+                    kind: series.category ? 'line' : 'bar',
+                    title: 'Price Comparison for ' + (series.category || 'All Categories'),
+                    yLabel: 'Average Price ($)', format: price, labels: series.labels,
+                    datasets: Object.entries(series.suppliers).map(([name, values]) => ({ name: name, values: values }))
+                };
+            case 'weekend_weekday_comparison':
+                return {
+                    kind: 'bar', title: 'Weekend vs Weekday Average Rental Prices', yLabel: 'Average Price ($)', format: price,
+                    labels: ['Weekday', 'Weekend'], datasets: [{ name: 'Average price', values: [series.weekday, series.weekend] }]
+                };
+            case 'best_deals':
+                return {
+                    kind: 'bar', title: 'Top 10 Car Rental Deals (% Below Average Price)', yLabel: 'Discount Percentage (%)',
+                    format: value => value.toFixed(1) + '%',
+                    labels: series.deals.map(deal => `${deal.vehicle} (${deal.supplier})`),
+                    datasets: [{ name: 'Discount', values: series.deals.map(deal => deal.discount) }]
+                };
+            case 'category_price_difference':
+                return {
+                    kind: 'bar', title: 'Price Comparison: ' + series.categories.join(' vs '), yLabel: 'Average Price ($)', format: price,
+                    labels: series.categories, datasets: [{ name: 'Average price', values: series.prices }]
+                };
+            case 'weekly_comparison': {
+                const weeks = [series.first_week, series.last_week];
+                const days = Math.max(...weeks.map(week => week.daily.length));
+                return {
+                    kind: 'line', title: 'Daily Price Comparison: First Week vs Last Week', yLabel: 'Average Daily Price ($)', format: price,
+                    labels: Array.from({ length: days }, (_, i) => 'Day ' + (i + 1)),
+                    datasets: weeks.map(week => ({ name: week.label, values: week.daily }))
+                };
+            }
+            default:
+                return null;
+        }
+    }
+    
+    // Colors of the datasets in a chart, or of the bars of a single dataset
+    const CHART_COLORS = ['#66c2a5', '#fc8d62', '#8da0cb', '#e78ac3', '#a6d854', '#ffd92f', '#e5c494', '#b3b3b3'];
+    
+    // Draw a bar or line chart on a new canvas; null if the browser can't draw or there is nothing to draw
+    function drawChart(spec) {
+        const canvas = document.createElement('canvas');
+        const ctx = canvas.getContext && canvas.getContext('2d');
+        const values = spec.datasets.flatMap(dataset => dataset.values).filter(value => value !== null);
+        if (!ctx || !spec.labels.length || !values.length) {
+            return null;
+        }
+        
+        // Drawn at twice the size it is shown at, so it stays sharp when enlarged
+        const width = 800, height = 480;
+        const scale = 2;
+        canvas.width = width * scale;
+        canvas.height = height * scale;
+        ctx.scale(scale, scale);
+        const legend = spec.datasets.length > 1;
+        const plot = { left: 80, right: 20, top: legend ? 70 : 50, bottom: 110 };
+        const plotWidth = width - plot.left - plot.right;
+        const plotHeight = height - plot.top - plot.bottom;
+        
+        ctx.fillStyle = 'white';
+        ctx.fillRect(0, 0, width, height);
+        ctx.fillStyle = '#333';
+        ctx.font = 'bold 16px sans-serif';
+        ctx.textAlign = 'center';
+        ctx.fillText(spec.title, width / 2, 26);
+        
+        // Y axis from 0 to a round number above the largest value, in five steps
+        const max = Math.max(...values, 0) || 1;
+        const magnitude = Math.pow(10, Math.floor(Math.log10(max / 5)));
+        const step = [1, 2, 2.5, 5, 10].map(m => m * magnitude).find(s => s * 5 >= max);
+        const top = step * 5;
+        const y = value => plot.top + plotHeight - value / top * plotHeight;
+        ctx.font = '12px sans-serif';
+        ctx.textAlign = 'right';
+        ctx.textBaseline = 'middle';
+        ctx.strokeStyle = '#e5e5e5';
+        for (let i = 0; i <= 5; i++) {
+            const tick = y(step * i);
+            ctx.beginPath();
+            ctx.moveTo(plot.left, tick);
+            ctx.lineTo(plot.left + plotWidth, tick);
+            ctx.stroke();
+            ctx.fillText(spec.format(step * i), plot.left - 6, tick);
+        }
+        ctx.save();
+        ctx.translate(16, plot.top + plotHeight / 2);
+        ctx.rotate(-Math.PI / 2);
+        ctx.textAlign = 'center';
+        ctx.fillText(spec.yLabel, 0, 0);
+        ctx.restore();
+        
+        // One slot per label; bars of the datasets side by side, line points at the slot centers
+        const slot = plotWidth / spec.labels.length;
+        const x = i => plot.left + slot * (i + 0.5);
+        const barWidth = slot * 0.8 / spec.datasets.length;
+        spec.datasets.forEach((dataset, d) => {
+            const color = CHART_COLORS[d % CHART_COLORS.length];
+            if (spec.kind === 'bar') {
+                dataset.values.forEach((value, i) => {
+                    if (value === null) {
+                        return;
+                    }
+                    ctx.fillStyle = spec.datasets.length > 1 ? color : CHART_COLORS[i % CHART_COLORS.length];
+                    const left = plot.left + slot * (i + 0.1) + barWidth * d;
+                    ctx.fillRect(left, y(value), barWidth, y(0) - y(value));
+                    
+                    // Value labels where there is room for them
+                    if (spec.datasets.length === 1 && spec.labels.length <= 15) {
+                        ctx.fillStyle = '#333';
+                        ctx.textAlign = 'center';
+                        ctx.textBaseline = 'bottom';
+                        ctx.fillText(spec.format(value), left + barWidth / 2, y(value) - 2);
+                    }
+                });
+            } else {
+                // Gaps (days without data) break the line
+                ctx.strokeStyle = color;
+                ctx.fillStyle = color;
+                ctx.lineWidth = 2;
+                ctx.beginPath();
+                let drawing = false;
+                dataset.values.forEach((value, i) => {
+                    if (value === null) {
+                        drawing = false;
+                        return;
+                    }
+                    if (drawing) {
+                        ctx.lineTo(x(i), y(value));
+                    } else {
+                        ctx.moveTo(x(i), y(value));
+                        drawing = true;
+                    }
+                });
+                ctx.stroke();
+                ctx.lineWidth = 1;
+                dataset.values.forEach((value, i) => {
+                    if (value !== null) {
+                        ctx.beginPath();
+                        ctx.arc(x(i), y(value), 3, 0, 2 * Math.PI);
+                        ctx.fill();
+                    }
+                });
+            }
+        });
+        
+        // X labels, slanted, and thinned out so they don't overlap
+        ctx.fillStyle = '#333';
+        ctx.textAlign = 'right';
+        ctx.textBaseline = 'middle';
+        const every = Math.ceil(spec.labels.length / 25);
+        spec.labels.forEach((label, i) => {
+            if (i % every) {
+                return;
+            }
+            const text = String(label).length > 22 ? String(label).slice(0, 21) + '…' : String(label);
+            ctx.save();
+            ctx.translate(x(i), plot.top + plotHeight + 8);
+            ctx.rotate(-Math.PI / 4);
+            ctx.fillText(text, 0, 0);
+            ctx.restore();
+        });
+        
+        if (legend) {
+            ctx.textAlign = 'left';
+            let left = plot.left;
+            spec.datasets.forEach((dataset, d) => {
+                ctx.fillStyle = CHART_COLORS[d % CHART_COLORS.length];
+                ctx.fillRect(left, 42, 12, 12);
+                ctx.fillStyle = '#333';
+                ctx.fillText(dataset.name, left + 16, 48);
+                left += ctx.measureText(dataset.name).width + 36;
+            });
+        }
+        return canvas;
+    }
+    
+    // If this is a general response, recommend uploading a file
+    function suggestUploadAfterGeneralQuestion(message) {
+        // But only if not already uploaded and this is the first general question
+        if (!datasetLoaded && generalQuestionAsked && 
+            !message.toLowerCase().includes('upload') && 
+            !message.toLowerCase().includes('file')) {
             
-            // Remove typing indicator
-            chatMessages.removeChild(typingIndicator);
+            generalQuestionAsked = false; // Reset so we don't show this after every general question
             
-            // Add error message
-            addMessageWithTyping('Sorry, an error occurred. Please try again.', 'bot');
-        });
+            // Wait a bit before showing the upload suggestion
+            setTimeout(() => {
+                addMessageWithTyping("To get detailed car rental analysis, please upload a rate shopping CSV file using the paperclip icon below.", 'bot');
+            }, 1000);
+        }
     }
     
     // Update contextual suggestions based on visualization type
@@ -627,7 +950,7 @@ You can now ask me analytical questions about this data!`;
     // Special handling for help command
     document.addEventListener('click', function(e) {
         // Handle clicking on graph images
-        if (e.target.classList.contains('graph-image')) {
+        if (e.target.classList.contains('graph-image') && e.target.src) {
             const src = e.target.src;
             modalImage.src = src;
             imageModal.style.display = 'block';
@@ -0,0 +1,187 @@
+"""Coalescing of identical concurrent work: the first caller computes, callers that arrive meanwhile share its result."""
+import asyncio
+import threading
+
+class _Call:
+    def __init__(self, done):
+        self.done = done
+        self.result = None
+        self.error = None
+        self.abandoned = False
+
+class SingleFlight:
+    """Runs a function once for concurrent callers with the same key, across threads.
+
+    Callers that ask for a key while it is being computed wait and get the same result, or
+    the same exception. If the computation is interrupted instead, they start over on their
+    own. Nothing is kept once the call finishes; caching is up to the caller.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.executed = 0
+        self.shared = 0
+
+    def _join(self, key):
+        # The call in flight for key and whether we are the one to make it
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                self.shared += 1
+                return call, False
+            call = self.calls[key] = _Call(threading.Event())
+            self.executed += 1
+            return call, True
+
+    def _finish(self, key, call):
+        with self.lock:
+            del self.calls[key]
+        call.done.set()
+
+    def do(self, key, fn):
+        """fn(), or the result of the fn() already running for key."""
+        call, leader = self._join(key)
+        if not leader:
+            call.done.wait()
+            if call.abandoned:
+                return self.do(key, fn)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        finished = False
+        try:
+            call.result = fn()
+            finished = True
+        except Exception as e:
+            call.error = e
+            finished = True
+            raise
+        finally:
+            call.abandoned = not finished
+            self._finish(key, call)
+        return call.result
+
+    def stream(self, key, fn):
+        """do() for a generator function.
+
+        The first caller gets the items of fn() as they are produced. Callers that join
+        meanwhile get all of them once it has finished. If the first caller stops iterating
+        early, those waiting start over.
+        """
+        call, leader = self._join(key)
+        if not leader:
+            call.done.wait()
+            if call.abandoned:
+                yield from self.stream(key, fn)
+                return
+            if call.error is not None:
+                raise call.error
+            yield from call.result
+            return
+
+        items = []
+        generator = None
+        try:
+            generator = fn()
+            for item in generator:
+                items.append(item)
+                yield item
+            call.result = items
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # Neither finished nor failed: our caller stopped iterating or was interrupted
+            call.abandoned = call.result is None and call.error is None
+            if generator is not None:
+                generator.close()
+            self._finish(key, call)
+
+    def stats(self):
+        with self.lock:
+            return {'in_flight': len(self.calls), 'executed': self.executed, 'shared': self.shared}
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines and async generators running on one event loop.
+
+    If the first caller is cancelled, those waiting on it start over on their own.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.executed = 0
+        self.shared = 0
+
+    def _join(self, key):
+        call = self.calls.get(key)
+        if call is not None:
+            self.shared += 1
+            return call, False
+        call = self.calls[key] = _Call(asyncio.Event())
+        self.executed += 1
+        return call, True
+
+    def _finish(self, key, call):
+        del self.calls[key]
+        call.done.set()
+
+    async def do(self, key, fn):
+        """await fn(), or the result of the fn() already running for key."""
+        call, leader = self._join(key)
+        if not leader:
+            await call.done.wait()
+            if call.abandoned:
+                return await self.do(key, fn)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        finished = False
+        try:
+            call.result = await fn()
+            finished = True
+        except Exception as e:
+            call.error = e
+            finished = True
+            raise
+        finally:
+            call.abandoned = not finished
+            self._finish(key, call)
+        return call.result
+
+    async def stream(self, key, fn):
+        """SingleFlight.stream for an async generator function."""
+        call, leader = self._join(key)
+        if not leader:
+            await call.done.wait()
+            if call.abandoned:
+                async for item in self.stream(key, fn):
+                    yield item
+                return
+            if call.error is not None:
+                raise call.error
+            for item in call.result:
+                yield item
+            return
+
+        items = []
+        generator = None
+        try:
+            generator = fn()
+            async for item in generator:
+                items.append(item)
+                yield item
+            call.result = items
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            call.abandoned = call.result is None and call.error is None
+            if generator is not None:
+                await generator.aclose()
+            self._finish(key, call)
+
+    def stats(self):
+        return {'in_flight': len(self.calls), 'executed': self.executed, 'shared': self.shared}
@@ -0,0 +1,39 @@
+"""The aggregation cube must give the same averages as grouping the rows directly."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pytest
+from models.analysis import analyze_file, analyze_file_chunked, load_rate_shop_csv
+
+# Every key column has a blank cell somewhere, on rows that still have the other keys
+ROWS = [
+    ('Expedia', 'Avis', 'Compact', 'Ford Focus', '2024-03-01', 40.0),
+    ('Expedia', 'Hertz', 'Compact', 'VW Golf', '2024-03-01', 52.5),
+    ('', 'Avis', 'Compact', 'Ford Focus', '2024-03-02', 31.0),
+    ('Kayak', '', 'Luxury', 'BMW 5', '2024-03-02', 150.0),
+    ('Kayak', 'Hertz', 'Luxury', 'Audi A6', '', 99.0),
+    ('Kayak', 'Avis', 'Luxury', 'Mercedes E', '2024-03-03', 120.0),
+    ('Expedia', 'Hertz', '', 'Fiat 500', '2024-03-03', 25.0),
+    ('Kayak', 'Avis', 'Economy', 'Kia Picanto', '2024-03-04', 30.0),
+    ('', 'Hertz', 'Economy', 'Fiat 500', '', 28.0),
+]
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / 'rates.csv'
+    pd.DataFrame(ROWS, columns=['Website', 'WebsiteSupplier', 'WebsiteCarCategory', 'VehicleName',
+                                'PickUpDate', 'InclusiveRate']).to_csv(path, index=False)
+    return str(path)
+
+def baseline_mean(csv_file, column):
+    df = load_rate_shop_csv(csv_file)
+    return df.groupby(column, observed=True)['InclusiveRate'].mean().to_dict()
+
+@pytest.mark.parametrize('analyze', [analyze_file, lambda f: analyze_file_chunked(f, chunk_rows=2)])
+@pytest.mark.parametrize('column, agg', [('WebsiteCarCategory', 'avg_by_category'),
+                                         ('WebsiteSupplier', 'avg_by_supplier')])
+def test_cube_means_include_rows_with_blank_keys(csv_file, analyze, column, agg):
+    assert analyze(csv_file)['aggs'][agg] == pytest.approx(baseline_mean(csv_file, column))